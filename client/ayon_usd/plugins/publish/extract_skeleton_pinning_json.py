@@ -3,8 +3,20 @@ from typing import ClassVar
 import pyblish.api
 import ayon_api
 from ayon_core.pipeline import OptionalPyblishPluginMixin
-from ayon_core.pipeline.publish import FARM_JOB_ENV_DATA_KEY
-from ayon_usd.standalone.usd.pinning import generate_pinning_file
+from ayon_core.pipeline.publish import (
+    FARM_JOB_ENV_DATA_KEY,
+    KnownPublishError,
+)
+from ayon_usd.standalone.usd.pinning import (
+    AyonUriBatchResolver,
+    LayerDependencyCache,
+    LayerMemoryStats,
+    PinningReport,
+    StageSettings,
+    TraversalSettings,
+    generate_pinning_file,
+    validate_pinning_file,
+)
 
 
 class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
@@ -32,7 +44,8 @@ class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
         With the `Farm Export, Farm Render` target, the plugin will still
         function, but this workflow results in the USD file being exported
         twice: once by this plugin and then again (overwritten) by the
-        dedicated export job on the farm.
+        dedicated export job on the farm. Enable `pin_lop_stage` to pin the
+        LOP stage in memory instead of exporting the USD file.
     """
 
     label = "Extract Skeleton Pinning JSON"
@@ -43,6 +56,33 @@ class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
 
     settings_category: ClassVar = "usd"
 
+    # Number of threads scanning USD layers in parallel, serial when 0
+    max_workers: int = 0
+    # Local SQLite file caching the asset paths of unchanged layers
+    layer_cache_path: str = ""
+    # Resolve AYON URIs with batch requests to the AYON server
+    batch_resolve_uris: bool = False
+    # Write the indexed binary pinning file next to the pinning JSON
+    write_binary_pinning_file: bool = False
+    # Version of the pinning file schema, see `PinningFileWriter`
+    schema_version: int = 1
+    # Merge the pinning fragments of published USD files
+    use_pinning_fragments: bool = False
+    # Write a performance report next to the pinning file
+    write_pinning_report: bool = False
+    # Trace the peak Python memory in the performance report
+    trace_report_memory: bool = False
+    # Fail the publish if any of the pinned paths does not exist
+    validate_pinned_paths: bool = False
+    # Only pin the layers and assets the composed USD stage uses
+    use_composed_stage: bool = False
+    # Prim paths to populate the composed stage with, all prims if empty
+    population_mask: ClassVar = []
+    # Load the payloads of the composed stage
+    load_payloads: bool = True
+    # Pin the LOP stage in memory when the USD file is not exported yet
+    pin_lop_stage: bool = False
+
     def process(self, instance: pyblish.api.Instance) -> None:
         """Process the plugin."""
         if not self.is_active(instance.data):
@@ -52,6 +92,9 @@ class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
             return
 
         usd_file_path = self.get_usd_file_path(instance)
+        entry_usd = usd_file_path
+        if self.pin_lop_stage and not os.path.isfile(usd_file_path):
+            entry_usd = self.get_lop_stage(instance)
         usd_file_name = os.path.basename(usd_file_path)
         usd_file_name = os.path.splitext(usd_file_name)[0]
 
@@ -63,13 +106,50 @@ class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
         project_roots = ayon_api.get_project_roots_by_site_id(
             instance.context.data["projectName"]
         )
+        layer_cache = None
+        if self.layer_cache_path:
+            layer_cache = LayerDependencyCache(
+                os.path.expanduser(os.path.expandvars(self.layer_cache_path))
+            )
+
+        uri_resolver = None
+        if self.batch_resolve_uris:
+            uri_resolver = AyonUriBatchResolver()
+
+        memory_stats = LayerMemoryStats()
+        report = None
+        if self.write_pinning_report:
+            report = PinningReport(trace_memory=self.trace_report_memory)
+        stage_settings = None
+        if self.use_composed_stage:
+            stage_settings = StageSettings(
+                population_mask=self.population_mask or None,
+                load_payloads=self.load_payloads,
+            )
         generate_pinning_file(
-            usd_file_path,
+            entry_usd,
             project_roots,
-            pin_file_path
+            pin_file_path,
+            settings=TraversalSettings(
+                max_workers=self.max_workers,
+                layer_cache=layer_cache,
+                uri_resolver=uri_resolver,
+                memory_stats=memory_stats,
+                use_fragments=self.use_pinning_fragments,
+                report=report,
+            ),
+            stage_settings=stage_settings,
+            write_binary=self.write_binary_pinning_file,
+            schema_version=self.schema_version,
+            entry_scene=usd_file_path,
         )
+        self.log.debug(memory_stats.summary())
+        if report is not None:
+            self.log.info(report.summary())
 
         self.log.debug(f"Pinning file was created at: '{pin_file_path}'.")
+        if self.validate_pinned_paths:
+            self.validate_pinning_file(instance, pin_file_path, project_roots)
         pin_file_path = self.get_rootless_path(instance, pin_file_path)
 
         # Set farm env keys
@@ -85,6 +165,22 @@ class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
             "ENABLE_STATIC_GLOBAL_CACHE": "1",
         })
 
+    def validate_pinning_file(self, instance, pin_file_path, project_roots):
+        """Fail if a pinned path does not exist, before the farm job does.
+
+        The total size of the pinned files is stored in the instance data
+        as `pinnedFilesSize`, e.g. for the farm submission.
+        """
+        validation = validate_pinning_file(pin_file_path, project_roots)
+        instance.data["pinnedFilesSize"] = validation.total_bytes
+        self.log.info(validation.summary())
+        if not validation.is_valid:
+            raise KnownPublishError(
+                f"{len(validation.missing)} paths pinned in "
+                f"'{pin_file_path}' do not exist:\n"
+                + validation.summary(max_missing_count=50)
+            )
+
     def get_usd_file_path(self, instance):
         usd_file_path = instance.data.get(
             "ifdFile", None
@@ -95,9 +191,37 @@ class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
         if usd_file_path and os.path.isfile(usd_file_path):
             return usd_file_path
 
+        # The LOP stage is pinned instead, the file is exported later.
+        if self.pin_lop_stage:
+            return usd_file_path or self.get_render_usd_path(instance)
+
         # Export __render__.usd if file doesn't exist already.
         return self.export_usd_file(instance)
 
+    def get_render_usd_path(self, instance) -> str:
+        """Return the path the USD ROP exports the render USD file to."""
+        import hou
+
+        ropnode = hou.node(instance.data.get("instance_node"))
+        filename = ropnode.parm("lopoutput").eval()
+        directory = ropnode.parm("savetodirectory_directory").eval()
+        return os.path.join(directory, filename)
+
+    def get_lop_stage(self, instance):
+        """Return the composed stage of the LOP node the USD ROP exports.
+
+        Args:
+            instance (pyblish.api.Instance): Instance object.
+
+        Returns:
+            pxr.Usd.Stage: The stage of the LOP node, in memory.
+        """
+        import hou
+
+        ropnode = hou.node(instance.data.get("instance_node"))
+        lop_node = hou.node(ropnode.parm("loppath").eval())
+        return lop_node.stage()
+
     def export_usd_file(self, instance) -> str:
         """Save USD file from Houdini.
 
@@ -114,9 +238,7 @@ class ExtractSkeletonPinningJSON(pyblish.api.InstancePlugin,
         from ayon_houdini.api import maintained_selection
 
         ropnode = hou.node(instance.data.get("instance_node"))
-        filename = ropnode.parm("lopoutput").eval()
-        directory = ropnode.parm("savetodirectory_directory").eval()
-        filepath = os.path.join(directory, filename)
+        filepath = self.get_render_usd_path(instance)
 
         # create temp usdrop node
         with maintained_selection():
@@ -0,0 +1,128 @@
+import os
+
+import pyblish.api
+from ayon_api.operations import (
+    OperationsSession,
+    create_entity_id,
+    new_representation_entity,
+)
+
+from ayon_core.lib import source_hash
+from ayon_core.pipeline import OptionalPyblishPluginMixin
+
+# Avoid USD imports turning into errors when running in a host that does
+# not support the USD libs.
+try:
+    from ayon_usd.standalone.usd.pinning import generate_pinning_fragment
+    HAS_USD_LIBS = True
+except ImportError:
+    HAS_USD_LIBS = False
+
+
+USD_EXTENSIONS = (".usd", ".usda", ".usdc")
+
+
+class IntegratePinningFragment(pyblish.api.InstancePlugin,
+                               OptionalPyblishPluginMixin):
+    """Write a pinning fragment next to the published USD files.
+
+    The fragment stores the resolved asset dependencies of the published
+    layer. Pinning files of shots using the published layer merge the
+    fragment instead of traversing all layers of the asset again, see
+    `use_pinning_fragments` of `ExtractSkeletonPinningJSON`.
+
+    The fragment has to be written from the published layer, so it is
+    written after the Integrator and registered as an additional
+    representation of the published version, e.g. `usd_pin_fragment`.
+    """
+
+    label = "Integrate USD Pinning Fragment"
+    families = ["usd"]
+    settings_category = "usd"
+
+    # Run after the Integrator, the published files have to exist
+    order = pyblish.api.IntegratorOrder + 0.1
+
+    def process(self, instance):
+        if not self.is_active(instance.data):
+            return
+
+        if not HAS_USD_LIBS:
+            self.log.warning(
+                "Unable to write USD pinning fragments because "
+                "`pxr` USD libraries could not be imported.")
+            return
+
+        published_representations = instance.data.get(
+            "published_representations", {})
+        fragment_representations = []
+        for published_representation in published_representations.values():
+            fragment_files = []
+            for path in published_representation.get("published_files", []):
+                if not path.lower().endswith(USD_EXTENSIONS):
+                    continue
+                if not os.path.isfile(path):
+                    continue
+
+                fragment_file = generate_pinning_fragment(path)
+                self.log.debug(
+                    f"Pinning fragment was created at: '{fragment_file}'.")
+                fragment_files.append(fragment_file)
+
+            if fragment_files:
+                representation = self.get_fragment_representation(
+                    instance,
+                    published_representation["representation"],
+                    fragment_files,
+                )
+                fragment_representations.append(
+                    (representation, fragment_files))
+
+        if not fragment_representations:
+            return
+
+        project_name = instance.context.data["projectName"]
+        operations = OperationsSession()
+        for representation, _ in fragment_representations:
+            operations.create_entity(
+                project_name, "representation", representation)
+        operations.commit()
+
+        for representation, fragment_files in fragment_representations:
+            published_representations[representation["id"]] = {
+                "representation": representation,
+                "published_files": fragment_files,
+            }
+
+    def get_fragment_representation(
+        self, instance, usd_representation, fragment_files
+    ):
+        """Return the representation entity of the pinning fragments of a
+        published USD representation.
+        """
+        anatomy = instance.context.data["anatomy"]
+        files = []
+        for fragment_file in fragment_files:
+            success, rootless_path = anatomy.find_root_template_from_path(
+                fragment_file)
+            if not success:
+                rootless_path = fragment_file
+            files.append({
+                "id": create_entity_id(),
+                "name": os.path.basename(fragment_file),
+                "path": rootless_path,
+                "size": os.path.getsize(fragment_file),
+                "hash": source_hash(fragment_file),
+                "hash_type": "op3",
+            })
+
+        name = f"{usd_representation['name']}_pin_fragment"
+        context = dict(usd_representation.get("data", {}).get("context", {}))
+        context.update({"representation": name, "ext": "json"})
+        return new_representation_entity(
+            name,
+            usd_representation["versionId"],
+            files,
+            attribs={"path": fragment_files[0]},
+            data={"context": context},
+        )
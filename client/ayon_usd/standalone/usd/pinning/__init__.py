@@ -1,3 +1,68 @@
-from ._pinning_file_generation_funcs import generate_pinning_file
+from ._batch_pinning import generate_pinning_files, read_pinning_manifest
+from ._binary_pinning import (
+    BinaryPinningFile,
+    get_binary_pinning_path,
+    write_binary_pinning_file,
+)
+from ._dependency_graph import (
+    DependencyGraph,
+    read_dependency_graph,
+    write_dependency_graph,
+)
+from ._layer_cache import LayerDependencyCache
+from ._layer_memory import LayerMemoryStats
+from ._path_store import PathStore
+from ._pinning_delta import PinningDeltaWriter, materialize_pinning_file
+from ._pinning_file_generation_funcs import (
+    StageSettings,
+    TraversalSettings,
+    generate_pinning_file,
+    generate_pinning_fragment,
+    get_dependency_graph,
+    get_stage_asset_dependencies,
+)
+from ._pinning_file_reader import expand_pinning_data, read_pinning_file
+from ._pinning_file_writer import PINNING_SCHEMA_VERSION, PinningFileWriter
+from ._pinning_fragment import get_pinning_fragment_path
+from ._pinning_report import PinningReport, get_pinning_report_path
+from ._pinning_validation import (
+    PinningValidation,
+    validate_pinning_data,
+    validate_pinning_file,
+)
+from ._resolve_cache import ResolveCache
+from ._uri_batch import AyonUriBatchResolver
 
-__all__ = ["generate_pinning_file"]
+__all__ = [
+    "PINNING_SCHEMA_VERSION",
+    "AyonUriBatchResolver",
+    "BinaryPinningFile",
+    "DependencyGraph",
+    "LayerDependencyCache",
+    "LayerMemoryStats",
+    "PathStore",
+    "PinningDeltaWriter",
+    "PinningFileWriter",
+    "PinningReport",
+    "PinningValidation",
+    "ResolveCache",
+    "StageSettings",
+    "TraversalSettings",
+    "expand_pinning_data",
+    "generate_pinning_file",
+    "generate_pinning_files",
+    "generate_pinning_fragment",
+    "get_binary_pinning_path",
+    "get_dependency_graph",
+    "get_pinning_fragment_path",
+    "get_pinning_report_path",
+    "get_stage_asset_dependencies",
+    "materialize_pinning_file",
+    "read_dependency_graph",
+    "read_pinning_file",
+    "read_pinning_manifest",
+    "validate_pinning_data",
+    "validate_pinning_file",
+    "write_binary_pinning_file",
+    "write_dependency_graph",
+]
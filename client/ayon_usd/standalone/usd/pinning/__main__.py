@@ -0,0 +1,207 @@
+"""Generate AYON USD Resolver pinning files of many entry USD files.
+
+Example:
+    python -m ayon_usd.standalone.usd.pinning \
+        --root work=/mnt/projects --layer-cache ~/.cache/ayon_pinning.db \
+        sh010/shot.usd sh020/shot.usd
+
+The environment has to set up the AYON USD Resolver the pinning files
+should resolve with, like for the farm render jobs.
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+from ._batch_pinning import (
+    generate_pinning_files,
+    get_batch_entries,
+    parse_root_info,
+)
+from ._layer_cache import LayerDependencyCache
+from ._pinning_file_generation_funcs import StageSettings, TraversalSettings
+from ._pinning_file_writer import PINNING_SCHEMA_VERSION
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m ayon_usd.standalone.usd.pinning",
+        description=(
+            "Generate an AYON USD Resolver pinning file per entry USD file, "
+            "using a pool of worker processes."
+        ),
+    )
+    parser.add_argument(
+        "entries",
+        nargs="*",
+        help="Entry USD files, each pinned to '<name>_pin.json' next to it.",
+    )
+    parser.add_argument(
+        "--manifest",
+        help=(
+            "JSON file with a list of entry USD files or an object mapping "
+            "entry USD files to their pinning files."
+        ),
+    )
+    parser.add_argument(
+        "--root",
+        action="append",
+        default=[],
+        required=True,
+        metavar="NAME=PATH",
+        help="Project root the pinned paths are made relative to.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Directory to write the pinning files of the entries to.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="Number of worker processes, one per CPU by default.",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=0,
+        help="Number of threads scanning the layers of each entry.",
+    )
+    parser.add_argument(
+        "--layer-cache",
+        help="SQLite file caching the asset paths of unchanged layers.",
+    )
+    parser.add_argument(
+        "--use-fragments",
+        action="store_true",
+        help="Merge the pinning fragments of published USD files.",
+    )
+    parser.add_argument(
+        "--write-binary",
+        action="store_true",
+        help="Also write the indexed binary pinning file.",
+    )
+    parser.add_argument(
+        "--schema-version",
+        type=int,
+        default=PINNING_SCHEMA_VERSION,
+        choices=(1, 2),
+        help="Version of the pinning file schema.",
+    )
+    parser.add_argument(
+        "--stage",
+        dest="use_stage",
+        action="store_true",
+        help=(
+            "Only pin the layers and assets the composed stage uses, "
+            "leaving out unselected variants and inactive prims."
+        ),
+    )
+    parser.add_argument(
+        "--population-mask",
+        action="append",
+        metavar="PRIM_PATH",
+        help="Prim path the composed stage is populated with.",
+    )
+    parser.add_argument(
+        "--no-payloads",
+        dest="load_payloads",
+        action="store_false",
+        help="Do not load the payloads of the composed stage.",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help=(
+            "Check that the pinned paths exist and report their total size. "
+            "Entries with missing paths fail."
+        ),
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="Write a performance report next to each pinning file.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace the peak Python memory in the performance reports.",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log debug messages.",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command line interface.
+
+    Returns: The exit code, 1 if any entry failed.
+
+    """
+    parser = _get_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(levelname)s: %(message)s",
+    )
+
+    try:
+        root_info = parse_root_info(args.root)
+    except ValueError as exc:
+        parser.error(str(exc))
+    try:
+        entries = get_batch_entries(
+            [os.path.abspath(entry_usd) for entry_usd in args.entries],
+            args.manifest,
+            args.output_dir,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not entries:
+        parser.error("No entry USD files given")
+
+    layer_cache = None
+    if args.layer_cache:
+        layer_cache = LayerDependencyCache(
+            os.path.expanduser(os.path.expandvars(args.layer_cache))
+        )
+
+    stage_settings = None
+    if args.use_stage:
+        stage_settings = StageSettings(
+            population_mask=args.population_mask,
+            load_payloads=args.load_payloads,
+        )
+
+    report_options = None
+    if args.report:
+        report_options = {"trace_memory": args.trace_memory}
+
+    errors = generate_pinning_files(
+        entries,
+        root_info,
+        processes=args.processes,
+        settings=TraversalSettings(
+            max_workers=args.max_workers,
+            layer_cache=layer_cache,
+            use_fragments=args.use_fragments,
+        ),
+        report_options=report_options,
+        validate=args.validate,
+        stage_settings=stage_settings,
+        write_binary=args.write_binary,
+        schema_version=args.schema_version,
+    )
+    failed = [entry_usd for entry_usd, error in errors.items() if error]
+    logging.info(
+        f"Pinned {len(errors) - len(failed)} of {len(errors)} entries"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional
+
+from ._pinning_file_generation_funcs import (
+    TraversalSettings,
+    generate_pinning_file,
+)
+from ._pinning_report import PinningReport
+from ._pinning_validation import validate_pinning_file
+
+log = logging.getLogger(__name__)
+
+
+def get_default_pinning_path(entry_usd: str) -> str:
+    """Return the pinning file path of an entry USD file.
+
+    This is the path the pinning extractor writes to, e.g. `shot_pin.json`
+    next to `shot.usd`.
+    """
+    return os.path.splitext(entry_usd)[0] + "_pin.json"
+
+
+def read_pinning_manifest(manifest_file: str) -> Dict[str, str]:
+    """Read the entry USD files and their pinning files from a manifest.
+
+    The manifest is a JSON file with either a list of entry USD files,
+    which are pinned to their default pinning path, or an object mapping
+    each entry USD file to its pinning file. Relative paths are relative to
+    the manifest.
+
+    Args:
+        manifest_file: Path of the manifest JSON file.
+
+    Returns: Mapping from entry USD file to pinning file.
+
+    Raises:
+        ValueError: If the manifest is neither a list nor an object.
+
+    """
+    with open(manifest_file, encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    directory = os.path.dirname(os.path.abspath(manifest_file))
+    if isinstance(manifest, list):
+        manifest = {
+            entry_usd: get_default_pinning_path(entry_usd)
+            for entry_usd in manifest
+        }
+    if not isinstance(manifest, dict):
+        raise ValueError(f"Invalid pinning manifest {manifest_file}")
+
+    return {
+        os.path.join(directory, entry_usd): os.path.join(
+            directory, pinning_file
+        )
+        for entry_usd, pinning_file in manifest.items()
+    }
+
+
+def _generate_entry_pinning_file(
+    entry_usd: str,
+    pinning_file: str,
+    root_info: Dict[str, str],
+    settings: TraversalSettings,
+    options: Dict[str, Any],
+    report_options: Optional[Dict[str, Any]] = None,
+) -> Optional[str]:
+    """Generate the pinning file of one entry, returning the error if any.
+
+    Runs in the worker processes, errors are returned as text so a failing
+    entry does not stop the batch. Reports are created by the worker as they
+    can not be pickled.
+    """
+    report = None
+    if report_options is not None:
+        report = PinningReport(**report_options)
+    try:
+        generate_pinning_file(
+            entry_usd,
+            root_info,
+            pinning_file,
+            settings=settings._replace(report=report),
+            **options,
+        )
+    except Exception as exc:
+        log.debug(f"Unable to pin {entry_usd}", exc_info=True)
+        return f"{type(exc).__name__}: {exc}"
+    return None
+
+
+def generate_pinning_files(
+    entries: Dict[str, str],
+    root_info: Dict[str, str],
+    processes: int = 0,
+    settings: Optional[TraversalSettings] = None,
+    report_options: Optional[Dict[str, Any]] = None,
+    validate: bool = False,
+    **options,
+) -> Dict[str, Optional[str]]:
+    """Generate the pinning files of many entry USD files.
+
+    The entries are pinned by a pool of worker processes, each entry by a
+    single process. The worker processes share the `layer_cache`, so layers
+    used by several entries, e.g. the assets of a sequence, are only read
+    once as long as they did not change. The workers are spawned rather
+    than forked as forking a process with running USD threads is not safe,
+    each of them resolves with its default resolver.
+
+    A failing entry does not stop the other entries.
+
+    Args:
+        entries: Mapping from entry USD file to the pinning file to write.
+        root_info: The project roots for the site the pinning should resolve
+            to, see `generate_pinning_file`.
+        processes: Number of worker processes. Defaults to one process per
+            CPU when lower than 1. With 1 the entries are pinned one after
+            another in the current process.
+        settings: Settings of the layer traversal of each entry, see
+            `TraversalSettings`. Its `layer_cache` is shared by all worker
+            processes. Its `report` is not used, see `report_options`.
+        report_options: Write a performance report next to each pinning
+            file, created with these arguments of `PinningReport`.
+        validate: Check that the paths of each written pinning file exist,
+            see `validate_pinning_file`. Entries with missing paths fail.
+        **options: Other arguments of `generate_pinning_file`, e.g.
+            `write_binary` or `stage_settings`. They and the `settings` have
+            to be picklable.
+
+    Returns: The error of each entry, None for the entries that were pinned.
+
+    """
+    if settings is None:
+        settings = TraversalSettings()
+    if processes < 1:
+        processes = os.cpu_count() or 1
+    processes = min(processes, max(len(entries), 1))
+
+    errors: Dict[str, Optional[str]] = {}
+    if processes == 1:
+        for entry_usd, pinning_file in entries.items():
+            errors[entry_usd] = _generate_entry_pinning_file(
+                entry_usd, pinning_file, root_info, settings, options, report_options
+            )
+            if validate and errors[entry_usd] is None:
+                errors[entry_usd] = _validate_entry(pinning_file, root_info)
+            _log_result(entry_usd, pinning_file, errors[entry_usd])
+        return errors
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=context
+    ) as executor:
+        futures = {
+            executor.submit(
+                _generate_entry_pinning_file,
+                entry_usd,
+                pinning_file,
+                root_info,
+                settings,
+                options,
+                report_options,
+            ): entry_usd
+            for entry_usd, pinning_file in entries.items()
+        }
+        for future in as_completed(futures):
+            entry_usd = futures[future]
+            errors[entry_usd] = future.result()
+            if validate and errors[entry_usd] is None:
+                errors[entry_usd] = _validate_entry(
+                    entries[entry_usd], root_info
+                )
+            _log_result(entry_usd, entries[entry_usd], errors[entry_usd])
+
+    # Report in the order of the entries
+    return {entry_usd: errors[entry_usd] for entry_usd in entries}
+
+
+def _validate_entry(
+    pinning_file: str, root_info: Dict[str, str]
+) -> Optional[str]:
+    """Validate the paths of a pinning file, returning the error if any."""
+    validation = validate_pinning_file(pinning_file, root_info)
+    log.info(f"{pinning_file}: {validation.summary()}")
+    if not validation.is_valid:
+        return f"{len(validation.missing)} pinned paths are missing"
+    return None
+
+
+def _log_result(entry_usd: str, pinning_file: str, error: Optional[str]):
+    if error is None:
+        log.info(f"Pinned {entry_usd} to {pinning_file}")
+    else:
+        log.error(f"Unable to pin {entry_usd}: {error}")
+
+
+def parse_root_info(roots: Iterable[str]) -> Dict[str, str]:
+    """Parse project roots given as `name=path` pairs.
+
+    Raises:
+        ValueError: If a root is not a `name=path` pair.
+
+    """
+    root_info: Dict[str, str] = {}
+    for root in roots:
+        name, separator, path = root.partition("=")
+        if not separator or not name or not path:
+            raise ValueError(f"Invalid root '{root}', expected name=path")
+        root_info[name] = path
+    return root_info
+
+
+def get_batch_entries(
+    entry_files: List[str],
+    manifest_file: Optional[str] = None,
+    output_dir: Optional[str] = None,
+) -> Dict[str, str]:
+    """Return the entry USD files of a batch with their pinning files.
+
+    With an `output_dir` the pinning files of `entry_files` keep their
+    directory relative to the common directory of all entry files, e.g.
+    `sh010/shot.usd` and `sh020/shot.usd` are pinned to
+    `<output_dir>/sh010/shot_pin.json` and `<output_dir>/sh020/shot_pin.json`.
+
+    Args:
+        entry_files: Entry USD files pinned to their default pinning path.
+        manifest_file: Manifest with more entries, see
+            `read_pinning_manifest`.
+        output_dir: Write the pinning files of `entry_files` to this
+            directory instead of next to the entry files.
+
+    Returns: Mapping from entry USD file to pinning file.
+
+    Raises:
+        ValueError: If several entries are pinned to the same pinning file.
+
+    """
+    entries: Dict[str, str] = {}
+    if manifest_file:
+        entries.update(read_pinning_manifest(manifest_file))
+
+    common_directory = None
+    if output_dir and entry_files:
+        try:
+            common_directory = os.path.commonpath([
+                os.path.dirname(os.path.abspath(entry_usd))
+                for entry_usd in entry_files
+            ])
+        except ValueError:
+            # Entries on different drives share no directory
+            common_directory = None
+
+    for entry_usd in entry_files:
+        pinning_file = get_default_pinning_path(entry_usd)
+        if output_dir:
+            if common_directory is None:
+                relative_path = os.path.basename(pinning_file)
+            else:
+                relative_path = os.path.relpath(
+                    os.path.abspath(pinning_file), common_directory
+                )
+            pinning_file = os.path.join(output_dir, relative_path)
+        entries[entry_usd] = pinning_file
+
+    entry_by_pinning_file: Dict[str, str] = {}
+    for entry_usd, pinning_file in entries.items():
+        key = os.path.normcase(os.path.abspath(pinning_file))
+        other_entry = entry_by_pinning_file.setdefault(key, entry_usd)
+        if other_entry != entry_usd:
+            raise ValueError(
+                f"{other_entry} and {entry_usd} are both pinned to "
+                f"{pinning_file}"
+            )
+    return entries
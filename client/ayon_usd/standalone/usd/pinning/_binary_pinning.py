@@ -0,0 +1,251 @@
+import mmap
+import os
+import struct
+from typing import Iterator, List, Mapping, Optional, Tuple
+
+from ._pinning_file_writer import atomic_write
+
+BINARY_PINNING_EXTENSION = ".bin"
+BINARY_PINNING_MAGIC = b"AYONPIN\0"
+BINARY_PINNING_VERSION = 1
+
+# Every n-th entry stores its full identifier and path and is listed in the
+# offset index. The entries in between only store the suffix that differs
+# from the entry before them.
+RESTART_INTERVAL = 16
+
+# Magic, version, entry count, restart count and index offset
+_HEADER = struct.Struct("<8sIIIQ")
+_OFFSET = struct.Struct("<Q")
+
+
+def get_binary_pinning_path(pinning_file: str) -> str:
+    """Return the path of the binary sidecar of a JSON pinning file."""
+    return os.path.splitext(pinning_file)[0] + BINARY_PINNING_EXTENSION
+
+
+def _encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _decode_varint(data, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _get_shared_length(previous: bytes, current: bytes) -> int:
+    length = min(len(previous), len(current))
+    index = 0
+    while index < length and previous[index] == current[index]:
+        index += 1
+    return index
+
+
+def write_binary_pinning_file(
+    output_path: str,
+    pinning_data: Mapping[str, str],
+):
+    """Write pinning data in the memory mappable binary pinning format.
+
+    The entries are sorted by the UTF-8 bytes of their identifier. Each
+    entry stores the lengths of the identifier and path prefix it shares
+    with the entry before it, followed by the remaining suffixes. Every
+    `RESTART_INTERVAL` entries the full identifier and path are stored and
+    their offset is added to the index at the end of the file, which
+    allows `BinaryPinningFile` to binary search the file.
+
+    The file is written atomically through a temporary file.
+
+    Args:
+        output_path: Path of the binary pinning file.
+        pinning_data: Mapping from asset identifier to pinned path.
+
+    """
+    entries = sorted(
+        (identifier.encode("utf-8"), path.encode("utf-8"))
+        for identifier, path in pinning_data.items()
+    )
+
+    with atomic_write(output_path, binary=True) as binary_file:
+        binary_file.write(b"\0" * _HEADER.size)
+
+        restart_offsets: List[int] = []
+        offset = _HEADER.size
+        previous_key = previous_value = b""
+        for index, (key, value) in enumerate(entries):
+            if index % RESTART_INTERVAL == 0:
+                restart_offsets.append(offset)
+                shared_key = shared_value = 0
+            else:
+                shared_key = _get_shared_length(previous_key, key)
+                shared_value = _get_shared_length(previous_value, value)
+
+            entry = b"".join((
+                _encode_varint(shared_key),
+                _encode_varint(len(key) - shared_key),
+                _encode_varint(shared_value),
+                _encode_varint(len(value) - shared_value),
+                key[shared_key:],
+                value[shared_value:],
+            ))
+            binary_file.write(entry)
+            offset += len(entry)
+            previous_key, previous_value = key, value
+
+        binary_file.write(b"".join(
+            _OFFSET.pack(restart_offset)
+            for restart_offset in restart_offsets
+        ))
+        binary_file.seek(0)
+        binary_file.write(_HEADER.pack(
+            BINARY_PINNING_MAGIC,
+            BINARY_PINNING_VERSION,
+            len(entries),
+            len(restart_offsets),
+            offset,
+        ))
+
+
+class BinaryPinningFile:
+    """Reader of binary pinning files written by `write_binary_pinning_file`.
+
+    The file is memory mapped and `lookup` binary searches the offset index,
+    so only the pages of the entries it compares are read from disk. This
+    allows to query large pinning files without loading them.
+
+    Use it as a context manager to close the file when done:
+
+        with BinaryPinningFile("/path/to/shot_pin.bin") as pinning_file:
+            path = pinning_file.lookup("./asset.usd")
+
+    Args:
+        path: Path of the binary pinning file.
+
+    Raises:
+        ValueError: If the file is not a binary pinning file of a supported
+            version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as binary_file:
+            self._data = mmap.mmap(
+                binary_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+
+        try:
+            magic, version, count, restart_count, index_offset = (
+                _HEADER.unpack_from(self._data)
+            )
+        except struct.error:
+            magic = version = None
+        if magic != BINARY_PINNING_MAGIC:
+            self.close()
+            raise ValueError(f"Not a binary pinning file: {path}")
+        if version != BINARY_PINNING_VERSION:
+            self.close()
+            raise ValueError(
+                f"Unsupported binary pinning file version {version}: {path}"
+            )
+
+        self._count = count
+        self._restart_count = restart_count
+        self._index_offset = index_offset
+
+    def __enter__(self) -> "BinaryPinningFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, identifier: str) -> bool:
+        return self.lookup(identifier) is not None
+
+    def close(self):
+        """Unmap the file."""
+        self._data.close()
+
+    def _get_restart_offset(self, restart_index: int) -> int:
+        return _OFFSET.unpack_from(
+            self._data, self._index_offset + restart_index * _OFFSET.size
+        )[0]
+
+    def _get_restart_key(self, restart_index: int) -> bytes:
+        offset = self._get_restart_offset(restart_index)
+        # Restart entries do not share a prefix with the entry before them
+        _, offset = _decode_varint(self._data, offset)
+        key_length, offset = _decode_varint(self._data, offset)
+        _, offset = _decode_varint(self._data, offset)
+        _, offset = _decode_varint(self._data, offset)
+        return self._data[offset:offset + key_length]
+
+    def _iter_block(
+        self, restart_index: int
+    ) -> Iterator[Tuple[bytes, bytes]]:
+        """Yield the entries from a restart entry to the next restart."""
+        data = self._data
+        offset = self._get_restart_offset(restart_index)
+        entry_count = min(
+            RESTART_INTERVAL, self._count - restart_index * RESTART_INTERVAL
+        )
+        key = value = b""
+        for _ in range(entry_count):
+            shared_key, offset = _decode_varint(data, offset)
+            key_length, offset = _decode_varint(data, offset)
+            shared_value, offset = _decode_varint(data, offset)
+            value_length, offset = _decode_varint(data, offset)
+            key = key[:shared_key] + data[offset:offset + key_length]
+            offset += key_length
+            value = value[:shared_value] + data[offset:offset + value_length]
+            offset += value_length
+            yield key, value
+
+    def lookup(self, identifier: str) -> Optional[str]:
+        """Return the pinned path of an asset identifier.
+
+        Args:
+            identifier: The asset identifier to look up.
+
+        Returns: The pinned path or None if the identifier is not pinned.
+
+        """
+        key = identifier.encode("utf-8")
+
+        # Find the last restart entry not greater than the key
+        low, high = 0, self._restart_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_restart_key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+
+        for entry_key, value in self._iter_block(low - 1):
+            if entry_key == key:
+                return value.decode("utf-8")
+            if entry_key > key:
+                break
+        return None
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """Yield all identifiers with their pinned paths in sorted order."""
+        for restart_index in range(self._restart_count):
+            for key, value in self._iter_block(restart_index):
+                yield key.decode("utf-8"), value.decode("utf-8")
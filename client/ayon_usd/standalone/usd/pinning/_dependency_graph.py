@@ -0,0 +1,344 @@
+import json
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from ._pinning_file_writer import atomic_write
+
+# Arc types of the edges of the dependency graph
+ARC_ASSET = "asset"
+ARC_SUBLAYER = "sublayer"
+ARC_REFERENCE = "reference"
+ARC_PAYLOAD = "payload"
+ARC_TYPES = (ARC_ASSET, ARC_SUBLAYER, ARC_REFERENCE, ARC_PAYLOAD)
+
+DEPENDENCY_GRAPH_VERSION = 1
+
+# Prefix of the identifiers of anonymous layers, see
+# `Sdf.Layer.IsAnonymousLayerIdentifier`
+ANONYMOUS_LAYER_PREFIX = "anon:"
+
+
+class LayerDependency(NamedTuple):
+    """Composition arc from a layer to another layer.
+
+    Attributes:
+        search_path: The path the layer is pinned by, the authored URI or
+            the resolved path.
+        resolved_path: The resolved path of the authored asset path.
+        layer_key: The resolved path identifying the layer, empty if it
+            could not be resolved.
+        arc_type: `ARC_SUBLAYER`, `ARC_REFERENCE` or `ARC_PAYLOAD`.
+    """
+    search_path: str
+    resolved_path: str
+    layer_key: str
+    arc_type: str
+
+
+class LayerScan(NamedTuple):
+    """Asset dependencies found in a single layer.
+
+    Attributes:
+        entries: Asset identifiers mapped to their resolved paths, in the
+            order they are written to the dependency mapping.
+        dependencies: The composition arcs of the layer (sublayers,
+            references and payloads), in authored order.
+    """
+    entries: List[Tuple[str, str]]
+    dependencies: List[LayerDependency]
+
+
+def iter_layer_entries(
+    layer_path: str,
+    layer_key: str,
+    get_scan: Callable[[str], Optional[LayerScan]],
+    processed_layers: Set[str],
+) -> Iterator[Tuple[str, str]]:
+    """Yield the pinning entries of a layer graph in depth first order.
+
+    Uses an explicit work stack instead of recursion so deep sublayer or
+    reference chains do not hit the interpreter recursion limit.
+
+    Anonymous layers are traversed but not yielded, they only exist in the
+    session that created them.
+
+    Args:
+        layer_path: The search path of the root layer, without file format
+            arguments.
+        layer_key: The resolved path of the root layer.
+        get_scan: Function returning the scan of a layer by its layer key.
+        processed_layers: Layer keys that should be skipped. Layers visited
+            are added to it.
+
+    """
+    # Stack of layers still to visit, popped in depth first order.
+    # Children are pushed in reverse so they are visited in their authored
+    # order. The mapping of a child's search path is yielded when it is
+    # popped so the entries keep the order of a recursive traversal.
+    stack: List[Tuple[str, Optional[str], str]] = [
+        (layer_path, None, layer_key)
+    ]
+    while stack:
+        search_path, resolved_path_str, layer_key = stack.pop()
+        anonymous = search_path.startswith(ANONYMOUS_LAYER_PREFIX)
+        if resolved_path_str is not None and not anonymous:
+            yield search_path, resolved_path_str
+
+        if not layer_key or layer_key in processed_layers:
+            continue
+        processed_layers.add(layer_key)
+
+        scan = get_scan(layer_key)
+        if scan is None:
+            continue
+
+        if not anonymous:
+            yield search_path, layer_key
+        yield from scan.entries
+        stack.extend(
+            dependency[:3] for dependency in reversed(scan.dependencies)
+        )
+
+
+class DependencyGraph:
+    """Dependency graph of the layers and assets of a USD scene.
+
+    The nodes are layers, identified by their resolved path, and the assets
+    they use. Every layer has asset edges to the resolved paths of its
+    asset identifiers and composition edges of the arc types
+    `ARC_SUBLAYER`, `ARC_REFERENCE` and `ARC_PAYLOAD` to the layers it
+    composes. Layers that could not be opened have no edges.
+
+    The flat pinning data is derived from the graph in the same order as
+    `iter_asset_dependencies` yields it, without opening the layers again.
+
+    Args:
+        layer_path: The search path of the root layer, without file format
+            arguments.
+        layer_key: The resolved path of the root layer.
+        layers: The scan of every layer reachable from the root layer by
+            its layer key, None for layers that could not be opened.
+    """
+
+    def __init__(
+        self,
+        layer_path: str,
+        layer_key: str,
+        layers: Dict[str, Optional[LayerScan]],
+    ):
+        self.layer_path = layer_path
+        self.layer_key = layer_key
+        self.layers = layers
+        self._dependents: Optional[Dict[str, List[Tuple[str, str]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.layers)
+
+    def __contains__(self, layer_key: str) -> bool:
+        return layer_key in self.layers
+
+    def iter_edges(self) -> Iterator[Tuple[str, str, str, str]]:
+        """Yield all edges of the graph.
+
+        Yields: The source layer key, target path, identifier of the target
+            in the source layer and arc type of each edge. The target of a
+            composition edge is its layer key.
+
+        """
+        for layer_key, scan in self.layers.items():
+            if scan is None:
+                continue
+            for identifier, path in scan.entries:
+                yield layer_key, path, identifier, ARC_ASSET
+            for dependency in scan.dependencies:
+                yield (
+                    layer_key,
+                    dependency.layer_key,
+                    dependency.search_path,
+                    dependency.arc_type,
+                )
+
+    def get_dependencies(self, layer_key: str) -> List[Tuple[str, str]]:
+        """Return the paths a layer depends on directly.
+
+        Args:
+            layer_key: The resolved path of the layer.
+
+        Returns: The target path and arc type of each edge of the layer.
+
+        """
+        scan = self.layers.get(layer_key)
+        if scan is None:
+            return []
+        dependencies = [(path, ARC_ASSET) for _, path in scan.entries]
+        dependencies.extend(
+            (dependency.layer_key, dependency.arc_type)
+            for dependency in scan.dependencies
+        )
+        return dependencies
+
+    def get_dependents(self, path: str) -> List[Tuple[str, str]]:
+        """Return the layers that directly depend on a layer or asset.
+
+        Args:
+            path: The resolved path of the layer or asset.
+
+        Returns: The layer key and arc type of each edge to the path.
+
+        """
+        if self._dependents is None:
+            self._dependents = {}
+            for layer_key, target, _, arc_type in self.iter_edges():
+                self._dependents.setdefault(target, []).append(
+                    (layer_key, arc_type)
+                )
+        return list(self._dependents.get(path, []))
+
+    def get_all_dependents(self, path: str) -> Set[str]:
+        """Return all layers that depend on a layer or asset, transitively.
+
+        These are the layers whose pinning is affected when the layer or
+        asset changes.
+
+        Args:
+            path: The resolved path of the layer or asset.
+
+        Returns: The layer keys of the dependent layers.
+
+        """
+        dependents: Set[str] = set()
+        stack = [path]
+        while stack:
+            for layer_key, _ in self.get_dependents(stack.pop()):
+                if layer_key not in dependents:
+                    dependents.add(layer_key)
+                    stack.append(layer_key)
+        return dependents
+
+    def iter_pinning_entries(self) -> Iterator[Tuple[str, str]]:
+        """Yield all asset identifiers with their resolved paths.
+
+        The entries are the same as `iter_asset_dependencies` yields for
+        the root layer.
+        """
+        return iter_layer_entries(
+            self.layer_path, self.layer_key, self.layers.get, set()
+        )
+
+    def get_pinning_data(self) -> Dict[str, str]:
+        """Return the mapping from asset identifier to resolved path."""
+        return dict(self.iter_pinning_entries())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the graph in its compact JSON serializable form.
+
+        Every path and identifier is stored once in a string table. A layer
+        is the index of its layer key, followed by flat index lists of its
+        asset edges as identifier and path pairs and of its composition
+        edges as search path, resolved path, layer key and arc type, or
+        None if it could not be opened.
+        """
+        strings: Dict[str, int] = {}
+
+        def intern(string: str) -> int:
+            return strings.setdefault(string, len(strings))
+
+        arc_indices = {arc_type: index for index, arc_type in enumerate(
+            ARC_TYPES
+        )}
+        layers = []
+        for layer_key, scan in self.layers.items():
+            if scan is None:
+                layers.append([intern(layer_key), None, None])
+                continue
+
+            assets = []
+            for identifier, path in scan.entries:
+                assets.extend((intern(identifier), intern(path)))
+            dependencies = []
+            for dependency in scan.dependencies:
+                dependencies.extend((
+                    intern(dependency.search_path),
+                    intern(dependency.resolved_path),
+                    intern(dependency.layer_key),
+                    arc_indices[dependency.arc_type],
+                ))
+            layers.append([intern(layer_key), assets, dependencies])
+
+        return {
+            "version": DEPENDENCY_GRAPH_VERSION,
+            "arc_types": list(ARC_TYPES),
+            "root": [intern(self.layer_path), intern(self.layer_key)],
+            "strings": list(strings),
+            "layers": layers,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DependencyGraph":
+        """Create a graph from its compact form, see `to_dict`.
+
+        Raises:
+            ValueError: If the version of the data is not supported.
+
+        """
+        version = data.get("version")
+        if version != DEPENDENCY_GRAPH_VERSION:
+            raise ValueError(
+                f"Unsupported dependency graph version {version}"
+            )
+
+        strings = data["strings"]
+        arc_types = data["arc_types"]
+        layers: Dict[str, Optional[LayerScan]] = {}
+        for key_index, assets, dependencies in data["layers"]:
+            layer_key = strings[key_index]
+            if assets is None:
+                layers[layer_key] = None
+                continue
+
+            entries = [
+                (strings[assets[index]], strings[assets[index + 1]])
+                for index in range(0, len(assets), 2)
+            ]
+            layer_dependencies = [
+                LayerDependency(
+                    strings[dependencies[index]],
+                    strings[dependencies[index + 1]],
+                    strings[dependencies[index + 2]],
+                    arc_types[dependencies[index + 3]],
+                )
+                for index in range(0, len(dependencies), 4)
+            ]
+            layers[layer_key] = LayerScan(entries, layer_dependencies)
+
+        path_index, key_index = data["root"]
+        return cls(strings[path_index], strings[key_index], layers)
+
+
+def write_dependency_graph(output_path: str, graph: DependencyGraph):
+    """Write a dependency graph as compact JSON file.
+
+    The file is written atomically through a temporary file.
+
+    Args:
+        output_path: Path of the JSON file.
+        graph: The graph to write.
+
+    """
+    with atomic_write(output_path) as graph_file:
+        json.dump(graph.to_dict(), graph_file, separators=(",", ":"))
+
+
+def read_dependency_graph(graph_file: str) -> DependencyGraph:
+    """Read a dependency graph written by `write_dependency_graph`."""
+    with open(graph_file, encoding="utf-8") as file:
+        return DependencyGraph.from_dict(json.load(file))
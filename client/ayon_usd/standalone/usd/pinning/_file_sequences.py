@@ -0,0 +1,263 @@
+import bisect
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from ._path_store import split_pinned_path
+
+UDIM_TAG = "<UDIM>"
+
+# First tile of the UDIM tile numbering
+UDIM_START_TILE = 1001
+
+_DIGITS_REGEX = re.compile(r"\d{4,}")
+
+# Frame number tokens: Houdini `$F`/`$F4`, hash padding `####` including
+# value clip template subframes `###.###` and printf style `%04d`
+_FRAME_TOKEN_REGEX = re.compile(r"\$F(\d?)|(#+)(?:\.(#+))?|%0?(\d*)d")
+
+
+def has_frame_token(path: str) -> bool:
+    """Return whether the file name of a path contains a frame token."""
+    _, name = split_pinned_path(path)
+    return _FRAME_TOKEN_REGEX.search(name) is not None
+
+
+def _get_frame_digits_pattern(padding: int) -> str:
+    if padding > 1:
+        return rf"-?\d{{{padding},}}"
+    return r"-?\d+"
+
+
+def _compile_frame_pattern(name: str, flags: int) -> Pattern:
+    """Compile a regex matching the file names of a frame token pattern.
+
+    The frame number of each token is captured in a group.
+    """
+    pattern = ""
+    position = 0
+    for match in _FRAME_TOKEN_REGEX.finditer(name):
+        pattern += re.escape(name[position:match.start()])
+        houdini_padding, hashes, subframe_hashes, printf_padding = (
+            match.groups()
+        )
+        if hashes is not None:
+            digits = _get_frame_digits_pattern(len(hashes))
+            if subframe_hashes is not None:
+                digits += rf"\.\d{{{len(subframe_hashes)}}}"
+        elif printf_padding is not None:
+            digits = _get_frame_digits_pattern(int(printf_padding or 1))
+        else:
+            digits = _get_frame_digits_pattern(int(houdini_padding or 1))
+        pattern += f"({digits})"
+        position = match.end()
+    pattern += re.escape(name[position:])
+    return re.compile(pattern, flags)
+
+
+class FileSequenceExpander:
+    """Expand file paths with tile or frame tokens to the files on disk.
+
+    Each directory is listed only once with `os.scandir` and the listing is
+    kept for the lifetime of the expander, usually one pinning run. The
+    tokens are matched against the cached listing in memory, so many
+    materials using the textures of the same directory do not access the
+    file system again.
+
+    The expander can be shared by threads.
+
+    Args:
+        case_sensitive: Whether file names are matched case-sensitive.
+            Defaults to False on Windows and True otherwise.
+    """
+
+    def __init__(self, case_sensitive: Optional[bool] = None):
+        if case_sensitive is None:
+            case_sensitive = not sys.platform.startswith("win")
+        self._case_sensitive = case_sensitive
+        self.listing_count = 0
+        self._listings: Dict[str, Optional[List[str]]] = {}
+        self._tile_indices: Dict[
+            str, Dict[str, List[Tuple[int, str]]]
+        ] = {}
+        self._udim_tiles: Dict[str, Optional[List[Tuple[str, str]]]] = {}
+        self._frame_paths: Dict[str, Optional[List[Tuple[str, str]]]] = {}
+        self._sorted_names: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    def _normalize_name(self, name: str) -> str:
+        if self._case_sensitive:
+            return name
+        return name.lower()
+
+    def list_directory(self, directory: str) -> Optional[List[str]]:
+        """Return the names of the files in a directory.
+
+        Args:
+            directory: The directory to list.
+
+        Returns: The file names or None if the directory can not be listed,
+            e.g. because it does not exist or is no file system path.
+
+        """
+        if directory in self._listings:
+            return self._listings[directory]
+
+        try:
+            with os.scandir(directory) as entries:
+                file_names = [
+                    entry.name for entry in entries if entry.is_file()
+                ]
+        except FileNotFoundError:
+            # A missing directory on the file system has no files
+            file_names = [] if os.path.isabs(directory) else None
+        except (OSError, ValueError):
+            file_names = None
+        self.listing_count += 1
+        self._listings[directory] = file_names
+        return file_names
+
+    def _get_sorted_names(
+        self, directory: str
+    ) -> Optional[Tuple[List[str], List[str]]]:
+        """Return the file names of a directory sorted by normalized name.
+
+        Returns: The sorted normalized names and the file names in the same
+            order, or None if the directory can not be listed.
+        """
+        sorted_names = self._sorted_names.get(directory)
+        if sorted_names is not None:
+            return sorted_names
+
+        file_names = self.list_directory(directory)
+        if file_names is None:
+            return None
+
+        named_files = sorted(
+            (self._normalize_name(name), name) for name in file_names
+        )
+        sorted_names = (
+            [normalized_name for normalized_name, _ in named_files],
+            [name for _, name in named_files],
+        )
+        self._sorted_names[directory] = sorted_names
+        return sorted_names
+
+    def _get_tile_index(
+        self, directory: str
+    ) -> Optional[Dict[str, List[Tuple[int, str]]]]:
+        """Return the files of a directory by their UDIM pattern.
+
+        Every run of four digits in a file name is a tile candidate, so
+        `color.1001.exr` is indexed as `color.<UDIM>.exr` with tile 1001.
+        """
+        tile_index = self._tile_indices.get(directory)
+        if tile_index is not None:
+            return tile_index
+
+        file_names = self.list_directory(directory)
+        if file_names is None:
+            return None
+
+        tile_index = {}
+        for name in file_names:
+            for match in _DIGITS_REGEX.finditer(name):
+                # Longer digit runs contain several candidate tiles
+                for start in range(match.start(), match.end() - 3):
+                    tile = int(name[start:start + 4])
+                    if tile < UDIM_START_TILE:
+                        continue
+                    pattern = self._normalize_name(
+                        name[:start] + UDIM_TAG + name[start + 4:]
+                    )
+                    tile_index.setdefault(pattern, []).append((tile, name))
+
+        for tiles in tile_index.values():
+            tiles.sort()
+        self._tile_indices[directory] = tile_index
+        return tile_index
+
+    def expand_udim(self, udim_path: str) -> Optional[List[Tuple[str, str]]]:
+        """Return the tiles of an UDIM path that exist on disk.
+
+        Args:
+            udim_path: Absolute path with the `<UDIM>` tag in its file name.
+
+        Returns: The tile number and path of each existing tile sorted by
+            tile, or None if the tiles can not be found from the directory
+            listing, e.g. when the tag is not in the file name or the path
+            is not on the file system.
+
+        """
+        if udim_path in self._udim_tiles:
+            return self._udim_tiles[udim_path]
+
+        tiles = None
+        directory, name = split_pinned_path(udim_path)
+        if directory and name.count(UDIM_TAG) == 1:
+            tile_index = self._get_tile_index(directory)
+            if tile_index is not None:
+                tiles = [
+                    (str(tile), directory + file_name)
+                    for tile, file_name in tile_index.get(
+                        self._normalize_name(name), []
+                    )
+                ]
+        self._udim_tiles[udim_path] = tiles
+        return tiles
+
+    def expand_frames(
+        self, sequence_path: str
+    ) -> Optional[List[Tuple[str, str]]]:
+        """Return the frames of a file sequence path that exist on disk.
+
+        The frame tokens `$F`, `$F4`, `####`, `###.###` and `%04d` in the
+        file name of the path are matched against the listing of its
+        directory, so all frames are found with a single listing instead of
+        resolving each frame. A token pads the frame number to at least its
+        width.
+
+        Args:
+            sequence_path: Absolute path with frame tokens in its file name.
+
+        Returns: The frame number and path of each existing frame sorted by
+            frame, or None if the path has no frame token in its file name
+            or its directory can not be listed.
+
+        """
+        if sequence_path in self._frame_paths:
+            return self._frame_paths[sequence_path]
+
+        frames = None
+        directory, name = split_pinned_path(sequence_path)
+        sorted_names = None
+        token = _FRAME_TOKEN_REGEX.search(name)
+        if directory and token is not None:
+            sorted_names = self._get_sorted_names(directory)
+
+        if sorted_names is not None:
+            flags = 0 if self._case_sensitive else re.IGNORECASE
+            pattern = _compile_frame_pattern(name, flags)
+            # Only the names starting with the text before the first token
+            # can match
+            prefix = self._normalize_name(name[:token.start()])
+            normalized_names, file_names = sorted_names
+            frame_files = []
+            for index in range(
+                bisect.bisect_left(normalized_names, prefix),
+                len(normalized_names),
+            ):
+                if not normalized_names[index].startswith(prefix):
+                    break
+                file_name = file_names[index]
+                match = pattern.fullmatch(file_name)
+                if match is not None:
+                    frame = match.group(1)
+                    frame_files.append((float(frame), frame, file_name))
+            frame_files.sort()
+            frames = [
+                (frame, directory + file_name)
+                for _, frame, file_name in frame_files
+            ]
+        self._frame_paths[sequence_path] = frames
+        return frames
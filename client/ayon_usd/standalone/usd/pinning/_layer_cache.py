@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Bump when the format of the cached layer data changes. Caches written
+# with another version are cleared on open.
+CACHE_VERSION = 3
+
+
+def get_file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Return modification time and size of a file or None if missing."""
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LayerDependencyCache:
+    """Persistent cache of the asset paths authored in USD layers.
+
+    The cache is a SQLite database storing the data read from each layer
+    keyed by the resolved layer path. Entries are only used while the
+    modification time and size of the layer file are unchanged, so layers
+    that changed since they were cached are read again.
+
+    Only data read from the layer file itself is cached. Resolving the
+    asset paths still happens on every pinning run as e.g. AYON URIs may
+    resolve to a newer version.
+
+    The cache can be shared by threads and pickled to worker processes,
+    each of them opens its own connection to the database. The database
+    should be on a local disk as SQLite locking is unreliable on network
+    storage.
+
+    Args:
+        path: Filepath of the SQLite database. Created if it does not
+            exist.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect()
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=60)
+        with connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != CACHE_VERSION:
+                connection.execute("DROP TABLE IF EXISTS layers")
+                connection.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS layers ("
+                "layer_path TEXT PRIMARY KEY, "
+                "mtime_ns INTEGER NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "data TEXT NOT NULL)"
+            )
+        self._local.connection = connection
+        return connection
+
+    def get_or_read(
+        self, layer_path: str, read: Callable[[str], Optional[Any]]
+    ) -> Optional[Any]:
+        """Return the cached data of a layer, reading it on a cache miss.
+
+        Args:
+            layer_path: Resolved path of the layer.
+            read: Function reading the JSON serializable data from the layer
+                at the given path. Results of None are not cached.
+
+        Returns: The cached or read data of the layer.
+
+        """
+        # Take the signature before reading so a layer changing while it is
+        # read is not cached as unchanged.
+        signature = get_file_signature(layer_path)
+        if signature is None:
+            # Not a file on disk, e.g. an in-memory layer
+            return read(layer_path)
+
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT mtime_ns, size, data FROM layers WHERE layer_path = ?",
+            (layer_path,)
+        ).fetchone()
+        if row is not None and tuple(row[:2]) == signature:
+            return json.loads(row[2])
+
+        data = read(layer_path)
+        if data is None:
+            return None
+
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO layers VALUES (?, ?, ?, ?)",
+                    (layer_path, *signature, json.dumps(data)),
+                )
+        except sqlite3.OperationalError as exc:
+            # Another process locking the database must not fail pinning
+            log.warning(f"Unable to cache layer {layer_path}: {exc}")
+        return data
+
+    def clear(self):
+        """Remove all cached layers."""
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM layers")
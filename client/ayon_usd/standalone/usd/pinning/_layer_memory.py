@@ -0,0 +1,154 @@
+import ctypes
+import os
+import sys
+import threading
+from typing import Optional
+
+from pxr import Sdf
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    """`PROCESS_MEMORY_COUNTERS` of the Windows process status API."""
+    _fields_ = [
+        ("cb", ctypes.c_ulong),
+        ("PageFaultCount", ctypes.c_ulong),
+        ("PeakWorkingSetSize", ctypes.c_size_t),
+        ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t),
+        ("PeakPagefileUsage", ctypes.c_size_t),
+    ]
+
+
+def _get_windows_rss() -> Optional[int]:
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(
+        process, ctypes.byref(counters), counters.cb
+    ):
+        return None
+    return counters.WorkingSetSize
+
+
+def get_rss() -> Optional[int]:
+    """Return the resident set size of the current process in bytes.
+
+    On macOS only the peak resident set size of the process is available,
+    which is returned instead.
+
+    Returns: The resident set size or None if it can not be determined.
+
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as statm:
+                resident_pages = int(statm.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+    if sys.platform.startswith("win"):
+        try:
+            return _get_windows_rss()
+        except (AttributeError, OSError):
+            return None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Reported in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class LayerMemoryStats:
+    """Memory held by the USD layers of a pinning run.
+
+    Every layer is released as soon as it is scanned, unless it was already
+    loaded before, e.g. by a stage of the host session. The stats count the
+    layers loaded at the same time to verify the run stays bounded, and
+    the layers the run opened that are still loaded after they were
+    released because something else holds them.
+
+    The loaded layers are counted when the stats are created and whenever
+    `sample` is called, the layers opened in between are tracked without
+    listing all loaded layers. The stats can be shared by threads. Layers
+    scanned in worker processes are not counted.
+
+    Attributes:
+        peak_layer_count: Peak number of loaded layers, including the
+            layers that were loaded before the run.
+        peak_rss: Peak resident set size of the process in bytes, or None
+            if it can not be determined.
+        opened_layer_count: Number of layers opened by the run.
+        retained_layer_count: Number of layers opened by the run that were
+            still loaded after the run released them.
+    """
+
+    def __init__(self):
+        self.peak_layer_count = 0
+        self.peak_rss: Optional[int] = None
+        self.opened_layer_count = 0
+        self.retained_layer_count = 0
+        self._loaded_layer_count = 0
+        self._open_layer_count = 0
+        self._lock = threading.Lock()
+        self.sample()
+
+    def _update_peaks(self):
+        self.peak_layer_count = max(
+            self.peak_layer_count,
+            self._loaded_layer_count
+            + self._open_layer_count
+            + self.retained_layer_count,
+        )
+        rss = get_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+
+    def sample(self):
+        """Count the loaded layers and sample the resident set size."""
+        loaded_layer_count = len(Sdf.Layer.GetLoadedLayers())
+        with self._lock:
+            # Layers opened since the last sample are counted again below
+            self._loaded_layer_count = (
+                loaded_layer_count
+                - self._open_layer_count
+                - self.retained_layer_count
+            )
+            self._update_peaks()
+
+    def add_open_layer(self):
+        """Count a layer opened by the run, while it is still open."""
+        with self._lock:
+            self.opened_layer_count += 1
+            self._open_layer_count += 1
+            self._update_peaks()
+
+    def remove_open_layer(self, retained: bool):
+        """Count a layer released by the run.
+
+        Args:
+            retained: Whether the layer is still loaded after the release.
+
+        """
+        with self._lock:
+            self._open_layer_count -= 1
+            if retained:
+                self.retained_layer_count += 1
+
+    def summary(self) -> str:
+        """Return a human readable summary of the stats."""
+        peak_rss = "unknown"
+        if self.peak_rss is not None:
+            peak_rss = f"{self.peak_rss / 1024 ** 2:.1f} MiB"
+        return (
+            f"Opened {self.opened_layer_count} layers, "
+            f"{self.retained_layer_count} stayed loaded after their scan. "
+            f"Peak loaded layers: {self.peak_layer_count}, "
+            f"peak RSS: {peak_rss}"
+        )
@@ -0,0 +1,220 @@
+from array import array
+from collections.abc import ItemsView, Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Value directory index of entries whose path is their identifier
+_SELF_PINNED = 0xFFFFFFFF
+
+# Marker of an empty hash table slot
+_EMPTY_SLOT = -1
+
+
+def split_pinned_path(path: str) -> Tuple[str, str]:
+    """Split a path into its directory, including the separator, and name."""
+    separator_index = max(path.rfind("/"), path.rfind("\\"))
+    return path[:separator_index + 1], path[separator_index + 1:]
+
+
+class _PathStoreItems(ItemsView):
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self._mapping.iter_items()
+
+
+class PathStore(Mapping):
+    """Compact mapping from asset identifier to pinned path.
+
+    Pinning data of large shots maps millions of identifiers, mostly UDIM
+    tiles and sequence frames, to paths sharing few directories. A `dict`
+    stores every full path as its own string. The store keeps every
+    directory only once and the file names as UTF-8 bytes in a single
+    buffer. Entries are rows of integer arrays referencing them. Paths
+    pinned to their identifier store no path at all and paths with the
+    file name of their identifier share its name. The entries are
+    looked up through an open addressing hash table of entry indices, so no
+    string is kept per entry.
+
+    The store reads like a `dict` in insertion order. Setting an existing
+    identifier replaces its path, like a `dict`, while `add` and
+    `setdefault` keep the first path. Entries can not be removed.
+
+    Args:
+        entries: Pairs of asset identifier and pinned path to add, the
+            last path of an identifier wins like in `dict`.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()):
+        self._directories: List[str] = []
+        self._directory_indices: Dict[str, int] = {}
+        self._names = bytearray()
+        self._hashes = array("q")
+        self._key_directories = array("I")
+        self._key_offsets = array("Q")
+        self._key_lengths = array("I")
+        self._value_directories = array("I")
+        self._value_offsets = array("Q")
+        self._value_lengths = array("I")
+        self._slots = array("i", [_EMPTY_SLOT]) * 8
+        for identifier, path in entries:
+            self[identifier] = path
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self._hashes)):
+            yield self._get_key(index)
+
+    def __contains__(self, identifier) -> bool:
+        return self._find(identifier) is not None
+
+    def __getitem__(self, identifier: str) -> str:
+        index = self._find(identifier)
+        if index is None:
+            raise KeyError(identifier)
+        return self._get_value(index)
+
+    def __setitem__(self, identifier: str, path: str):
+        index = self._find(identifier)
+        if index is None:
+            self._append(identifier, path)
+        else:
+            self._set_value(index, identifier, path)
+
+    def get(self, identifier: str, default: Optional[str] = None):
+        index = self._find(identifier)
+        if index is None:
+            return default
+        return self._get_value(index)
+
+    def items(self) -> _PathStoreItems:
+        return _PathStoreItems(self)
+
+    def iter_items(self) -> Iterator[Tuple[str, str]]:
+        """Yield all identifiers with their paths in insertion order."""
+        for index in range(len(self._hashes)):
+            key = self._get_key(index)
+            if self._value_directories[index] == _SELF_PINNED:
+                yield key, key
+            else:
+                yield key, self._get_value(index)
+
+    def add(self, identifier: str, path: str) -> bool:
+        """Add the path of an identifier, unless the identifier exists.
+
+        Args:
+            identifier: The asset identifier.
+            path: The path the identifier is pinned to.
+
+        Returns: Whether the entry was added.
+
+        """
+        if self._find(identifier) is not None:
+            return False
+        self._append(identifier, path)
+        return True
+
+    def setdefault(self, identifier: str, path: str) -> str:
+        index = self._find(identifier)
+        if index is None:
+            self._append(identifier, path)
+            return path
+        return self._get_value(index)
+
+    @property
+    def directory_count(self) -> int:
+        """Number of unique directories stored."""
+        return len(self._directories)
+
+    def _add_directory(self, directory: str) -> int:
+        directory_index = self._directory_indices.get(directory)
+        if directory_index is None:
+            directory_index = len(self._directories)
+            self._directories.append(directory)
+            self._directory_indices[directory] = directory_index
+        return directory_index
+
+    def _add_name(self, name: str) -> Tuple[int, int]:
+        encoded = name.encode("utf-8")
+        offset = len(self._names)
+        self._names += encoded
+        return offset, len(encoded)
+
+    def _get_path(self, directory_index: int, offset: int, length: int):
+        name = self._names[offset:offset + length].decode("utf-8")
+        return self._directories[directory_index] + name
+
+    def _get_key(self, index: int) -> str:
+        return self._get_path(
+            self._key_directories[index],
+            self._key_offsets[index],
+            self._key_lengths[index],
+        )
+
+    def _get_value(self, index: int) -> str:
+        directory_index = self._value_directories[index]
+        if directory_index == _SELF_PINNED:
+            return self._get_key(index)
+        return self._get_path(
+            directory_index,
+            self._value_offsets[index],
+            self._value_lengths[index],
+        )
+
+    def _find(self, identifier: str) -> Optional[int]:
+        """Return the entry index of an identifier or None."""
+        identifier_hash = hash(identifier)
+        mask = len(self._slots) - 1
+        slot = identifier_hash & mask
+        while True:
+            index = self._slots[slot]
+            if index == _EMPTY_SLOT:
+                return None
+            if (
+                self._hashes[index] == identifier_hash
+                and self._get_key(index) == identifier
+            ):
+                return index
+            slot = (slot + 1) & mask
+
+    def _insert_slot(self, index: int):
+        mask = len(self._slots) - 1
+        slot = self._hashes[index] & mask
+        while self._slots[slot] != _EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        self._slots[slot] = index
+
+    def _set_value(self, index: int, identifier: str, path: str):
+        if path == identifier:
+            self._value_directories[index] = _SELF_PINNED
+            return
+
+        directory, name = split_pinned_path(path)
+        self._value_directories[index] = self._add_directory(directory)
+        if name == split_pinned_path(identifier)[1]:
+            # Relative identifiers mostly share the file name of their path
+            offset = self._key_offsets[index]
+            length = self._key_lengths[index]
+        else:
+            offset, length = self._add_name(name)
+        self._value_offsets[index] = offset
+        self._value_lengths[index] = length
+
+    def _append(self, identifier: str, path: str):
+        index = len(self._hashes)
+        # Keep the hash table at most half full
+        if (index + 1) * 2 > len(self._slots):
+            self._slots = array("i", [_EMPTY_SLOT]) * (len(self._slots) * 2)
+            for existing_index in range(index):
+                self._insert_slot(existing_index)
+
+        directory, name = split_pinned_path(identifier)
+        key_offset, key_length = self._add_name(name)
+        self._hashes.append(hash(identifier))
+        self._key_directories.append(self._add_directory(directory))
+        self._key_offsets.append(key_offset)
+        self._key_lengths.append(key_length)
+        self._value_directories.append(_SELF_PINNED)
+        self._value_offsets.append(0)
+        self._value_lengths.append(0)
+        self._set_value(index, identifier, path)
+        self._insert_slot(index)
@@ -0,0 +1,185 @@
+import json
+import os
+from typing import Dict, Iterable, MutableMapping, Optional, Tuple
+
+from ._path_store import PathStore
+from ._pinning_file_reader import get_file_checksum, read_pinning_file
+from ._pinning_file_writer import (
+    PINNING_DELTA_KEY,
+    PINNING_SCHEMA_VERSION,
+    PinningFileWriter,
+    atomic_write,
+)
+
+
+def _get_base_reference(output_path: str, base_pinning_file: str) -> str:
+    """Return the path of the base pinning file stored in a delta.
+
+    The path is relative to the directory of the delta pinning file when
+    possible, so publishes can be moved or remapped to other roots.
+    """
+    base_pinning_file = os.path.abspath(base_pinning_file)
+    try:
+        return os.path.relpath(
+            base_pinning_file, os.path.dirname(os.path.abspath(output_path))
+        ).replace("\\", "/")
+    except ValueError:
+        # Different drives on Windows
+        return base_pinning_file
+
+
+class PinningDeltaWriter:
+    """Writer of delta pinning files relative to a base pinning file.
+
+    Consecutive publishes of a shot mostly pin the same paths. Instead of
+    all entries a delta pinning file only stores the entries added, changed
+    and removed since the base pinning file, the path of the base relative
+    to the delta and the checksum of the base:
+
+        {
+            "ayon_resolver_pinning_delta": {
+                "base": "../v001/shot_pin.json",
+                "base_sha256": "5f1d...",
+                "added": {"./new.usd": "{root[work]}/new.usd"},
+                "changed": {"./a.usd": "{root[work]}/a_v002.usd"},
+                "removed": ["./old.usd"]
+            }
+        }
+
+    The AYON USD Resolver can only read full pinning files, use
+    `materialize_pinning_file` to write the full pinning file of a delta.
+    `read_pinning_file` applies deltas to their base.
+
+    Like `PinningFileWriter` the last path added for an identifier is
+    used. The delta is written atomically when the writer is closed
+    without an error. Use it as a context manager.
+
+    Args:
+        output_path: Path of the delta pinning file to write.
+        base_pinning_file: Path of the pinning file the delta is relative
+            to, which can be a delta pinning file itself.
+        indent: Indentation of the JSON output. The output is compact
+            without any whitespace by default.
+        compact_entries: Track the added entries in a `PathStore` instead
+            of a `dict`, see `PinningFileWriter`.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        base_pinning_file: str,
+        indent: Optional[int] = None,
+        compact_entries: bool = False,
+    ):
+        if not output_path.endswith(".json"):
+            raise TypeError("output_path is not a json")
+        if os.path.abspath(output_path) == os.path.abspath(base_pinning_file):
+            raise ValueError("A delta can not replace its base pinning file")
+
+        self.output_path = output_path
+        self.base_pinning_file = base_pinning_file
+        self._indent = indent
+        self._base_checksum = get_file_checksum(base_pinning_file)
+        self._base_data = read_pinning_file(base_pinning_file)
+        self._entries: MutableMapping[str, str] = (
+            PathStore() if compact_entries else {}
+        )
+        self._added: Dict[str, str] = {}
+        self._changed: Dict[str, str] = {}
+        self._closed = False
+
+    def __enter__(self) -> "PinningDeltaWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def write(self, identifier: str, path: str):
+        """Add the pinned path of an asset identifier.
+
+        Args:
+            identifier: The asset identifier to pin.
+            path: The path the identifier is pinned to.
+
+        """
+        self._entries[identifier] = path
+
+        base_path = self._base_data.get(identifier)
+        if base_path is None:
+            self._added[identifier] = path
+        elif base_path != path:
+            self._changed[identifier] = path
+        else:
+            self._changed.pop(identifier, None)
+
+    def write_entries(self, entries: Iterable[Tuple[str, str]]):
+        """Add the pinned paths of many asset identifiers.
+
+        Args:
+            entries: Pairs of asset identifier and pinned path.
+
+        """
+        for identifier, path in entries:
+            self.write(identifier, path)
+
+    def close(self):
+        """Write the delta pinning file to the output path."""
+        if self._closed:
+            return
+        self._closed = True
+
+        delta = {
+            "base": _get_base_reference(
+                self.output_path, self.base_pinning_file
+            ),
+            "base_sha256": self._base_checksum,
+            "added": self._added,
+            "changed": self._changed,
+            "removed": [
+                identifier
+                for identifier in self._base_data
+                if identifier not in self._entries
+            ],
+        }
+        separators = (",", ":") if self._indent is None else None
+
+        with atomic_write(self.output_path) as delta_file:
+            json.dump(
+                {PINNING_DELTA_KEY: delta},
+                delta_file,
+                indent=self._indent,
+                separators=separators,
+            )
+
+    def abort(self):
+        """Discard the delta, keeping an existing output file."""
+        self._closed = True
+
+
+def materialize_pinning_file(
+    pinning_file: str,
+    output_path: str,
+    indent: Optional[int] = None,
+    schema_version: int = PINNING_SCHEMA_VERSION,
+):
+    """Write the full pinning file of a delta pinning file.
+
+    Args:
+        pinning_file: Path of the delta pinning file. Full pinning files
+            are rewritten as they are.
+        output_path: Path of the full pinning file to write.
+        indent: Indentation of the JSON output.
+        schema_version: Version of the pinning file schema to write.
+
+    """
+    pinning_data = read_pinning_file(pinning_file)
+    with PinningFileWriter(
+        output_path, indent=indent, schema_version=schema_version
+    ) as writer:
+        writer.write_entries(pinning_data.items())
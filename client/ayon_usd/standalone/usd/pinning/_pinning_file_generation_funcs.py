@@ -1,14 +1,75 @@
 import logging
-import json
+import multiprocessing
 import os
 import sys
 import re
-from typing import Dict, List, Optional, Set
-from pxr import UsdShade, Ar, Sdf
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from pxr import UsdShade, Ar, Sdf, Usd
 from urllib.parse import urlparse
 
+from ._binary_pinning import (
+    get_binary_pinning_path,
+    write_binary_pinning_file,
+)
+from ._dependency_graph import (
+    ARC_PAYLOAD,
+    ARC_REFERENCE,
+    ARC_SUBLAYER,
+    DependencyGraph,
+    LayerDependency,
+    LayerScan,
+    iter_layer_entries,
+    write_dependency_graph,
+)
+from ._file_sequences import FileSequenceExpander, has_frame_token
+from ._layer_cache import LayerDependencyCache
+from ._layer_memory import LayerMemoryStats
+from ._path_store import PathStore
+from ._pinning_delta import PinningDeltaWriter
+from ._pinning_file_writer import PINNING_SCHEMA_VERSION, PinningFileWriter
+from ._pinning_fragment import (
+    get_pinning_fragment_path,
+    read_pinning_fragment,
+    write_pinning_fragment,
+)
+from ._pinning_report import PinningReport, get_pinning_report_path
+from ._resolve_cache import ResolveCache
+from ._root_trie import RootPrefixTrie
+from ._uri_batch import AyonUriBatchResolver, is_ayon_uri
+
 log = logging.getLogger(__name__)
 
+# Maximum number of layers a worker process scans per task. Larger shards
+# reduce the pickling overhead between the processes.
+PROCESS_SHARD_SIZE = 32
+
+# Resolve cache of a worker process, see `_get_process_resolve_cache`
+_PROCESS_RESOLVE_CACHE: Optional[ResolveCache] = None
+
+# Entry of a traversal, a layer path or a layer or stage opened in memory
+LayerEntry = Union[str, Ar.ResolvedPath, Sdf.Layer, Usd.Stage]
+
 
 def is_uri(path: str) -> bool:
     parsed = urlparse(path)
@@ -24,15 +85,22 @@ def _normalize_path(path):
 
 
 def remove_root_from_dependency_info(
-    dependency_info: Dict[str, str], root_info: Dict[str, str]
+    dependency_info: Dict[str, str],
+    root_info: Dict[str, str],
+    normalize_paths: bool = False,
 ) -> Dict[str, str]:
     """Removes the Ayon Machine Root from a given Dependency info Dict
 
+    The roots are matched as the longest root path prefix of each key and
+    path, see `RootPrefixTrie`.
+
     Args:
         dependency_info: Dict generated by `get_asset_dependencies()`
         root_info: A flat dict containing root identifier mapping to the
         associated root path /path/to/root. This can be obtained from Ayon
         server `Get Project Roots Overrides`
+        normalize_paths: Normalize the paths with `os.path.normpath` before
+        removing the root, e.g. to use the platform path separators.
 
     Returns:
          a dependency_info dict that holds key: Usd assetIdentifiers val:
@@ -47,78 +115,187 @@ def remove_root_from_dependency_info(
             f"dependency_info: {dependency_info})"
         )
 
-    replacements = {path: replacer for replacer, path in root_info.items()}
-    pattern = "|".join(f"({re.escape(pat)})" for pat in replacements)
-    regx = re.compile(pattern)
+    return dict(
+        _iter_rootless_dependency_info(
+            dependency_info.items(), root_info, normalize_paths
+        )
+    )
+
+
+def _iter_rootless_dependency_info(
+    dependency_info: Iterable[Tuple[str, str]],
+    root_info: Dict[str, str],
+    normalize_paths: bool = False,
+) -> Iterator[Tuple[str, str]]:
+    """Yield the entries of dependency info with their roots removed.
+
+    See `remove_root_from_dependency_info`.
+    """
+    make_rootless = RootPrefixTrie(root_info).make_rootless
+    for key, path in dependency_info:
+        if normalize_paths:
+            path = _normalize_path(path)
+        yield make_rootless(key), make_rootless(path)
 
-    # TODO test if there are cases where we have more than one match.group
-    def _replace_match(match: re.Match):
-        match_grp_zero = match.group(0)
-        match_replacement = replacements.get(re.escape(match_grp_zero))
-        if not match_replacement:
-            return match_grp_zero
 
-        replacement = "{root[" + match_replacement + "]}"
-        return replacement
+_ASSET_VALUE_TYPE_NAMES = (
+    Sdf.ValueTypeNames.Asset,
+    Sdf.ValueTypeNames.AssetArray,
+)
 
-    rootless_dependency_info = {}
-    for key, path in dependency_info.items():
-        new_path = regx.sub(_replace_match, path)
-        new_key = regx.sub(_replace_match, key)
 
-        rootless_dependency_info[new_key] = new_path
+def _add_asset_values(asset_paths: Dict[str, None], value):
+    """Add the paths of an asset or asset array value to an ordered set."""
+    if isinstance(value, Sdf.AssetPath):
+        asset_paths[value.path] = None
+    else:
+        # Add all paths of an asset array at once
+        asset_paths.update(dict.fromkeys(item.path for item in value))
 
-    return rootless_dependency_info
+
+def _collect_prim_spec_asset_property_values(
+        prim: Sdf.PrimSpec,
+        layer: Sdf.Layer,
+        asset_paths: Dict[str, None]):
+    """Collect the values of asset type properties into an ordered set.
+
+    Every path is collected only once, no matter in how many time samples
+    or array elements it is authored. Time samples equal to the sample
+    before them are skipped without collecting their paths again.
+    """
+    # Iterating the values is much faster than iterating the proxy
+    for prop in prim.properties.values():
+        if not isinstance(prop, Sdf.AttributeSpec):
+            continue
+
+        if prop.typeName not in _ASSET_VALUE_TYPE_NAMES:
+            continue
+
+        default_val = prop.default
+        if default_val:
+            _add_asset_values(asset_paths, default_val)
+            continue
+
+        previous_value = None
+        for time_code in layer.ListTimeSamplesForPath(prop.path):
+            value = layer.QueryTimeSample(prop.path, time_code)
+            # Held and repeated samples are compared in C++, which is
+            # cheaper than collecting their paths again
+            if not value or value == previous_value:
+                continue
+            previous_value = value
+            _add_asset_values(asset_paths, value)
 
 
 def _get_prim_spec_asset_property_values(
         prim: Sdf.PrimSpec, layer: Sdf.Layer) -> List[str]:
     """Get all `Sdf.AttributeSpec` values for asset type properties.
 
-    This includes time sample data from a given `Sdf.PrimSpec`.
+    This includes asset array values and time sample data from a given
+    `Sdf.PrimSpec`.
 
     Args:
         prim (Sdf.PrimSpec): The prim spec to get asset property values from.
         layer (Sdf.Layer): Parent layer of the Sdf.PrimSpec instance
 
-    Returns: flat list of AttributeSpec values
+    Returns: flat list of unique AttributeSpec values
 
     """
-    prop_data = []
-    for prop in prim.properties:
-        if not isinstance(prop, Sdf.AttributeSpec):
-            continue
+    asset_paths: Dict[str, None] = {}
+    _collect_prim_spec_asset_property_values(prim, layer, asset_paths)
+    return list(asset_paths)
+
 
-        if prop.typeName != Sdf.ValueTypeNames.Asset:
+def _get_prim_spec_clip_asset_paths(prim: Sdf.PrimSpec) -> List[str]:
+    """Get the asset paths of the value clips authored on a prim spec.
+
+    This includes the clip and manifest asset paths of all clip sets and
+    their template asset paths, which are expanded to the clip files found
+    on disk when resolving.
+
+    Args:
+        prim (Sdf.PrimSpec): The prim spec to get the clip asset paths from.
+
+    Returns: flat list of clip asset paths
+
+    """
+    if not prim.HasInfo("clips"):
+        return []
+
+    clip_paths = []
+    for clip_set in prim.GetInfo("clips").values():
+        if not isinstance(clip_set, dict):
             continue
 
-        default_val = prop.default
-        if default_val:
-            if hasattr(default_val, "__iter__"):
-                prop_data.extend(default_val)
-            else:
-                prop_data.append(default_val.path)
-        else:
-            time_samples = layer.ListTimeSamplesForPath(prop.path)
-            for time in time_samples:
-                value = layer.QueryTimeSample(prop.path, time)
-                if value:
-                    if hasattr(value, "__iter__"):
-                        prop_data.extend(value)
-                    else:
-                        prop_data.append(value.path)
+        for asset_path in clip_set.get("assetPaths") or []:
+            clip_paths.append(asset_path.path)
+
+        manifest_asset_path = clip_set.get("manifestAssetPath")
+        if manifest_asset_path:
+            clip_paths.append(manifest_asset_path.path)
+
+        template_asset_path = clip_set.get("templateAssetPath")
+        if template_asset_path:
+            clip_paths.append(template_asset_path)
+
+    return clip_paths
+
+
+def _collect_prim_spec_payload_paths(
+    prim: Sdf.PrimSpec, payload_paths: Set[str]
+):
+    """Collect the asset paths of the payloads of a prim spec."""
+    if prim.hasPayloads:
+        payload_paths.update(
+            payload.assetPath
+            for payload in prim.payloadList.GetAddedOrExplicitItems()
+        )
+
+
+def _collect_prim_spec_hierarchy_external_refs(
+    prim: Sdf.PrimSpec,
+    layer: Sdf.Layer,
+    asset_paths: Dict[str, None],
+    payload_paths: Optional[Set[str]] = None,
+):
+    _collect_prim_spec_asset_property_values(prim, layer, asset_paths)
+    asset_paths.update(
+        dict.fromkeys(_get_prim_spec_clip_asset_paths(prim))
+    )
+    if payload_paths is not None:
+        _collect_prim_spec_payload_paths(prim, payload_paths)
+
+    for child_prim in prim.nameChildren.values():
+        _collect_prim_spec_hierarchy_external_refs(
+            child_prim, layer, asset_paths, payload_paths
+        )
 
-    return prop_data
+    # Prim specs authored inside the variants of the prim. Most prims have
+    # none, testing the proxy is much cheaper than listing its values.
+    if not prim.variantSets:
+        return
+    for variant_set in prim.variantSets.values():
+        for variant in variant_set.variants.values():
+            _collect_prim_spec_hierarchy_external_refs(
+                variant.primSpec, layer, asset_paths, payload_paths
+            )
 
 
 def _get_prim_spec_hierarchy_external_refs(
     prim: Sdf.PrimSpec, layer: Sdf.Layer
 ) -> List[str]:
-    file_list: List[str] = _get_prim_spec_asset_property_values(prim, layer)
+    """Get the unique asset paths authored in a prim spec hierarchy.
 
-    for child_prim in prim.nameChildren:
-        file_list.extend(_get_prim_spec_hierarchy_external_refs(child_prim, layer))
-    return file_list
+    Args:
+        prim (Sdf.PrimSpec): The root prim spec of the hierarchy.
+        layer (Sdf.Layer): Parent layer of the Sdf.PrimSpec instance
+
+    Returns: The asset paths in the order they are first authored.
+
+    """
+    asset_paths: Dict[str, None] = {}
+    _collect_prim_spec_hierarchy_external_refs(prim, layer, asset_paths)
+    return list(asset_paths)
 
 
 def _remove_sdf_args(ref: str) -> str:
@@ -126,100 +303,1135 @@ def _remove_sdf_args(ref: str) -> str:
     return uri
 
 
-def _resolve_udim(udim_identifier: str, layer: Sdf.Layer) -> Dict[str, str]:
+def _resolve_udim(
+    udim_path: str,
+    file_sequences: Optional[FileSequenceExpander] = None,
+) -> Dict[str, str]:
+    """Return the absolute path of each tile of an UDIM path.
+
+    The tiles are looked up in the cached listing of the texture directory.
+    Paths that can not be listed, like URIs, are resolved tile by tile
+    through the resolver instead.
+
+    Args:
+        udim_path: The absolute (anchored) path containing the `<UDIM>` tag.
+        file_sequences: Expander with the cached directory listings.
+
+    Returns: Mapping from tile paths to their resolved paths.
+
+    """
     udim_data = {}
-    resolved_udims = UsdShade.UdimUtils.ResolveUdimTilePaths(
-        str(udim_identifier), layer
-    )
+    if file_sequences is not None:
+        tiles = file_sequences.expand_udim(udim_path)
+        if tiles is not None:
+            for tile, path in tiles:
+                udim_data[udim_path.replace("<UDIM>", tile)] = path
+            return udim_data
+
+    resolved_udims = UsdShade.UdimUtils.ResolveUdimTilePaths(udim_path, None)
     for path, tile in resolved_udims:
-        udim_replaced_identifier = udim_identifier.replace(
-            "<UDIM>",
-            tile,
-        )
-        udim_data[layer.ComputeAbsolutePath(udim_replaced_identifier)] = path
-    
+        udim_data[udim_path.replace("<UDIM>", tile)] = path
+
     return udim_data
 
 
-# TODO refactor so that this function has a gather block and a write block
-#  currently all individual blocks write to the identifier_to_path_dict and
-#  that makes sanitizing the data hard
-def get_asset_dependencies(
-    layer_path: str,
-    resolver: Ar.Resolver,
-    processed_layers: Optional[Set[str]] = None
+def _resolve_frames(
+    sequence_path: str, file_sequences: FileSequenceExpander
 ) -> Dict[str, str]:
-    """Return mapping from all used asset identifiers to the resolved filepaths.
-
-    Recursively traverse `Sdf.Layer` and get all their asset dependencies.
-    For each asset identifier map it to its resolved filepath.
+    """Return the absolute path of each frame of a file sequence path.
 
     Args:
-        layer_path: Usd layer path to be taken as the root layer
+        sequence_path: The absolute (anchored) path containing frame tokens
+            like `$F4` or `####`.
+        file_sequences: Expander with the cached directory listings.
 
-    Returns: Mapping from asset identifier to their resolved paths
+    Returns: Mapping from frame paths to their resolved paths.
 
     """
-    layer_path = _remove_sdf_args(layer_path)
-    if not layer_path:
+    frames = file_sequences.expand_frames(sequence_path)
+    if not frames:
         return {}
-    if isinstance(layer_path, Ar.ResolvedPath):
-        layer_path = layer_path.GetPathString()
+    return {path: path for _, path in frames}
 
-    identifier_to_path: Dict[str, str] = {}
 
-    resolved_layer_path: Ar.ResolvedPath = resolver.Resolve(layer_path)
+def _get_layer_key(search_path: str, resolve_cache: ResolveCache) -> str:
+    """Return the resolved path identifying the layer of a search path.
 
-    if not processed_layers:
-        processed_layers = {resolved_layer_path.GetPathString()}
+    Returns an empty string when the search path is empty or can not be
+    resolved. Anonymous layers are identified by their identifier.
+    """
+    search_path = _remove_sdf_args(search_path)
+    if not search_path:
+        return ""
+    if Sdf.Layer.IsAnonymousLayerIdentifier(search_path):
+        return search_path
+    return resolve_cache.resolve(search_path)
+
+
+def _get_entry_identifier(entry: LayerEntry) -> str:
+    """Return the identifier of the root layer of a traversal entry."""
+    if isinstance(entry, Usd.Stage):
+        entry = entry.GetRootLayer()
+    if isinstance(entry, Sdf.Layer):
+        return entry.identifier
+    if isinstance(entry, Ar.ResolvedPath):
+        return entry.GetPathString()
+    return entry
+
+
+class _LayerDependencies(NamedTuple):
+    """Asset paths authored in a single layer, as read from the layer file.
+
+    Attributes:
+        assets: The identifier of each asset property value paired with the
+            identifier anchored to the layer.
+        compositions: The asset path of each composition dependency
+            (sublayers, references and payloads) with the path anchored to
+            the layer and its arc type.
+    """
+    assets: List[Tuple[str, str]]
+    compositions: List[Tuple[str, str, str]]
 
-    elif resolved_layer_path.GetPathString() in processed_layers:
-        return {}
 
-    else:
-        processed_layers.add(resolved_layer_path.GetPathString())
+def _get_opened_layer_dependencies(layer: Sdf.Layer) -> _LayerDependencies:
+    """Read the asset paths authored in an opened layer."""
+    # Collect the payloads in the same walk of the prim specs
+    asset_paths: Dict[str, None] = {}
+    payload_paths: Set[str] = set()
+    _collect_prim_spec_hierarchy_external_refs(
+        layer.pseudoRoot, layer, asset_paths, payload_paths
+    )
+
+    return _LayerDependencies(
+        _get_layer_assets(layer, asset_paths),
+        _get_layer_compositions(layer, payload_paths),
+    )
+
+
+def _get_layer_assets(
+    layer: Sdf.Layer, asset_paths: Iterable[str]
+) -> List[Tuple[str, str]]:
+    """Pair the asset paths of a layer with their anchored paths."""
+    # Paths differing only in their file format arguments are resolved once
+    identifiers = dict.fromkeys(map(_remove_sdf_args, asset_paths))
+    return [
+        (identifier, layer.ComputeAbsolutePath(identifier))
+        for identifier in identifiers
+    ]
+
+
+def _get_layer_compositions(
+    layer: Sdf.Layer, payload_paths: Set[str]
+) -> List[Tuple[str, str, str]]:
+    """Return the composition dependencies of a layer with their arc type.
+
+    Args:
+        layer: The layer to get the composition dependencies of.
+        payload_paths: The asset paths of the payloads authored in the
+            layer.
 
-    layer: Sdf.Layer = Sdf.Layer.FindOrOpen(resolved_layer_path)
+    """
+    # An asset path used by several arcs is typed by the first arc type of
+    # sublayer, payload and reference it is used by
+    sublayer_paths = set(layer.subLayerPaths)
+    compositions: List[Tuple[str, str, str]] = []
+    for ref in layer.GetCompositionAssetDependencies():
+        if ref in sublayer_paths:
+            arc_type = ARC_SUBLAYER
+        elif ref in payload_paths:
+            arc_type = ARC_PAYLOAD
+        else:
+            arc_type = ARC_REFERENCE
+        compositions.append((ref, layer.ComputeAbsolutePath(ref), arc_type))
+    return compositions
+
+
+def _read_layer_dependencies(
+    layer_key: str,
+    memory_stats: Optional[LayerMemoryStats] = None,
+    report: Optional[PinningReport] = None,
+) -> Optional[_LayerDependencies]:
+    """Open a layer and read the asset paths authored in it.
+
+    The layer is released when it is read, unless it was loaded before.
+
+    Args:
+        layer_key: Resolved path of the layer to read.
+        memory_stats: Stats to count the layer in, if it was not loaded
+            before.
+        report: Report to add the time of opening and reading the layer to.
+
+    Returns: The asset paths of the layer or None if the layer could not
+        be opened.
+
+    """
+    # Layers already loaded, e.g. by the host, are neither opened nor
+    # released by the scan
+    opened = memory_stats is not None and not Sdf.Layer.Find(layer_key)
+    start = time.perf_counter()
+    layer: Sdf.Layer = Sdf.Layer.FindOrOpen(layer_key)
     if not layer:
-        log.warning(f"Unable to open layer: {resolved_layer_path}")
-        return {}
+        log.warning(f"Unable to open layer: {layer_key}")
+        return None
+
+    if opened:
+        memory_stats.add_open_layer()
+    try:
+        scan_start = time.perf_counter()
+        layer_dependencies = _get_opened_layer_dependencies(layer)
+        if report is not None:
+            report.add_layer(
+                layer_key,
+                scan_start - start,
+                time.perf_counter() - scan_start,
+            )
+        return layer_dependencies
+    finally:
+        # Drop the only reference of the scan, so the layer is unloaded
+        # right away unless something else holds it
+        del layer
+        if opened:
+            memory_stats.remove_open_layer(
+                retained=bool(Sdf.Layer.Find(layer_key))
+            )
+
+
+def _open_stage(
+    layer_path: Union[str, Sdf.Layer],
+    population_mask: Optional[Iterable[str]] = None,
+    load_rules: Optional[Usd.StageLoadRules] = None,
+) -> Usd.Stage:
+    """Open a stage with a population mask and load rules.
+
+    Args:
+        layer_path: Path of the root layer of the stage, or the layer.
+        population_mask: Paths of the prims to populate. All prims are
+            populated by default.
+        load_rules: Rules of the payloads to load. All payloads are loaded
+            by default.
 
-    identifier_to_path[layer_path] = resolved_layer_path.GetPathString()
-    prim_spec_file_paths: List[str] = _get_prim_spec_hierarchy_external_refs(
-        layer.pseudoRoot, layer
+    Raises:
+        ValueError: If the stage could not be opened.
+
+    """
+    mask = Usd.StagePopulationMask.All()
+    if population_mask is not None:
+        mask = Usd.StagePopulationMask(
+            [Sdf.Path(path) for path in population_mask]
+        )
+
+    # Compose the stage only once, with the load rules applied
+    load = Usd.Stage.LoadAll if load_rules is None else Usd.Stage.LoadNone
+    stage = Usd.Stage.OpenMasked(layer_path, mask, load)
+    if not stage:
+        raise ValueError(f"Unable to open stage {layer_path}")
+    if load_rules is not None:
+        stage.SetLoadRules(load_rules)
+    return stage
+
+
+def _get_stage_layer_dependencies(
+    stage: Usd.Stage, resolve_cache: ResolveCache
+) -> Dict[str, _LayerDependencies]:
+    """Return the asset paths the composed prims of a stage use per layer.
+
+    Only the layers used by the stage are returned. Their asset paths are
+    collected from the prim specs composing the active prims, so asset
+    paths authored in unselected variants or under inactive, unloaded or
+    unpopulated prims are left out. Composition dependencies to layers the
+    stage does not use are left out as well.
+
+    Args:
+        stage: The composed stage.
+        resolve_cache: The cache to resolve the layers with.
+
+    Returns: The asset paths of each used layer by its layer key.
+
+    """
+    asset_paths: Dict[Sdf.Layer, Dict[str, None]] = {}
+    payload_paths: Dict[Sdf.Layer, Set[str]] = {}
+    prim_ranges = [Usd.PrimRange.Stage(stage, Usd.PrimIsActive)]
+    prim_ranges.extend(
+        Usd.PrimRange(prototype, Usd.PrimIsActive)
+        for prototype in stage.GetPrototypes()
     )
-    for identifier in prim_spec_file_paths:
-        identifier = _remove_sdf_args(identifier)
-        resolved_path = resolver.Resolve(layer.ComputeAbsolutePath(identifier))
-        resolved_path_str = resolved_path.GetPathString()
-        identifier_to_path[identifier] = resolved_path_str
+    for prim_range in prim_ranges:
+        for prim in prim_range:
+            for prim_spec in prim.GetPrimStack():
+                layer = prim_spec.layer
+                layer_asset_paths = asset_paths.setdefault(layer, {})
+                _collect_prim_spec_asset_property_values(
+                    prim_spec, layer, layer_asset_paths
+                )
+                layer_asset_paths.update(
+                    dict.fromkeys(_get_prim_spec_clip_asset_paths(prim_spec))
+                )
+                _collect_prim_spec_payload_paths(
+                    prim_spec, payload_paths.setdefault(layer, set())
+                )
+
+    layers: Dict[str, Sdf.Layer] = {}
+    for layer in stage.GetUsedLayers():
+        layer_key = _get_layer_key(layer.identifier, resolve_cache)
+        if layer_key:
+            layers.setdefault(layer_key, layer)
+
+    stage_dependencies: Dict[str, _LayerDependencies] = {}
+    for layer_key, layer in layers.items():
+        compositions = []
+        for composition in _get_layer_compositions(
+            layer, payload_paths.get(layer, set())
+        ):
+            ref, absolute_path, _ = composition
+            if is_uri(_remove_sdf_args(ref)):
+                dependency_key = _get_layer_key(ref, resolve_cache)
+            else:
+                dependency_key = resolve_cache.resolve(absolute_path)
+            if dependency_key in layers:
+                compositions.append(composition)
+
+        stage_dependencies[layer_key] = _LayerDependencies(
+            _get_layer_assets(layer, asset_paths.get(layer, {})),
+            compositions,
+        )
+    return stage_dependencies
+
+
+class _ScanSettings(NamedTuple):
+    """Settings of a layer scan that are shared with worker processes.
+
+    Attributes:
+        layer_cache: Cache to reuse the asset paths of unchanged layers
+            from, instead of opening the layers.
+        memory_stats: Stats of the layers opened by the scan. Not shared
+            with worker processes.
+        use_fragments: Merge the pinning fragments of layers instead of
+            scanning them and the layers they compose.
+        report: Performance report to add the layer timings to. Not shared
+            with worker processes.
+        stage_dependencies: The asset paths used by a composed stage per
+            layer key, see `_get_stage_layer_dependencies`. Layers are
+            looked up in it instead of being read, layers missing from it
+            are not scanned.
+    """
+    layer_cache: Optional[LayerDependencyCache] = None
+    memory_stats: Optional[LayerMemoryStats] = None
+    use_fragments: bool = False
+    report: Optional[PinningReport] = None
+    stage_dependencies: Optional[Dict[str, _LayerDependencies]] = None
+
+
+def _get_layer_dependencies(
+    layer_key: str, settings: _ScanSettings
+) -> Optional[_LayerDependencies]:
+    """Return the asset paths authored in a layer.
+
+    Args:
+        layer_key: Resolved path of the layer.
+        settings: The settings of the scan.
 
+    Returns: The asset paths of the layer or None if the layer could not
+        be opened.
+
+    """
+    if settings.stage_dependencies is not None:
+        return settings.stage_dependencies.get(layer_key)
+
+    def read_layer_dependencies(key: str) -> Optional[_LayerDependencies]:
+        return _read_layer_dependencies(
+            key, settings.memory_stats, settings.report
+        )
+
+    if settings.layer_cache is not None:
+        # The cache only knows the saved layer files
+        layer = Sdf.Layer.Find(layer_key)
+        if layer and layer.dirty:
+            return read_layer_dependencies(layer_key)
+        layer_dependencies = settings.layer_cache.get_or_read(
+            layer_key, read_layer_dependencies
+        )
+        if layer_dependencies is None:
+            return None
+        # Cached layers are read back from JSON as plain lists
+        assets, compositions = layer_dependencies
+        return _LayerDependencies(
+            [tuple(asset) for asset in assets],
+            [tuple(composition) for composition in compositions],
+        )
+    return read_layer_dependencies(layer_key)
+
+
+def _resolve_layer_dependencies(
+    layer_dependencies: _LayerDependencies,
+    resolve_cache: ResolveCache,
+    report: Optional[PinningReport] = None,
+) -> LayerScan:
+    """Resolve the asset paths authored in a layer.
+
+    Args:
+        layer_dependencies: The asset paths authored in the layer.
+        resolve_cache: The cache to resolve the asset identifiers with.
+        report: Report to add the time of expanding UDIM and file sequence
+            paths to.
+
+    Returns: The resolved asset dependencies of the layer.
+
+    """
+    assets, compositions = layer_dependencies
+    entries: List[Tuple[str, str]] = []
+    for identifier, absolute_path in assets:
+        resolved_path_str = resolve_cache.resolve(absolute_path)
+        entries.append((identifier, resolved_path_str))
+
+        start = time.perf_counter()
         if "<UDIM>" in resolved_path_str:
             # Include all tiles/paths of the UDIM
-            udim_data = _resolve_udim(identifier, layer)
-            identifier_to_path.update(udim_data)
+            expanded_data = _resolve_udim(
+                absolute_path, resolve_cache.file_sequences
+            )
+        elif has_frame_token(absolute_path):
+            # Include all frames of the sequence, e.g. volume caches or
+            # value clip templates
+            expanded_data = _resolve_frames(
+                absolute_path, resolve_cache.file_sequences
+            )
+        else:
+            continue
 
-    asset_identifier_list: List[str] = layer.GetCompositionAssetDependencies()
+        entries.extend(expanded_data.items())
+        if report is not None:
+            report.add_expansion(
+                len(expanded_data), time.perf_counter() - start
+            )
 
-    for ref in asset_identifier_list:
-        resolved_path = resolver.Resolve(layer.ComputeAbsolutePath(ref))
+    dependencies: List[LayerDependency] = []
+    for ref, absolute_path, arc_type in compositions:
+        resolved_path_str = resolve_cache.resolve(absolute_path)
         ref = _remove_sdf_args(ref)
-        resolved_path_str = resolved_path.GetPathString()
         if is_uri(ref):
             search_path_string = ref
+            layer_key = _get_layer_key(search_path_string, resolve_cache)
         else:
+            # A resolved path resolves to itself, no need to resolve again
             search_path_string = resolved_path_str
+            layer_key = resolved_path_str
 
-        identifier_to_path[search_path_string] = resolved_path_str
+        dependencies.append(LayerDependency(
+            search_path_string, resolved_path_str, layer_key, arc_type
+        ))
 
-        recursive_result = get_asset_dependencies(
-            search_path_string,
+    return LayerScan(entries, dependencies)
+
+
+def _scan_layer(
+    layer_key: str,
+    resolve_cache: ResolveCache,
+    settings: _ScanSettings = _ScanSettings(),
+) -> Optional[LayerScan]:
+    """Collect and resolve the asset dependencies of a layer.
+
+    Args:
+        layer_key: Resolved path of the layer to scan.
+        resolve_cache: The cache to resolve the asset identifiers with.
+        settings: The settings of the scan.
+
+    Returns: The asset dependencies of the layer or None if the layer could
+        not be opened.
+
+    """
+    if settings.use_fragments:
+        scan = read_pinning_fragment(layer_key)
+        if scan is not None:
+            return scan
+
+    layer_dependencies = _get_layer_dependencies(layer_key, settings)
+    if layer_dependencies is None:
+        return None
+    return _resolve_layer_dependencies(
+        layer_dependencies, resolve_cache, settings.report
+    )
+
+
+def _get_process_resolve_cache() -> ResolveCache:
+    """Return the resolve cache shared by all shards of a worker process."""
+    global _PROCESS_RESOLVE_CACHE
+    if _PROCESS_RESOLVE_CACHE is None:
+        _PROCESS_RESOLVE_CACHE = ResolveCache()
+    return _PROCESS_RESOLVE_CACHE
+
+
+def _scan_layer_shard(
+    layer_keys: List[str],
+    settings: _ScanSettings,
+    resolve_cache: Optional[ResolveCache] = None,
+) -> Tuple[List[Optional[LayerScan]], Optional[Tuple[int, int, float]]]:
+    """Scan a shard of layers.
+
+    Args:
+        layer_keys: Resolved paths of the layers to scan.
+        settings: The settings of the scan.
+        resolve_cache: The cache to resolve the asset identifiers with.
+            Defaults to a cache of the current process with its default
+            resolver, which is used by worker processes as resolvers can not
+            be pickled.
+
+    Returns: The scan of each layer in the order of `layer_keys` and, for
+        the process cache, the number of resolve cache hits and misses and
+        the resolve time of this shard.
+
+    """
+    counts = None
+    if resolve_cache is None:
+        resolve_cache = _get_process_resolve_cache()
+        counts = (
+            resolve_cache.hits,
+            resolve_cache.misses,
+            resolve_cache.resolve_seconds,
+        )
+
+    with Ar.ResolverScopedCache():
+        scans = [
+            _scan_layer(layer_key, resolve_cache, settings)
+            for layer_key in layer_keys
+        ]
+
+    if counts is not None:
+        counts = (
+            resolve_cache.hits - counts[0],
+            resolve_cache.misses - counts[1],
+            resolve_cache.resolve_seconds - counts[2],
+        )
+    return scans, counts
+
+
+def _scan_layers_parallel(
+    layer_key: str,
+    resolve_cache: ResolveCache,
+    processed_layers: Set[str],
+    executor: Executor,
+    max_workers: int,
+    settings: _ScanSettings,
+    max_shard_size: int = 1,
+    in_processes: bool = False,
+) -> Dict[str, Optional[LayerScan]]:
+    """Scan all layers reachable from a layer with a pool of workers.
+
+    Newly discovered layers are split into shards and submitted to the
+    executor as soon as the scan of the layers referencing them finished.
+    The visited layers are only tracked on the calling thread which
+    consumes the finished shards, so every layer is scanned exactly once.
+
+    Args:
+        layer_key: Resolved path of the layer to start from.
+        resolve_cache: The cache to resolve the asset identifiers with.
+            Worker processes use their own cache and their resolve counts
+            are added to it.
+        processed_layers: Resolved layer paths that should not be scanned.
+        executor: The pool to scan the shards with.
+        max_workers: Number of workers of the executor.
+        settings: The settings of the scan.
+        max_shard_size: Maximum number of layers scanned by one task.
+        in_processes: Whether the executor runs the shards in worker
+            processes.
+
+    Returns: Mapping from layer key to the scan of the layer.
+
+    """
+    scans: Dict[str, Optional[LayerScan]] = {}
+    if not layer_key or layer_key in processed_layers:
+        return scans
+
+    visited: Set[str] = set(processed_layers)
+    visited.add(layer_key)
+    frontier: List[str] = [layer_key]
+    pending: Dict[Future, List[str]] = {}
+    while frontier or pending:
+        # Spread the frontier over all workers before filling up shards
+        shard_size = -(-len(frontier) // max_workers)
+        shard_size = max(1, min(max_shard_size, shard_size))
+        for index in range(0, len(frontier), shard_size):
+            shard = frontier[index:index + shard_size]
+            future = executor.submit(
+                _scan_layer_shard,
+                shard,
+                settings,
+                None if in_processes else resolve_cache,
+            )
+            pending[future] = shard
+        frontier = []
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            shard = pending.pop(future)
+            shard_scans, counts = future.result()
+            if counts is not None:
+                resolve_cache.add_counts(*counts)
+
+            for shard_layer_key, scan in zip(shard, shard_scans):
+                scans[shard_layer_key] = scan
+                if scan is None:
+                    continue
+
+                for dependency in scan.dependencies:
+                    dependency_key = dependency.layer_key
+                    if not dependency_key or dependency_key in visited:
+                        continue
+                    visited.add(dependency_key)
+                    frontier.append(dependency_key)
+
+    return scans
+
+
+def _scan_layers_in_processes(
+    layer_key: str,
+    resolve_cache: ResolveCache,
+    processed_layers: Set[str],
+    max_workers: int,
+    settings: _ScanSettings,
+) -> Dict[str, Optional[LayerScan]]:
+    """Scan all layers reachable from a layer with a pool of processes.
+
+    Each worker process resolves with its own default resolver. The workers
+    are spawned rather than forked as forking a process with running USD
+    threads is not safe.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=context
+    ) as executor:
+        return _scan_layers_parallel(
+            layer_key,
+            resolve_cache,
+            processed_layers,
+            executor,
+            max_workers,
+            settings,
+            max_shard_size=PROCESS_SHARD_SIZE,
+            in_processes=True,
+        )
+
+
+def _get_layer_uris(layer_dependencies: _LayerDependencies) -> Set[str]:
+    """Return the AYON URIs the scan of a layer resolves."""
+    uris: Set[str] = set()
+    for _, absolute_path in layer_dependencies.assets:
+        if is_ayon_uri(absolute_path):
+            uris.add(absolute_path)
+    for ref, absolute_path, _ in layer_dependencies.compositions:
+        if is_ayon_uri(absolute_path):
+            uris.add(absolute_path)
+            uris.add(_remove_sdf_args(ref))
+    return uris
+
+
+def _scan_layers_batched(
+    layer_key: str,
+    resolve_cache: ResolveCache,
+    processed_layers: Set[str],
+    max_workers: int,
+    settings: _ScanSettings,
+    uri_resolver: AyonUriBatchResolver,
+) -> Dict[str, Optional[LayerScan]]:
+    """Scan all layers reachable from a layer with batched URI resolving.
+
+    The layer graph is scanned breadth first. All layers of a level are
+    read first, then all AYON URIs found in them are resolved with one
+    batch request before the asset paths of the level are resolved. Only
+    the AYON URIs the batch could not resolve go through the resolver.
+
+    Args:
+        layer_key: Resolved path of the layer to start from.
+        resolve_cache: The cache the batch resolved URIs are added to.
+        processed_layers: Resolved layer paths that should not be scanned.
+        max_workers: Number of threads reading the layers of a level in
+            parallel.
+        settings: The settings of the scan.
+        uri_resolver: The resolver of the AYON URI batches.
+
+    Returns: Mapping from layer key to the scan of the layer.
+
+    """
+    scans: Dict[str, Optional[LayerScan]] = {}
+    if not layer_key or layer_key in processed_layers:
+        return scans
+
+    def get_layer_dependencies(key: str) -> Optional[_LayerDependencies]:
+        return _get_layer_dependencies(key, settings)
+
+    visited: Set[str] = set(processed_layers)
+    visited.add(layer_key)
+    frontier: List[str] = [layer_key]
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        while frontier:
+            if settings.use_fragments:
+                # Layers with a fragment are neither read nor descended into
+                remaining: List[str] = []
+                for key in frontier:
+                    scan = read_pinning_fragment(key)
+                    if scan is None:
+                        remaining.append(key)
+                    else:
+                        scans[key] = scan
+                frontier = remaining
+
+            level = list(executor.map(get_layer_dependencies, frontier))
+
+            uris: Set[str] = set()
+            for layer_dependencies in level:
+                if layer_dependencies is not None:
+                    uris.update(_get_layer_uris(layer_dependencies))
+            uris = {uri for uri in uris if uri not in resolve_cache}
+            if uris:
+                resolve_cache.update(uri_resolver.resolve(uris))
+
+            next_frontier: List[str] = []
+            for key, layer_dependencies in zip(frontier, level):
+                if layer_dependencies is None:
+                    scans[key] = None
+                    continue
+
+                scan = _resolve_layer_dependencies(
+                    layer_dependencies, resolve_cache, settings.report
+                )
+                scans[key] = scan
+                for dependency in scan.dependencies:
+                    dependency_key = dependency.layer_key
+                    if not dependency_key or dependency_key in visited:
+                        continue
+                    visited.add(dependency_key)
+                    next_frontier.append(dependency_key)
+            frontier = next_frontier
+
+    return scans
+
+
+def _scan_layers(
+    layer_key: str,
+    resolve_cache: ResolveCache,
+    processed_layers: Set[str],
+    max_workers: int,
+    use_processes: bool,
+    settings: _ScanSettings,
+    uri_resolver: Optional[AyonUriBatchResolver],
+) -> Callable[[str], Optional[LayerScan]]:
+    """Return a function returning the scan of a layer by its layer key.
+
+    For parallel or batched scans all layers reachable from `layer_key` are
+    scanned up front, otherwise the layers are scanned on demand.
+    """
+    if uri_resolver is not None:
+        scans = _scan_layers_batched(
+            layer_key,
+            resolve_cache,
+            processed_layers,
+            max_workers,
+            settings,
+            uri_resolver,
+        )
+        return scans.get
+
+    if use_processes:
+        scans = _scan_layers_in_processes(
+            layer_key,
+            resolve_cache,
+            processed_layers,
+            max_workers if max_workers > 0 else os.cpu_count() or 1,
+            # Layers opened by worker processes do not stay in this process
+            settings._replace(memory_stats=None, report=None),
+        )
+        return scans.get
+
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            scans = _scan_layers_parallel(
+                layer_key,
+                resolve_cache,
+                processed_layers,
+                executor,
+                max_workers,
+                settings,
+            )
+        return scans.get
+
+    def scan_layer(key: str) -> Optional[LayerScan]:
+        return _scan_layer(key, resolve_cache, settings)
+
+    return scan_layer
+
+
+class TraversalSettings(NamedTuple):
+    """Settings of the layer traversal collecting the pinning entries.
+
+    With `max_workers` the layers are first opened and scanned by a pool of
+    threads, which overlaps the file I/O of many layers, and then assembled
+    in the same depth first order. The result is identical to the serial
+    traversal.
+
+    With `use_processes` the layers are scanned in shards by a pool of
+    worker processes instead, which avoids contention on the interpreter
+    lock for very large scenes. The worker processes resolve with their
+    default resolver, not with the resolver of the traversal. They are
+    spawned with `sys.executable`, so only use processes from a Python
+    interpreter and not inside a DCC application. Layers opened in memory
+    are scanned with threads instead.
+
+    With a `layer_cache` the asset paths authored in layers that did not
+    change since a previous run are taken from the cache, so only new or
+    modified layers are opened.
+
+    With an `uri_resolver` the layers are scanned level by level and all
+    AYON URIs of a level are resolved with a single server request,
+    instead of one request per URI through the resolver. Layers are read
+    with `max_workers` threads, `use_processes` is ignored.
+
+    With `use_fragments` the entries of layers that have a pinning fragment
+    next to them, see `generate_pinning_fragment`, are merged from the
+    fragment instead of opening the layer and the layers it composes. A
+    fragment is ignored when any of its layers changed since it was
+    written. The fragment keeps the paths resolved when it was written, so
+    it should only be written for published layers. Layers of a fragment
+    are not marked as processed, entries used both inside and outside of
+    it are yielded twice.
+
+    Attributes:
+        max_workers: Number of threads scanning layers in parallel. Layers
+            are scanned one after another on the calling thread when lower
+            than 2.
+        use_processes: Scan the layers with a pool of `max_workers` worker
+            processes. Defaults to one process per CPU when `max_workers`
+            is lower than 1.
+        layer_cache: Persistent cache of the asset paths authored in the
+            layers.
+        uri_resolver: Resolver of AYON URI batches through the AYON server.
+        memory_stats: Stats to count the peak number of loaded layers and
+            the peak resident memory of the traversal in.
+        use_fragments: Merge the pinning fragments of layers instead of
+            traversing them.
+        report: Performance report to add the time of opening and scanning
+            each layer and of expanding UDIM and file sequence paths to.
+    """
+    max_workers: int = 0
+    use_processes: bool = False
+    layer_cache: Optional[LayerDependencyCache] = None
+    uri_resolver: Optional[AyonUriBatchResolver] = None
+    memory_stats: Optional[LayerMemoryStats] = None
+    use_fragments: bool = False
+    report: Optional[PinningReport] = None
+
+
+class StageSettings(NamedTuple):
+    """Settings of the composed stage to pin, see `generate_pinning_file`.
+
+    Attributes:
+        population_mask: Paths of the prims to populate, all prims by
+            default.
+        load_payloads: Load the payloads. Prims of unloaded payloads are not
+            pinned.
+    """
+    population_mask: Optional[List[str]] = None
+    load_payloads: bool = True
+
+
+def get_asset_dependencies(
+    layer_path: LayerEntry,
+    resolver: Ar.Resolver,
+    processed_layers: Optional[Set[str]] = None,
+    settings: Optional[TraversalSettings] = None,
+    resolve_cache: Optional[ResolveCache] = None,
+) -> Dict[str, str]:
+    """Return mapping from all used asset identifiers to the resolved filepaths.
+
+    Traverse the `Sdf.Layer` graph depth first and get all their asset
+    dependencies. For each asset identifier map it to its resolved filepath.
+
+    The traversal uses an explicit work stack instead of recursion so deep
+    sublayer or reference chains neither hit the interpreter recursion
+    limit nor copy partial results between levels; all layers write to the
+    same mapping in depth first order.
+
+    The traversal runs in an `Ar.ResolverScopedCache` and every asset path
+    is resolved only once through the `resolve_cache`.
+
+    Every layer is released as soon as it is scanned, unless it was loaded
+    before, e.g. by the host session. Only the scanned asset paths are
+    kept, so pinning a large scene does not leave its layers loaded in the
+    session. Pass `memory_stats` in the settings to verify this.
+
+    Instead of a path the root layer can be a `Sdf.Layer` or the root layer
+    of a `Usd.Stage` opened in memory, e.g. by a host. Anonymous layers and
+    layers with unsaved changes are read from memory, also when they are
+    composed by the root layer. Anonymous layers are not pinned themselves
+    as they only exist in this session.
+
+    Args:
+        layer_path: Usd layer path to be taken as the root layer, or the
+            root layer or stage opened in memory.
+        resolver: The resolver to resolve the asset identifiers with.
+        processed_layers: Resolved layer paths that should be skipped. Layers
+            visited by this call are added to it.
+        settings: Settings of the traversal, see `TraversalSettings`. The
+            layers are scanned one after another by default.
+        resolve_cache: Memo of the resolved asset paths, e.g. to inspect
+            its hit and miss counts or to share it between calls. Its
+            resolver is used instead of `resolver` when provided.
+
+    Returns: Mapping from asset identifier to their resolved paths
+
+    """
+    return dict(
+        iter_asset_dependencies(
+            layer_path,
             resolver,
             processed_layers,
+            settings=settings,
+            resolve_cache=resolve_cache,
         )
-        identifier_to_path.update(recursive_result)
-   
-    return identifier_to_path
+    )
+
+
+def iter_asset_dependencies(
+    layer_path: LayerEntry,
+    resolver: Ar.Resolver,
+    processed_layers: Optional[Set[str]] = None,
+    settings: Optional[TraversalSettings] = None,
+    resolve_cache: Optional[ResolveCache] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Yield all used asset identifiers with their resolved filepaths.
+
+    The entries are yielded as the traversal produces them, so they can be
+    streamed to a pinning file. An identifier can be yielded more than once
+    when it is used by several layers. See `get_asset_dependencies` for the
+    arguments.
+
+    """
+    return _traverse_layers(
+        layer_path,
+        resolver,
+        processed_layers,
+        settings=settings,
+        resolve_cache=resolve_cache,
+    )
+
+
+def get_dependency_graph(
+    layer_path: LayerEntry,
+    resolver: Ar.Resolver,
+    processed_layers: Optional[Set[str]] = None,
+    settings: Optional[TraversalSettings] = None,
+    resolve_cache: Optional[ResolveCache] = None,
+) -> DependencyGraph:
+    """Return the dependency graph of the layers and assets of a layer.
+
+    Unlike `get_asset_dependencies` the graph keeps which layer uses which
+    asset and layer through which arc type, e.g. to find all layers
+    affected by a changed layer. The flat pinning data is derived from it
+    with `DependencyGraph.get_pinning_data` without traversing the layers
+    again. See `get_asset_dependencies` for the arguments.
+
+    Returns: The dependency graph of all layers reachable from the layer.
+
+    """
+    layers: Dict[str, Optional[LayerScan]] = {}
+    for _ in _traverse_layers(
+        layer_path,
+        resolver,
+        processed_layers,
+        settings=settings,
+        resolve_cache=resolve_cache,
+        layers=layers,
+    ):
+        pass
+
+    layer_path = _remove_sdf_args(_get_entry_identifier(layer_path))
+    layer_key = next(iter(layers), "")
+    return DependencyGraph(layer_path, layer_key, layers)
+
+
+def get_stage_asset_dependencies(
+    layer_path: LayerEntry,
+    resolver: Ar.Resolver,
+    population_mask: Optional[Iterable[str]] = None,
+    load_rules: Optional[Usd.StageLoadRules] = None,
+    processed_layers: Optional[Set[str]] = None,
+    resolve_cache: Optional[ResolveCache] = None,
+    report: Optional[PinningReport] = None,
+) -> Dict[str, str]:
+    """Return the asset dependencies a composed stage of a layer uses.
+
+    Unlike `get_asset_dependencies`, which pins every asset path authored in
+    any layer, the layer is opened as a `Usd.Stage` with the population
+    mask and load rules of the render. Only the layers the composed stage
+    uses and the asset paths authored on its active prims are pinned. Asset
+    paths and layers only used by unselected variants, inactive prims,
+    unloaded payloads or prims outside of the population mask are left out.
+
+    Composing the stage loads all used layers at once, so this uses more
+    memory than `get_asset_dependencies` but reads every layer only once.
+    Asset paths authored in layer or prim metadata, e.g. `assetInfo`, are
+    not pinned.
+
+    Args:
+        layer_path: Usd layer path to be taken as the root layer, or the
+            root layer or stage opened in memory. A `Usd.Stage` is pinned as
+            it is composed, unless a population mask or load rules are
+            given; then a new stage is opened on its root layer.
+        resolver: The resolver to resolve the asset identifiers with.
+        population_mask: Paths of the prims to populate, all prims by
+            default.
+        load_rules: Rules of the payloads to load, all payloads by default.
+        processed_layers: Resolved layer paths that should be skipped.
+            Layers visited by this call are added to it.
+        resolve_cache: Memo of the resolved asset paths. Its resolver is
+            used instead of `resolver` when provided.
+        report: Performance report to add the time of expanding UDIM and
+            file sequence paths to.
+
+    Returns: Mapping from asset identifier to their resolved paths
+
+    """
+    return dict(
+        iter_stage_asset_dependencies(
+            layer_path,
+            resolver,
+            population_mask,
+            load_rules,
+            processed_layers=processed_layers,
+            resolve_cache=resolve_cache,
+            report=report,
+        )
+    )
+
+
+def iter_stage_asset_dependencies(
+    layer_path: LayerEntry,
+    resolver: Ar.Resolver,
+    population_mask: Optional[Iterable[str]] = None,
+    load_rules: Optional[Usd.StageLoadRules] = None,
+    processed_layers: Optional[Set[str]] = None,
+    resolve_cache: Optional[ResolveCache] = None,
+    report: Optional[PinningReport] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Yield the asset dependencies a composed stage of a layer uses.
+
+    See `get_stage_asset_dependencies` for the arguments.
+
+    """
+    entry = layer_path
+    layer_path = _get_entry_identifier(entry)
+    if resolve_cache is None:
+        resolve_cache = ResolveCache(resolver)
+
+    with Ar.ResolverScopedCache():
+        if isinstance(entry, Usd.Stage) and (
+            population_mask is None and load_rules is None
+        ):
+            stage = entry
+        else:
+            if isinstance(entry, Usd.Stage):
+                entry = entry.GetRootLayer()
+            stage = _open_stage(
+                entry if isinstance(entry, Sdf.Layer) else layer_path,
+                population_mask,
+                load_rules,
+            )
+        stage_dependencies = _get_stage_layer_dependencies(
+            stage, resolve_cache
+        )
+    # Only the collected asset paths are needed, release the layers
+    del stage
+
+    yield from _traverse_layers(
+        layer_path,
+        resolver,
+        processed_layers,
+        settings=TraversalSettings(report=report),
+        resolve_cache=resolve_cache,
+        stage_dependencies=stage_dependencies,
+    )
+
+
+def _traverse_layers(
+    layer_path: LayerEntry,
+    resolver: Ar.Resolver,
+    processed_layers: Optional[Set[str]] = None,
+    settings: Optional[TraversalSettings] = None,
+    resolve_cache: Optional[ResolveCache] = None,
+    layers: Optional[Dict[str, Optional[LayerScan]]] = None,
+    stage_dependencies: Optional[Dict[str, _LayerDependencies]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Traverse the layer graph, yielding its pinning entries.
+
+    Args:
+        layers: Mapping to add the scan of each visited layer to, in the
+            order the layers are visited.
+        stage_dependencies: Only traverse the layers and asset paths used
+            by a composed stage, see `_get_stage_layer_dependencies`.
+
+    See `get_asset_dependencies` for the other arguments.
+
+    """
+    # Keeps the layers of an in-memory entry alive during the traversal
+    entry = layer_path
+    layer_path = _get_entry_identifier(entry)
+    if settings is None:
+        settings = TraversalSettings()
+    use_processes = settings.use_processes
+    if use_processes and isinstance(entry, (Sdf.Layer, Usd.Stage)):
+        log.debug(
+            "Scanning layers in memory with threads, worker processes can "
+            "not access them"
+        )
+        use_processes = False
+    if processed_layers is None:
+        processed_layers = set()
+    if resolve_cache is None:
+        resolve_cache = ResolveCache(resolver)
+
+    scan_settings = _ScanSettings(
+        layer_cache=settings.layer_cache,
+        memory_stats=settings.memory_stats,
+        use_fragments=settings.use_fragments,
+        report=settings.report,
+        stage_dependencies=stage_dependencies,
+    )
+    uri_resolver = settings.uri_resolver
+    with Ar.ResolverScopedCache():
+        if uri_resolver is not None:
+            resolve_cache.update(
+                uri_resolver.resolve([_remove_sdf_args(layer_path)])
+            )
+        layer_key = _get_layer_key(layer_path, resolve_cache)
+        scan_layer = _scan_layers(
+            layer_key,
+            resolve_cache,
+            processed_layers,
+            settings.max_workers,
+            use_processes,
+            scan_settings,
+            uri_resolver,
+        )
+        if layers is not None:
+            get_scan = scan_layer
+
+            def scan_layer(key: str) -> Optional[LayerScan]:
+                scan = get_scan(key)
+                layers[key] = scan
+                return scan
+
+        yield from iter_layer_entries(
+            _remove_sdf_args(layer_path),
+            layer_key,
+            scan_layer,
+            processed_layers,
+        )
+
+    log.debug(
+        f"Resolved {resolve_cache.misses} asset paths, "
+        f"{resolve_cache.hits} resolves were served from the cache"
+    )
+    if settings.memory_stats is not None:
+        settings.memory_stats.sample()
+        log.debug(settings.memory_stats.summary())
 
 
 # This function would work but in some UsdLib versions it will output <UDIM>
@@ -271,15 +1483,32 @@ def get_asset_dependencies(
 #     return ref_list
 
 
+def _collect_entries(
+    entries: Iterable[Tuple[str, str]],
+    collected_entries: MutableMapping[str, str],
+) -> Iterator[Tuple[str, str]]:
+    """Yield the entries while collecting the last path per identifier."""
+    for identifier, path in entries:
+        collected_entries[identifier] = path
+        yield identifier, path
+
+
 def _write_pinning_file(
     output_path: str,
-    pinning_data: Dict[str, str]
+    pinning_data: Dict[str, str],
+    indent: Optional[int] = None,
+    schema_version: int = PINNING_SCHEMA_VERSION,
 ):
     """Writes out a pinning file to disk in the appropriate format
 
+    The file is written atomically, see `PinningFileWriter`.
+
     Args:
         output_path (str): Path where the pinning file should be written to
         pinning_data (str): The pinning dict that holds all the pinning data
+        indent (Optional[int]): Indentation of the JSON output, compact by
+            default.
+        schema_version (int): Version of the pinning file schema to write.
 
     Raises:
         TypeError: raised if pinning_data is not a dict
@@ -290,18 +1519,25 @@ def _write_pinning_file(
     if not isinstance(pinning_data, dict):
         raise TypeError("pinning data is not a dict")
 
-    if not output_path.endswith(".json"):
-        raise TypeError("output_path is not a json")
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w") as pinning_file:
-
-        write_data = {"ayon_resolver_pinning_data": pinning_data}
-        json.dump(write_data, pinning_file, indent=2)
+    with PinningFileWriter(
+        output_path, indent=indent, schema_version=schema_version
+    ) as pinning_file:
+        pinning_file.write_entries(pinning_data.items())
 
 
 def generate_pinning_file(
-    entry_usd: str, root_info: Dict[str, str], pinning_file: str
+    entry_usd: LayerEntry,
+    root_info: Dict[str, str],
+    pinning_file: str,
+    settings: Optional[TraversalSettings] = None,
+    stage_settings: Optional[StageSettings] = None,
+    indent: Optional[int] = None,
+    write_binary: bool = False,
+    schema_version: int = PINNING_SCHEMA_VERSION,
+    dependency_graph_file: Optional[str] = None,
+    base_pinning_file: Optional[str] = None,
+    entry_scene: Optional[str] = None,
+    compact_entries: bool = False,
 ):
     """Generate a AYON USD Resolver pinning file.
 
@@ -311,11 +1547,41 @@ def generate_pinning_file(
     at the time of the generation.
 
     Arguments:
-        entry_usd: The USD filepath to generate the pinning file for.
+        entry_usd: The USD filepath to generate the pinning file for, or
+          its root layer or stage opened in memory, e.g. the stage of a
+          host that is not exported yet. See `get_asset_dependencies`.
         root_info: The project roots for the site the pinning should resolve
           to. These can be obtained via e.g. the AYON REST API get
           `/api/projects/{project_name}/siteRoots".
         pinning_file: The destination path to write the pinning file to.
+        settings: Settings of the layer traversal, see `TraversalSettings`.
+          With a `report` in the settings the performance report of the run
+          is written as JSON next to the pinning file, see `PinningReport`.
+          The report is also written when the run fails.
+        stage_settings: Only pin the layers and assets the composed stage of
+          the entry USD file uses, see `get_stage_asset_dependencies`. The
+          layers are not scanned, so only the `report` of the `settings`
+          applies.
+        indent: Indentation of the JSON output. The file is written compact
+          by default.
+        write_binary: Also write the pinning data as a memory mappable
+          binary sidecar next to the pinning file, see `BinaryPinningFile`.
+        schema_version: Version of the pinning file schema to write, see
+          `PinningFileWriter`. Version 2 deduplicates the pinned paths but
+          is not supported by the AYON USD Resolver yet.
+        dependency_graph_file: Also write the dependency graph of the
+          layers to this JSON file, see `get_dependency_graph`. The pinning
+          data is then derived from the graph.
+        base_pinning_file: Write a delta pinning file with only the entries
+          added, changed and removed since this pinning file of a previous
+          publish, see `PinningDeltaWriter`. `indent` applies, the schema
+          version does not.
+        entry_scene: Path of the USD file rendered with the pinning file,
+          stored in the pinning file. Defaults to the path of `entry_usd`
+          and is required when it is an anonymous layer.
+        compact_entries: Track the written entries in a compact `PathStore`
+          instead of a `dict`, which needs less memory for millions of
+          entries but is slower. See `PinningFileWriter`.
 
     """
 
@@ -323,27 +1589,147 @@ def generate_pinning_file(
         raise RuntimeError(
             f"Pinning file path is not a json file {pinning_file}")
 
+    if not root_info:
+        raise ValueError(
+            f"root_info needs to be present (root_info: {root_info})")
+
+    if stage_settings is not None and dependency_graph_file:
+        raise ValueError(
+            "A dependency graph can not be written from a composed stage")
+
+    if entry_scene is None:
+        entry_scene = _get_entry_identifier(entry_usd)
+        if Sdf.Layer.IsAnonymousLayerIdentifier(entry_scene):
+            raise ValueError(
+                "entry_scene needs to be present for anonymous layers")
+    entry_scene = _remove_sdf_args(entry_scene)
+
+    if settings is None:
+        settings = TraversalSettings()
+    report = settings.report
+
     # Assume that the environment sets up the correct default AyonUsdResolver
     resolver = Ar.GetResolver()
-    pinning_data = get_asset_dependencies(entry_usd, resolver)
-
-    # on Windows, we need to make the drive letter lowercase.
-    if sys.platform.startswith("win"):
-        pinning_data = {
-            # _normalize_path(key): _normalize_path(val)
-            key: _normalize_path(val)
-            for key, val in pinning_data.items()
-        }
-
-    rootless_pinning_data = remove_root_from_dependency_info(
-        pinning_data, root_info
-    )
+    resolve_cache = ResolveCache(resolver)
+    if report is not None:
+        report.start()
+    try:
+        if stage_settings is not None:
+            load_rules = None
+            if not stage_settings.load_payloads:
+                load_rules = Usd.StageLoadRules.LoadNone()
+            pinning_data = iter_stage_asset_dependencies(
+                entry_usd,
+                resolver,
+                stage_settings.population_mask,
+                load_rules,
+                resolve_cache=resolve_cache,
+                report=report,
+            )
+        elif dependency_graph_file:
+            graph = get_dependency_graph(
+                entry_usd,
+                resolver,
+                settings=settings,
+                resolve_cache=resolve_cache,
+            )
+            write_dependency_graph(dependency_graph_file, graph)
+            pinning_data = graph.iter_pinning_entries()
+        else:
+            pinning_data = iter_asset_dependencies(
+                entry_usd,
+                resolver,
+                settings=settings,
+                resolve_cache=resolve_cache,
+            )
+
+        # Stream the entries to the file as the traversal produces them
+        # instead of collecting the whole pinning data first.
+        # on Windows, we need to normalize the path separators.
+        rootless_pinning_data = _iter_rootless_dependency_info(
+            pinning_data,
+            root_info,
+            normalize_paths=sys.platform.startswith("win"),
+        )
 
-    rootless_pinning_data["ayon_pinning_data_entry_scene"] = _remove_sdf_args(
-        entry_usd
-    )
+        # The binary sidecar is sorted, so its entries have to be collected
+        binary_pinning_data: Optional[MutableMapping[str, str]] = None
+        if write_binary:
+            binary_pinning_data = PathStore() if compact_entries else {}
+            rootless_pinning_data = _collect_entries(
+                rootless_pinning_data, binary_pinning_data
+            )
+
+        if base_pinning_file:
+            writer = PinningDeltaWriter(
+                pinning_file,
+                base_pinning_file,
+                indent=indent,
+                compact_entries=compact_entries,
+            )
+        else:
+            writer = PinningFileWriter(
+                pinning_file,
+                indent=indent,
+                schema_version=schema_version,
+                compact_entries=compact_entries,
+            )
+        with writer:
+            writer.write_entries(rootless_pinning_data)
+            if not len(writer):
+                raise ValueError(f"No dependencies found for {entry_scene}")
+
+            writer.write("ayon_pinning_data_entry_scene", entry_scene)
+
+        if binary_pinning_data is not None:
+            binary_pinning_data["ayon_pinning_data_entry_scene"] = entry_scene
+            write_binary_pinning_file(
+                get_binary_pinning_path(pinning_file), binary_pinning_data
+            )
+
+    finally:
+        if report is not None:
+            report.stop(resolve_cache, settings.memory_stats)
+            report.write(get_pinning_report_path(pinning_file))
+
+
+def generate_pinning_fragment(
+    layer_path: str,
+    fragment_file: Optional[str] = None,
+    settings: Optional[TraversalSettings] = None,
+) -> str:
+    """Write the pinning fragment of a published layer.
+
+    The fragment stores the resolved asset dependencies of the layer and
+    all layers it composes, see `write_pinning_fragment`. Pinning files of
+    scenes using the layer merge the fragment with `use_fragments` instead
+    of traversing the layer again.
+
+    The fragment is always generated by traversing the layers, fragments of
+    the composed layers are not used.
+
+    Arguments:
+        layer_path: The published USD filepath, e.g. of an asset.
+        fragment_file: The destination path of the fragment. Defaults to
+          the path `read_pinning_fragment` looks the fragment up at, next
+          to the layer.
+        settings: Settings of the layer traversal, see `TraversalSettings`.
+          `use_fragments` is ignored.
+
+    Returns: The path of the written fragment.
 
-    _write_pinning_file(
-        pinning_file,
-        rootless_pinning_data,
+    """
+    if settings is None:
+        settings = TraversalSettings()
+    graph = get_dependency_graph(
+        layer_path,
+        Ar.GetResolver(),
+        settings=settings._replace(use_fragments=False),
     )
+    if graph.layers.get(graph.layer_key) is None:
+        raise ValueError(f"Unable to open layer {layer_path}")
+
+    if fragment_file is None:
+        fragment_file = get_pinning_fragment_path(graph.layer_key)
+    write_pinning_fragment(fragment_file, graph)
+    return fragment_file
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict
+
+from ._pinning_file_writer import (
+    PINNING_DATA_KEY,
+    PINNING_DELTA_KEY,
+    PINNING_VERSION_KEY,
+    SUPPORTED_PINNING_SCHEMA_VERSIONS,
+)
+
+
+def get_file_checksum(path: str) -> str:
+    """Return the SHA-256 hex digest of the content of a file."""
+    checksum = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def get_delta_base_path(pinning_file: str, delta: Dict[str, Any]) -> str:
+    """Return the path of the base pinning file of a delta pinning file.
+
+    Args:
+        pinning_file: Path of the delta pinning file.
+        delta: The delta data of the delta pinning file.
+
+    Returns: The base path, relative paths are relative to the directory
+        of the delta pinning file.
+
+    """
+    return os.path.normpath(
+        os.path.join(os.path.dirname(pinning_file), delta["base"])
+    )
+
+
+def apply_pinning_delta(
+    base_data: Dict[str, str], delta: Dict[str, Any]
+) -> Dict[str, str]:
+    """Return the flat pinning data of a delta applied to its base.
+
+    Args:
+        base_data: The flat pinning data of the base pinning file.
+        delta: The delta data of a delta pinning file, see
+            `PinningDeltaWriter`.
+
+    Returns: The base entries without the removed entries and with the
+        changed paths, followed by the added entries.
+
+    """
+    pinning_data = dict(base_data)
+    for identifier in delta["removed"]:
+        pinning_data.pop(identifier, None)
+    pinning_data.update(delta["changed"])
+    pinning_data.update(delta["added"])
+    return pinning_data
+
+
+def expand_pinning_data(file_data: Dict[str, Any]) -> Dict[str, str]:
+    """Return the flat pinning data of a loaded pinning file.
+
+    Args:
+        file_data: The JSON content of a pinning file of any supported
+            schema version, see `PinningFileWriter`.
+
+    Returns: Mapping from asset identifier to pinned path, as written by
+        schema version 1.
+
+    Raises:
+        ValueError: If the schema version of the data is not supported or
+            the data is a delta, which needs its base to be expanded.
+
+    """
+    if PINNING_DELTA_KEY in file_data:
+        raise ValueError(
+            "Delta pinning data can only be expanded with its base, "
+            "use `read_pinning_file`"
+        )
+
+    version = file_data.get(PINNING_VERSION_KEY, 1)
+    if version not in SUPPORTED_PINNING_SCHEMA_VERSIONS:
+        raise ValueError(f"Unsupported pinning schema version {version}")
+
+    pinning_data = file_data[PINNING_DATA_KEY]
+    if version == 1:
+        return pinning_data
+
+    directories = pinning_data["directories"]
+    paths = [
+        directories[directory_index] + name
+        for directory_index, name in pinning_data["paths"]
+    ]
+    identifier_to_path = {
+        identifier: paths[path_index]
+        for identifier, path_index in pinning_data["identifiers"].items()
+    }
+    for path_index in pinning_data["self_pinned"]:
+        path = paths[path_index]
+        identifier_to_path[path] = path
+    return identifier_to_path
+
+
+def read_pinning_file(pinning_file: str) -> Dict[str, str]:
+    """Read the flat pinning data of a pinning file of any schema version.
+
+    Delta pinning files are applied to their base pinning file, which can
+    be a delta pinning file itself.
+
+    Args:
+        pinning_file: Path of the pinning file.
+
+    Returns: Mapping from asset identifier to pinned path.
+
+    Raises:
+        ValueError: If the base pinning file of a delta pinning file
+            changed since the delta was written.
+
+    """
+    with open(pinning_file, encoding="utf-8") as file:
+        file_data = json.load(file)
+
+    delta = file_data.get(PINNING_DELTA_KEY)
+    if delta is None:
+        return expand_pinning_data(file_data)
+
+    base_path = get_delta_base_path(pinning_file, delta)
+    if get_file_checksum(base_path) != delta["base_sha256"]:
+        raise ValueError(
+            f"Base pinning file {base_path} of {pinning_file} changed "
+            "since the delta was written"
+        )
+    return apply_pinning_delta(read_pinning_file(base_path), delta)
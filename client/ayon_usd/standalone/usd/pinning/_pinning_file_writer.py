@@ -0,0 +1,313 @@
+import contextlib
+import json
+import os
+import uuid
+from typing import (
+    IO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+)
+
+from ._path_store import PathStore, split_pinned_path
+
+PINNING_DATA_KEY = "ayon_resolver_pinning_data"
+PINNING_VERSION_KEY = "ayon_resolver_pinning_version"
+PINNING_DELTA_KEY = "ayon_resolver_pinning_delta"
+
+# Schema version written by default. Version 2 deduplicates the pinned
+# paths, but the AYON USD Resolver can only read version 1 so far.
+PINNING_SCHEMA_VERSION = 1
+SUPPORTED_PINNING_SCHEMA_VERSIONS = (1, 2)
+
+
+def get_temp_path(output_path: str) -> str:
+    """Return a unique temporary path to write an output file to.
+
+    The temporary path is in the same directory as the output path so the
+    file can be atomically moved to the output path with `os.replace`.
+    Unlike `tempfile.mkstemp` the file is created with the default file
+    permissions when opened.
+    """
+    directory, file_name = os.path.split(output_path)
+    return os.path.join(directory, f".{file_name}.{uuid.uuid4().hex}.tmp")
+
+
+@contextlib.contextmanager
+def atomic_write(output_path: str, binary: bool = False) -> Iterator[IO]:
+    """Open a temporary file which replaces the output path when closed.
+
+    The directory of the output path is created if needed. The output path
+    is only replaced when the block exits without an error, otherwise the
+    temporary file is removed and an existing output file is kept.
+
+    Args:
+        output_path: Path of the file to write.
+        binary: Open the file in binary mode instead of as UTF-8 text.
+
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = get_temp_path(output_path)
+    try:
+        if binary:
+            file = open(temp_path, "xb")
+        else:
+            file = open(temp_path, "x", encoding="utf-8")
+        with file:
+            yield file
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class PinningFileWriter:
+    """Incremental writer of AYON USD Resolver pinning files.
+
+    The entries of the pinning data are encoded and written to disk one by
+    one as they are added, so no encoded JSON document of the whole pinning
+    data is built in memory. The file is written to a temporary file next
+    to the output path, which replaces the output path only when the writer
+    is closed without an error. Readers never see a partially written file.
+
+    Like `dict(entries)` the last path added for an identifier wins, at the
+    position the identifier was first added at, and the JSON object keys
+    stay unique. For this every added entry is kept in memory until the
+    writer is closed, in a `dict`, or with `compact_entries` in a
+    `PathStore` which needs a fraction of the memory for millions of
+    entries but is several times slower. Peak memory is therefore about
+    that of a `dict` of the pinning data. Duplicates with the same path are
+    skipped. Once a written identifier is added again with another path,
+    the entries are no longer streamed and the whole file is written again
+    from the kept entries when the writer is closed.
+
+    Schema version 1 maps each identifier to its path:
+
+        {"ayon_resolver_pinning_data": {"./a.usd": "/proj/a.usd"}}
+
+    Schema version 2 stores every unique path once in a path table of
+    directory index and file name, and every unique directory once in a
+    directory table. Identifiers map to the index of their path, except
+    identifiers pinned to themselves which are only listed by their path
+    index in `self_pinned`:
+
+        {
+            "ayon_resolver_pinning_version": 2,
+            "ayon_resolver_pinning_data": {
+                "identifiers": {"./a.usd": 0},
+                "self_pinned": [1],
+                "paths": [[0, "a.usd"], [0, "b.usd"]],
+                "directories": ["/proj/"]
+            }
+        }
+
+    Only the tables of unique paths and directories are kept in memory, as
+    they are written after the identifiers. See `read_pinning_file` to
+    read both versions.
+
+    Use it as a context manager:
+
+        with PinningFileWriter("/path/to/pinning.json") as writer:
+            writer.write("./asset.usd", "/proj/asset.usd")
+
+    Args:
+        output_path: Path of the pinning file to write.
+        indent: Indentation of the JSON output. The output is compact
+            without any whitespace by default.
+        schema_version: Version of the pinning file schema to write.
+        compact_entries: Track the written entries in a `PathStore`
+            instead of a `dict`.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        indent: Optional[int] = None,
+        schema_version: int = PINNING_SCHEMA_VERSION,
+        compact_entries: bool = False,
+    ):
+        if not output_path.endswith(".json"):
+            raise TypeError("output_path is not a json")
+        if schema_version not in SUPPORTED_PINNING_SCHEMA_VERSIONS:
+            raise ValueError(
+                f"Unsupported pinning schema version {schema_version}")
+
+        self.output_path = output_path
+        self.schema_version = schema_version
+        self._indent = indent
+        self._key_separator = ":" if indent is None else ": "
+        self._identifier_level = 2 if schema_version == 1 else 3
+        self._entries: MutableMapping[str, str] = (
+            PathStore() if compact_entries else {}
+        )
+        self._has_changed_entries = False
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._temp_path = get_temp_path(output_path)
+        self._file = open(self._temp_path, "x", encoding="utf-8")
+        self._write_header()
+
+    def __enter__(self) -> "PinningFileWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _newline(self, level: int) -> str:
+        # Same layout as `json.dump` with the given indent
+        if self._indent is None:
+            return ""
+        return "\n" + " " * (self._indent * level)
+
+    def _write_header(self):
+        """Write the start of the file and reset the written tables."""
+        self._has_identifiers = False
+        self._path_indices: Dict[str, int] = {}
+        self._paths: List[Tuple[int, str]] = []
+        self._directory_indices: Dict[str, int] = {}
+        self._self_pinned: List[int] = []
+
+        header = "{" + self._newline(1)
+        if self.schema_version != 1:
+            header += (
+                json.dumps(PINNING_VERSION_KEY) + self._key_separator
+                + f"{self.schema_version}," + self._newline(1)
+            )
+        header += json.dumps(PINNING_DATA_KEY) + self._key_separator + "{"
+        if self.schema_version != 1:
+            header += (
+                self._newline(2) + json.dumps("identifiers")
+                + self._key_separator + "{"
+            )
+        self._file.write(header)
+
+    def _get_path_index(self, path: str) -> int:
+        path_index = self._path_indices.get(path)
+        if path_index is not None:
+            return path_index
+
+        directory, name = split_pinned_path(path)
+        directory_index = self._directory_indices.setdefault(
+            directory, len(self._directory_indices)
+        )
+        path_index = len(self._paths)
+        self._paths.append((directory_index, name))
+        self._path_indices[path] = path_index
+        return path_index
+
+    def write(self, identifier: str, path: str):
+        """Write the pinned path of an asset identifier.
+
+        Args:
+            identifier: The asset identifier to pin.
+            path: The path the identifier is pinned to.
+
+        """
+        written_path = self._entries.get(identifier)
+        if written_path is not None:
+            if written_path != path:
+                self._entries[identifier] = path
+                self._has_changed_entries = True
+            return
+
+        self._entries[identifier] = path
+        if not self._has_changed_entries:
+            self._write_entry(identifier, path)
+
+    def _write_entry(self, identifier: str, path: str):
+        if self.schema_version == 1:
+            value = json.dumps(path)
+        else:
+            path_index = self._get_path_index(path)
+            if identifier == path:
+                self._self_pinned.append(path_index)
+                return
+            value = str(path_index)
+
+        separator = "," if self._has_identifiers else ""
+        self._has_identifiers = True
+        self._file.write(
+            separator + self._newline(self._identifier_level)
+            + json.dumps(identifier) + self._key_separator + value
+        )
+
+    def write_entries(self, entries: Iterable[Tuple[str, str]]):
+        """Write the pinned paths of many asset identifiers.
+
+        Args:
+            entries: Pairs of asset identifier and pinned path.
+
+        """
+        for identifier, path in entries:
+            self.write(identifier, path)
+
+    def _encode_table(self, name: str, items: Iterable[str]) -> str:
+        """Encode a table of the version 2 schema as JSON array."""
+        items = list(items)
+        encoded = "," + self._newline(2) + json.dumps(name)
+        encoded += self._key_separator + "["
+        if items:
+            item_separator = "," + self._newline(3)
+            encoded += self._newline(3) + item_separator.join(items)
+            encoded += self._newline(2)
+        return encoded + "]"
+
+    def close(self):
+        """Finish the pinning file and move it to the output path."""
+        if self._file.closed:
+            return
+
+        if self._has_changed_entries:
+            # Write the entries again with the last path of each identifier
+            self._file.seek(0)
+            self._file.truncate()
+            self._write_header()
+            for identifier, path in self._entries.items():
+                self._write_entry(identifier, path)
+
+        closing = "}"
+        if self._has_identifiers:
+            closing = self._newline(self._identifier_level - 1) + closing
+        if self.schema_version != 1:
+            separator = "," + self._newline(4)
+            closing += self._encode_table(
+                "self_pinned", (str(index) for index in self._self_pinned)
+            )
+            closing += self._encode_table("paths", (
+                "[" + self._newline(4) + str(directory_index) + separator
+                + json.dumps(name) + self._newline(3) + "]"
+                for directory_index, name in self._paths
+            ))
+            closing += self._encode_table(
+                "directories", map(json.dumps, self._directory_indices)
+            )
+            closing += self._newline(1) + "}"
+        closing += self._newline(0) + "}"
+        self._file.write(closing)
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+        os.replace(self._temp_path, self.output_path)
+
+    def abort(self):
+        """Discard the pinning file, keeping an existing output file."""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from ._dependency_graph import DependencyGraph, LayerScan
+from ._layer_cache import get_file_signature
+from ._pinning_file_writer import atomic_write
+
+log = logging.getLogger(__name__)
+
+PINNING_FRAGMENT_KEY = "ayon_pinning_fragment"
+PINNING_FRAGMENT_VERSION = 1
+PINNING_FRAGMENT_SUFFIX = "_pin_fragment.json"
+
+
+def get_pinning_fragment_path(layer_path: str) -> str:
+    """Return the path of the pinning fragment of a published layer."""
+    return os.path.splitext(layer_path)[0] + PINNING_FRAGMENT_SUFFIX
+
+
+def write_pinning_fragment(fragment_file: str, graph: DependencyGraph):
+    """Write the pinning fragment of the root layer of a dependency graph.
+
+    A fragment stores the resolved asset dependencies of a published layer,
+    e.g. an asset, so the pinning of every shot using the layer can merge
+    them instead of traversing the layers of the asset again:
+
+        {
+            "ayon_pinning_fragment": {
+                "version": 1,
+                "layer": "/proj/asset/v003/asset.usd",
+                "layers": {"/proj/asset/v003/asset.usd": [mtime_ns, size]},
+                "entries": [["./geo.usd", "/proj/asset/v003/geo.usd"]]
+            }
+        }
+
+    The modification time and size of every layer of the graph are stored
+    so a fragment is only used while none of its layers changed. The
+    fragment is written atomically through a temporary file.
+
+    Args:
+        fragment_file: Path of the fragment JSON file.
+        graph: The dependency graph of the published layer.
+
+    """
+    # Like the pinning file the last path of an identifier wins. The entry
+    # of the root layer itself is added by the layer using it.
+    entries: Dict[str, str] = dict(graph.iter_pinning_entries())
+    entries.pop(graph.layer_path, None)
+
+    fragment = {
+        "version": PINNING_FRAGMENT_VERSION,
+        "layer": graph.layer_key,
+        "layers": {
+            layer_key: get_file_signature(layer_key)
+            for layer_key in graph.layers
+        },
+        "entries": list(entries.items()),
+    }
+
+    with atomic_write(fragment_file) as file:
+        json.dump({PINNING_FRAGMENT_KEY: fragment}, file, separators=(",", ":"))
+
+
+def read_pinning_fragment(layer_key: str) -> Optional[LayerScan]:
+    """Return the scan of a layer merged from its pinning fragment.
+
+    The scan holds all entries of the layers of the fragment and no
+    dependencies, so the traversal does not descend into the layer.
+
+    Args:
+        layer_key: Resolved path of the layer.
+
+    Returns: The scan or None if the layer has no valid fragment, e.g. when
+        a layer of the fragment changed since the fragment was written.
+
+    """
+    fragment_file = get_pinning_fragment_path(layer_key)
+    try:
+        with open(fragment_file, encoding="utf-8") as file:
+            fragment = json.load(file)[PINNING_FRAGMENT_KEY]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        log.warning(f"Unable to read pinning fragment {fragment_file}: {exc}")
+        return None
+
+    if (
+        fragment.get("version") != PINNING_FRAGMENT_VERSION
+        or fragment.get("layer") != layer_key
+    ):
+        return None
+
+    for fragment_layer_key, signature in fragment["layers"].items():
+        current_signature = get_file_signature(fragment_layer_key)
+        if current_signature is not None:
+            current_signature = list(current_signature)
+        if current_signature != signature:
+            log.debug(
+                f"Ignoring outdated pinning fragment {fragment_file}, "
+                f"{fragment_layer_key} changed"
+            )
+            return None
+
+    return LayerScan(
+        [(identifier, path) for identifier, path in fragment["entries"]], []
+    )
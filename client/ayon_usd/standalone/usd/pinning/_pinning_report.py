@@ -0,0 +1,233 @@
+import heapq
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ._layer_memory import LayerMemoryStats
+from ._pinning_file_writer import atomic_write
+from ._resolve_cache import ResolveCache
+
+PINNING_REPORT_VERSION = 1
+PINNING_REPORT_SUFFIX = "_report.json"
+
+
+def get_pinning_report_path(pinning_file: str) -> str:
+    """Return the path of the report written next to a pinning file."""
+    return os.path.splitext(pinning_file)[0] + PINNING_REPORT_SUFFIX
+
+
+class LayerTiming(NamedTuple):
+    """Time spent on opening and scanning a single layer.
+
+    Attributes:
+        seconds: Total time of the layer, used to order the timings.
+        layer_key: Resolved path of the layer.
+        open_seconds: Time spent opening the layer.
+        scan_seconds: Time spent reading the asset paths of the layer.
+    """
+    seconds: float
+    layer_key: str
+    open_seconds: float
+    scan_seconds: float
+
+
+class PinningReport:
+    """Performance report of a pinning run.
+
+    Collects the layers opened and the time spent opening and scanning
+    each of them, the number of resolves and their time, the time spent
+    expanding UDIM tiles and file sequences and the peak memory. Only the
+    slowest layers are kept, the time of all layers is summed up per
+    directory to find slow storage paths.
+
+    Layers scanned in worker processes are not reported, their resolves
+    are. Layers taken from the layer cache or merged from pinning
+    fragments are not opened and not reported either.
+
+    The report can be shared by threads. Pass it to `generate_pinning_file`
+    to write it as JSON next to the pinning file.
+
+    Args:
+        slowest_layer_count: Number of the slowest layers and directories
+            to report.
+        trace_memory: Trace the peak memory allocated by Python with
+            `tracemalloc` while the report is running. This slows down the
+            run considerably.
+    """
+
+    def __init__(
+        self, slowest_layer_count: int = 20, trace_memory: bool = False
+    ):
+        self.slowest_layer_count = slowest_layer_count
+        self.trace_memory = trace_memory
+        self.duration: Optional[float] = None
+        self.opened_layer_count = 0
+        self.open_seconds = 0.0
+        self.scan_seconds = 0.0
+        self.expanded_path_count = 0
+        self.expansion_seconds = 0.0
+        self.resolve_count = 0
+        self.resolve_cache_hits = 0
+        self.resolve_seconds = 0.0
+        self.traced_memory_peak: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self._slowest_layers: List[LayerTiming] = []
+        self._directory_seconds: Dict[str, List[float]] = {}
+        self._start_time: Optional[float] = None
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start timing the run and tracing the memory."""
+        self._start_time = time.perf_counter()
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                # Not available before Python 3.9
+                if hasattr(tracemalloc, "reset_peak"):
+                    tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._started_tracing = True
+
+    def stop(
+        self,
+        resolve_cache: Optional[ResolveCache] = None,
+        memory_stats: Optional[LayerMemoryStats] = None,
+    ):
+        """Stop the run, taking the counts of its resolve cache and stats.
+
+        Args:
+            resolve_cache: The resolve cache of the run.
+            memory_stats: The layer memory stats of the run, for its peak
+                resident set size.
+
+        """
+        if self._start_time is not None:
+            self.duration = time.perf_counter() - self._start_time
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.traced_memory_peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        if resolve_cache is not None:
+            self.resolve_count = resolve_cache.misses
+            self.resolve_cache_hits = resolve_cache.hits
+            self.resolve_seconds = resolve_cache.resolve_seconds
+        if memory_stats is not None:
+            self.peak_rss = memory_stats.peak_rss
+
+    def add_layer(
+        self, layer_key: str, open_seconds: float, scan_seconds: float
+    ):
+        """Add the timing of an opened layer."""
+        timing = LayerTiming(
+            open_seconds + scan_seconds, layer_key, open_seconds, scan_seconds
+        )
+        directory = os.path.dirname(layer_key)
+        with self._lock:
+            self.opened_layer_count += 1
+            self.open_seconds += open_seconds
+            self.scan_seconds += scan_seconds
+            if len(self._slowest_layers) < self.slowest_layer_count:
+                heapq.heappush(self._slowest_layers, timing)
+            elif self._slowest_layers:
+                heapq.heappushpop(self._slowest_layers, timing)
+            directory_seconds = self._directory_seconds.setdefault(
+                directory, [0, 0.0]
+            )
+            directory_seconds[0] += 1
+            directory_seconds[1] += timing.seconds
+
+    def add_expansion(self, path_count: int, seconds: float):
+        """Add the time spent expanding an UDIM or file sequence path."""
+        with self._lock:
+            self.expanded_path_count += path_count
+            self.expansion_seconds += seconds
+
+    def get_slowest_layers(self) -> List[LayerTiming]:
+        """Return the timings of the slowest layers, slowest first."""
+        with self._lock:
+            return sorted(self._slowest_layers, reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the report in its JSON serializable form."""
+        with self._lock:
+            directories = heapq.nlargest(
+                self.slowest_layer_count,
+                self._directory_seconds.items(),
+                key=lambda item: item[1][1],
+            )
+
+        resolve_latency = None
+        if self.resolve_count:
+            resolve_latency = self.resolve_seconds / self.resolve_count
+        return {
+            "version": PINNING_REPORT_VERSION,
+            "duration_seconds": self.duration,
+            "layers": {
+                "opened": self.opened_layer_count,
+                "open_seconds": self.open_seconds,
+                "scan_seconds": self.scan_seconds,
+            },
+            "resolves": {
+                "count": self.resolve_count,
+                "cache_hits": self.resolve_cache_hits,
+                "seconds": self.resolve_seconds,
+                "mean_latency_seconds": resolve_latency,
+            },
+            "expansions": {
+                "paths": self.expanded_path_count,
+                "seconds": self.expansion_seconds,
+            },
+            "memory": {
+                "traced_peak_bytes": self.traced_memory_peak,
+                "peak_rss_bytes": self.peak_rss,
+            },
+            "slowest_layers": [
+                {
+                    "layer": timing.layer_key,
+                    "open_seconds": timing.open_seconds,
+                    "scan_seconds": timing.scan_seconds,
+                }
+                for timing in self.get_slowest_layers()
+            ],
+            "slowest_directories": [
+                {"directory": directory, "layers": count, "seconds": seconds}
+                for directory, (count, seconds) in directories
+            ],
+        }
+
+    def write(self, output_path: str):
+        """Write the report as JSON file, atomically."""
+        with atomic_write(output_path) as report_file:
+            json.dump(self.to_dict(), report_file, indent=2)
+
+    def summary(self) -> str:
+        """Return a human readable summary of the report."""
+        lines = [
+            f"Pinning took {self.duration or 0.0:.2f}s. "
+            f"Opened {self.opened_layer_count} layers in "
+            f"{self.open_seconds:.2f}s, scanned them in "
+            f"{self.scan_seconds:.2f}s.",
+            f"Resolved {self.resolve_count} asset paths in "
+            f"{self.resolve_seconds:.2f}s, {self.resolve_cache_hits} "
+            f"resolves were served from the cache. Expanded "
+            f"{self.expanded_path_count} UDIM tiles and sequence frames in "
+            f"{self.expansion_seconds:.2f}s.",
+        ]
+        if self.traced_memory_peak is not None:
+            lines.append(
+                f"Peak traced memory: "
+                f"{self.traced_memory_peak / 1024 ** 2:.1f} MiB"
+            )
+        slowest_layers = self.get_slowest_layers()[:5]
+        if slowest_layers:
+            lines.append("Slowest layers:")
+            lines.extend(
+                f"  {timing.seconds:.3f}s {timing.layer_key}"
+                for timing in slowest_layers
+            )
+        return "\n".join(lines)
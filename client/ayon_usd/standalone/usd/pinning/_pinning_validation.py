@@ -0,0 +1,194 @@
+import os
+import re
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from ._file_sequences import has_frame_token
+from ._path_store import split_pinned_path
+from ._pinning_file_reader import read_pinning_file
+
+# Directories with fewer pinned files are checked with one stat per file
+# instead of listing the whole directory
+SCANDIR_MIN_FILE_COUNT = 4
+
+# Only the directory listing on Windows includes the file sizes, elsewhere
+# `os.DirEntry.stat` is one stat call per file like `os.stat`
+_SCANDIR_HAS_SIZES = os.name == "nt"
+
+_ROOT_TEMPLATE_REGEX = re.compile(r"\{root\[([^\]]+)\]\}")
+
+
+class PinningValidation(NamedTuple):
+    """Result of validating the paths of pinning data.
+
+    Attributes:
+        missing: Identifiers mapped to their pinned path, for the paths
+            that do not exist and the identifiers that were not resolved.
+        file_count: Number of unique files that exist.
+        total_bytes: Total size of the existing files in bytes.
+        directory_count: Number of directories of the pinned paths.
+    """
+    missing: Dict[str, str]
+    file_count: int
+    total_bytes: int
+    directory_count: int
+
+    @property
+    def is_valid(self) -> bool:
+        """Whether all pinned paths exist."""
+        return not self.missing
+
+    def summary(self, max_missing_count: int = 10) -> str:
+        """Return a human readable summary of the validation.
+
+        Args:
+            max_missing_count: Number of missing paths listed.
+
+        """
+        lines = [
+            f"{self.file_count} pinned files in {self.directory_count} "
+            f"directories, {self.total_bytes / 1024 ** 3:.2f} GiB in total. "
+            f"{len(self.missing)} missing."
+        ]
+        for identifier, path in list(self.missing.items())[
+            :max_missing_count
+        ]:
+            lines.append(f"  Missing {identifier}: {path or 'unresolved'}")
+        if len(self.missing) > max_missing_count:
+            lines.append(
+                f"  ... and {len(self.missing) - max_missing_count} more"
+            )
+        return "\n".join(lines)
+
+
+def _get_file_sizes(
+    directory: str, names: List[str]
+) -> Dict[str, Optional[int]]:
+    """Return the size of the files of a directory, None if missing.
+
+    On Windows directories with many requested files are listed once with
+    `os.scandir`, which includes the file sizes, instead of calling
+    `os.stat` for every file. Elsewhere the files are stat'ed one by one,
+    unless the directory is missing.
+    """
+    sizes: Dict[str, Optional[int]] = dict.fromkeys(names)
+    if not _SCANDIR_HAS_SIZES or len(names) < SCANDIR_MIN_FILE_COUNT:
+        for index, name in enumerate(names):
+            try:
+                file_stat = os.stat(os.path.join(directory, name))
+            except (OSError, ValueError):
+                # Skip the other files of a missing directory
+                if index == 0 and not os.path.isdir(directory):
+                    break
+                continue
+            if stat.S_ISREG(file_stat.st_mode):
+                sizes[name] = file_stat.st_size
+        return sizes
+
+    requested = {os.path.normcase(name): name for name in names}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = requested.get(os.path.normcase(entry.name))
+                if name is None:
+                    continue
+                try:
+                    if entry.is_file():
+                        sizes[name] = entry.stat().st_size
+                except OSError:
+                    continue
+    except (OSError, ValueError):
+        # Missing directory, all of its files are missing
+        pass
+    return sizes
+
+
+def _fill_roots(path: str, root_info: Dict[str, str]) -> str:
+    """Replace the `{root[name]}` template of a rootless path."""
+    def replace_root(match) -> str:
+        return root_info.get(match.group(1), match.group(0)).rstrip("/\\")
+
+    return _ROOT_TEMPLATE_REGEX.sub(replace_root, path, count=1)
+
+
+def validate_pinning_data(
+    pinning_data: Mapping[str, str],
+    root_info: Optional[Dict[str, str]] = None,
+    max_workers: int = 8,
+) -> PinningValidation:
+    """Check that all pinned paths exist and sum up their sizes.
+
+    The pinned paths are grouped by directory and the directories are
+    checked in parallel, which hides the latency of network storage, see
+    `_get_file_sizes`. Identifiers that were not resolved are reported as
+    missing, except UDIM and file sequence templates whose tiles and frames
+    are pinned separately. Paths that are URIs can not be checked and are
+    skipped.
+
+    Args:
+        pinning_data: Mapping from identifier to pinned path, as returned by
+            `read_pinning_file` or `get_asset_dependencies`.
+        root_info: Mapping from root name to root path to fill the roots of
+            rootless paths with.
+        max_workers: Number of threads checking directories in parallel.
+
+    Returns: The missing paths and the total size of the existing files.
+
+    """
+    missing: Dict[str, str] = {}
+    directories: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+    for identifier, path in pinning_data.items():
+        if not path:
+            if "<UDIM>" not in identifier and not has_frame_token(identifier):
+                missing[identifier] = path
+            continue
+        if "://" in path:
+            continue
+
+        file_path = _fill_roots(path, root_info) if root_info else path
+        directory, name = split_pinned_path(file_path)
+        directories.setdefault(directory, {}).setdefault(name, []).append(
+            (identifier, path)
+        )
+
+    def get_file_sizes(
+        directory: str,
+    ) -> Tuple[str, Dict[str, Optional[int]]]:
+        return directory, _get_file_sizes(
+            directory or os.curdir, list(directories[directory])
+        )
+
+    file_count = 0
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        for directory, sizes in executor.map(get_file_sizes, directories):
+            for name, size in sizes.items():
+                if size is None:
+                    missing.update(directories[directory][name])
+                    continue
+                file_count += 1
+                total_bytes += size
+
+    return PinningValidation(
+        missing, file_count, total_bytes, len(directories)
+    )
+
+
+def validate_pinning_file(
+    pinning_file: str,
+    root_info: Dict[str, str],
+    max_workers: int = 8,
+) -> PinningValidation:
+    """Check that all paths of a pinning file exist, see
+    `validate_pinning_data`.
+
+    Args:
+        pinning_file: Path of the pinning file.
+        root_info: The project roots the pinning file resolves to.
+        max_workers: Number of threads checking directories in parallel.
+
+    """
+    return validate_pinning_data(
+        read_pinning_file(pinning_file), root_info, max_workers
+    )
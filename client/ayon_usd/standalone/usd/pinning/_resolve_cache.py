@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from pxr import Ar
+
+from ._file_sequences import FileSequenceExpander
+
+
+class ResolveCache:
+    """Memoized resolving of asset paths during a pinning run.
+
+    Every asset path is resolved only once per cache, which avoids repeated
+    server round trips of the AYON resolver for URIs used by many layers.
+    The number of memoized (hits) and actual (misses) resolves is counted
+    to verify duplicate resolves are eliminated, and the time spent in the
+    actual resolves is summed up in `resolve_seconds`.
+
+    The cache can be shared by threads. Resolving is not locked, so two
+    threads resolving the same path at the same time may both resolve it.
+
+    The `file_sequences` expander keeps the directory listings used to
+    find the files of UDIM paths for the lifetime of the cache.
+
+    Args:
+        resolver: The resolver to resolve the asset paths with. Defaults to
+            the resolver of the current process.
+    """
+
+    def __init__(self, resolver: Optional[Ar.Resolver] = None):
+        self.resolver = resolver or Ar.GetResolver()
+        self.hits = 0
+        self.misses = 0
+        self.resolve_seconds = 0.0
+        self._resolved_paths: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.file_sequences = FileSequenceExpander()
+
+    def resolve(self, asset_path: str) -> str:
+        """Return the resolved path string of an asset path."""
+        resolved_path = self._resolved_paths.get(asset_path)
+        if resolved_path is not None:
+            with self._lock:
+                self.hits += 1
+            return resolved_path
+
+        start = time.perf_counter()
+        resolved_path = self.resolver.Resolve(asset_path).GetPathString()
+        seconds = time.perf_counter() - start
+        self._resolved_paths[asset_path] = resolved_path
+        with self._lock:
+            self.misses += 1
+            self.resolve_seconds += seconds
+        return resolved_path
+
+    def update(self, resolved_paths: Dict[str, str]):
+        """Add asset paths resolved by other means, e.g. in a batch.
+
+        Args:
+            resolved_paths: Mapping from asset path to its resolved path.
+
+        """
+        self._resolved_paths.update(resolved_paths)
+
+    def add_counts(
+        self, hits: int, misses: int, resolve_seconds: float = 0.0
+    ):
+        """Add the counts of resolves done by another cache.
+
+        Used to account for the resolves of worker processes.
+        """
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.resolve_seconds += resolve_seconds
+
+    def __contains__(self, asset_path: str) -> bool:
+        return asset_path in self._resolved_paths
+
+    def __len__(self) -> int:
+        return len(self._resolved_paths)
@@ -0,0 +1,145 @@
+import sys
+from typing import Dict, Optional, Tuple
+
+# Key of the root name stored in the trie node of the last root segment
+_ROOT_NAME = None
+
+
+class RootPrefixTrie:
+    """Longest prefix matcher of AYON project roots in paths.
+
+    The roots are stored in a trie of their path segments, so matching a
+    path only walks as many segments as the deepest matching root instead
+    of testing every root. Roots only match whole path segments, e.g. root
+    `/mnt/proj` does not match `/mnt/project/file.usd`.
+
+    Forward and backward slashes are treated as the same separator and on
+    Windows paths are matched case-insensitive.
+
+    Args:
+        root_info: Mapping from root name to root path.
+        case_sensitive: Whether paths are matched case-sensitive. Defaults
+            to False on Windows and True otherwise.
+    """
+
+    def __init__(
+        self,
+        root_info: Dict[str, str],
+        case_sensitive: Optional[bool] = None,
+    ):
+        if case_sensitive is None:
+            case_sensitive = not sys.platform.startswith("win")
+        self._case_sensitive = case_sensitive
+        self._trie: dict = {}
+        # Rootless path and trie node of the directories made rootless
+        self._rootless_directories: Dict[
+            str, Tuple[Optional[str], Optional[dict]]
+        ] = {}
+        for root_name, root_path in root_info.items():
+            if not root_path:
+                continue
+            root_path = self._normalize(root_path).rstrip("/")
+
+            node = self._trie
+            for segment in root_path.split("/"):
+                node = node.setdefault(segment, {})
+            node[_ROOT_NAME] = root_name
+
+    def _normalize(self, path: str) -> str:
+        path = path.replace("\\", "/")
+        if not self._case_sensitive:
+            lower_path = path.lower()
+            # Keep indices of the normalized path valid for the original
+            if len(lower_path) == len(path):
+                path = lower_path
+        return path
+
+    def _walk(
+        self, path: str
+    ) -> Tuple[Optional[Tuple[str, int]], Optional[dict]]:
+        """Walk the trie along the segments of a path.
+
+        Returns: The longest matching root with the length of its prefix
+            and the trie node reached by the full path, which is None when
+            the path left the trie before its last segment.
+
+        """
+        normalized_path = self._normalize(path)
+        node = self._trie
+        match = None
+        position = 0
+        while True:
+            end = normalized_path.find("/", position)
+            if end == -1:
+                end = len(normalized_path)
+
+            node = node.get(normalized_path[position:end])
+            if node is None:
+                break
+            root_name = node.get(_ROOT_NAME)
+            if root_name is not None:
+                match = (root_name, end)
+            if end == len(normalized_path):
+                break
+            position = end + 1
+        return match, node
+
+    def match(self, path: str) -> Optional[Tuple[str, int]]:
+        """Return the longest root matching the start of a path.
+
+        Args:
+            path: The path to match.
+
+        Returns: The name of the root and the length of the matched root
+            prefix in `path`, or None if no root matches.
+
+        """
+        return self._walk(path)[0]
+
+    def _get_rootless_directory(
+        self, directory: str
+    ) -> Tuple[Optional[str], Optional[dict]]:
+        rootless_directory = self._rootless_directories.get(directory)
+        if rootless_directory is not None:
+            return rootless_directory
+
+        match, node = self._walk(directory)
+        rootless_path = None
+        if match is not None:
+            root_name, end = match
+            rootless_path = "{root[" + root_name + "]}" + directory[end:]
+        rootless_directory = (rootless_path, node)
+        self._rootless_directories[directory] = rootless_directory
+        return rootless_directory
+
+    def make_rootless(self, path: str) -> str:
+        """Replace the root of a path with its `{root[name]}` template.
+
+        The result for the parent directory of the path is cached, as the
+        paths of a pinning file usually share few directories.
+
+        Args:
+            path: The path to make rootless.
+
+        Returns: The rootless path or the path itself if no root matches.
+
+        """
+        separator_index = max(path.rfind("/"), path.rfind("\\"))
+        if separator_index == -1:
+            match = self.match(path)
+            if match is None:
+                return path
+            return "{root[" + match[0] + "]}" + path[match[1]:]
+
+        rootless_directory, node = self._get_rootless_directory(
+            path[:separator_index]
+        )
+        if node is not None:
+            # The root may end with the last segment of the path
+            leaf_node = node.get(self._normalize(path[separator_index + 1:]))
+            if leaf_node is not None and _ROOT_NAME in leaf_node:
+                return "{root[" + leaf_node[_ROOT_NAME] + "]}"
+
+        if rootless_directory is None:
+            return path
+        return rootless_directory + path[separator_index:]
@@ -0,0 +1,91 @@
+import logging
+from typing import Dict, Iterable, List
+
+log = logging.getLogger(__name__)
+
+AYON_URI_SCHEMES = ("ayon://", "ayon+entity://")
+
+# Number of URIs resolved per request to the AYON server
+URI_RESOLVE_BATCH_SIZE = 1000
+
+
+def is_ayon_uri(path: str) -> bool:
+    """Return whether a path is an AYON URI the server can resolve."""
+    return path.startswith(AYON_URI_SCHEMES)
+
+
+class AyonUriBatchResolver:
+    """Resolve AYON URIs in batches through the AYON server.
+
+    Uses the `resolve` REST endpoint of the server which accepts many URIs
+    per request, instead of a server round trip per URI. The roots of the
+    resolved paths are filled in for the site of the connection, the same
+    way the AYON USD resolver resolves them.
+
+    URIs that resolve to no path or to more than one entity are left out of
+    the result so they can be resolved by the USD resolver. The same goes
+    for all URIs of a failed batch request, e.g. when the server is busy or
+    does not support the endpoint, so they fall back to being resolved one
+    by one.
+
+    Args:
+        con (Optional[ayon_api.ServerAPI]): Connection to the AYON server.
+            Defaults to the global connection of `ayon_api`.
+        batch_size: Maximum number of URIs resolved per request.
+    """
+
+    def __init__(self, con=None, batch_size: int = URI_RESOLVE_BATCH_SIZE):
+        if con is None:
+            import ayon_api
+
+            con = ayon_api.get_server_api_connection()
+        self.con = con
+        self.batch_size = batch_size
+        self.request_count = 0
+
+    def _resolve_batch(self, uris: List[str]) -> Dict[str, str]:
+        response = self.con.post(
+            "resolve?pathOnly=true", resolveRoots=True, uris=uris
+        )
+        self.request_count += 1
+        response.raise_for_status()
+
+        resolved_paths: Dict[str, str] = {}
+        for item in response.data:
+            entities = item.get("entities") or []
+            if item.get("error") or len(entities) != 1:
+                log.debug(
+                    f"Unable to batch resolve URI {item.get('uri')}: "
+                    f"{item.get('error') or 'no unique entity'}"
+                )
+                continue
+
+            path = entities[0].get("filePath")
+            if path:
+                resolved_paths[item["uri"]] = path
+        return resolved_paths
+
+    def resolve(self, uris: Iterable[str]) -> Dict[str, str]:
+        """Resolve AYON URIs to their filepaths.
+
+        Args:
+            uris: The URIs to resolve. Paths that are no AYON URIs are
+                skipped.
+
+        Returns: Mapping from URI to its resolved filepath.
+
+        """
+        uris = sorted({uri for uri in uris if is_ayon_uri(uri)})
+        resolved_paths: Dict[str, str] = {}
+        for index in range(0, len(uris), self.batch_size):
+            batch = uris[index:index + self.batch_size]
+            try:
+                resolved_paths.update(self._resolve_batch(batch))
+            except Exception:
+                # Leave the URIs to the USD resolver
+                log.warning(
+                    f"Unable to batch resolve {len(batch)} URIs, resolving "
+                    "them one by one",
+                    exc_info=True,
+                )
+        return resolved_paths
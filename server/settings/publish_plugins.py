@@ -3,9 +3,6 @@ from ayon_server.settings import (
     SettingsField,
 )
 
-class EnabledOnlyModel(BaseSettingsModel):
-    enabled: bool = SettingsField(True)
-
 
 class EnabledBaseModel(BaseSettingsModel):
     _isGroup = True
@@ -14,6 +11,133 @@ class EnabledBaseModel(BaseSettingsModel):
     active: bool = SettingsField(True, title="Active")
 
 
+class ExtractSkeletonPinningJSONModel(BaseSettingsModel):
+    enabled: bool = SettingsField(True)
+    max_workers: int = SettingsField(
+        0,
+        title="Max Workers",
+        ge=0,
+        description=(
+            "Number of workers opening and scanning USD layers in parallel "
+            "while generating the pinning file. Set to 0 or 1 to scan the "
+            "layers one after another."
+        )
+    )
+    layer_cache_path: str = SettingsField(
+        "",
+        title="Layer Cache Path",
+        description=(
+            "Path to a local SQLite file caching the asset paths authored "
+            "in each USD layer, so unchanged layers are not read again on "
+            "the next publish. Environment variables and '~' are expanded. "
+            "Leave empty to disable the cache."
+        )
+    )
+    batch_resolve_uris: bool = SettingsField(
+        False,
+        title="Batch Resolve AYON URIs",
+        description=(
+            "Resolve the AYON URIs of the USD layers with a few batch "
+            "requests to the AYON server instead of one request per URI."
+        )
+    )
+    write_binary_pinning_file: bool = SettingsField(
+        False,
+        title="Write Binary Pinning File",
+        description=(
+            "Also write the pinning data as an indexed binary file next to "
+            "the pinning JSON, e.g. for farm tools querying single paths "
+            "without parsing the whole JSON file."
+        )
+    )
+    schema_version: int = SettingsField(
+        1,
+        title="Pinning File Schema Version",
+        ge=1,
+        le=2,
+        description=(
+            "Version 2 stores every pinned path only once, which makes the "
+            "pinning file several times smaller. Only use it when the AYON "
+            "USD Resolver on the farm supports it."
+        )
+    )
+    use_pinning_fragments: bool = SettingsField(
+        False,
+        title="Use Pinning Fragments",
+        description=(
+            "Merge the pinning fragments written next to published USD "
+            "files instead of traversing all their layers again. Requires "
+            "'Write USD pinning fragments on publish' when publishing the "
+            "USD assets."
+        )
+    )
+    write_pinning_report: bool = SettingsField(
+        False,
+        title="Write Pinning Performance Report",
+        description=(
+            "Write a JSON report of the time spent opening and scanning the "
+            "USD layers, resolving and expanding UDIM tiles and file "
+            "sequences next to the pinning file, listing the slowest layers "
+            "and directories. A summary is logged on publish."
+        )
+    )
+    trace_report_memory: bool = SettingsField(
+        False,
+        title="Trace Memory In Pinning Report",
+        description=(
+            "Add the peak memory allocated by Python to the pinning report. "
+            "Tracing the memory slows down generating the pinning file "
+            "considerably."
+        )
+    )
+    validate_pinned_paths: bool = SettingsField(
+        False,
+        title="Validate Pinned Paths",
+        description=(
+            "Check that all files pinned in the pinning file exist and fail "
+            "the publish otherwise, instead of failing the render jobs on "
+            "the farm. Also logs the total size of the pinned files."
+        )
+    )
+    use_composed_stage: bool = SettingsField(
+        False,
+        title="Pin Composed Stage Only",
+        description=(
+            "Open the USD file as a composed stage and only pin the layers "
+            "and assets it uses, leaving out unselected variants, inactive "
+            "prims and unloaded payloads. The layers are not scanned, so the "
+            "layer scan settings above do not apply."
+        )
+    )
+    population_mask: list[str] = SettingsField(
+        default_factory=list,
+        title="Population Mask",
+        description=(
+            "Prim paths the composed stage is populated with, e.g. only the "
+            "prims the render uses. All prims are populated when empty."
+        )
+    )
+    load_payloads: bool = SettingsField(
+        True,
+        title="Load Payloads",
+        description=(
+            "Load the payloads of the composed stage. Disable when the "
+            "render does not load the payloads."
+        )
+    )
+    pin_lop_stage: bool = SettingsField(
+        False,
+        title="Pin LOP Stage In Memory",
+        description=(
+            "When the render USD file is not exported yet, pin the stage of "
+            "the LOP node in memory instead of exporting the USD file only "
+            "to pin it. Asset paths are pinned as authored in the LOP stage, "
+            "so output processors changing asset paths on export, e.g. "
+            "remapping them to relative paths, break the pinning."
+        )
+    )
+
+
 class PublishPluginsModel(BaseSettingsModel):
     USDOutputProcessorRemapToRelativePaths: EnabledBaseModel = SettingsField(
         default_factory=EnabledBaseModel,
@@ -23,14 +147,26 @@ class PublishPluginsModel(BaseSettingsModel):
             " the published filepath. "
         )
     )
-    ExtractSkeletonPinningJSON: EnabledOnlyModel = SettingsField(
-        default_factory=EnabledOnlyModel,
-        title="Generate USD Resolver Pinning file on publish",
+    ExtractSkeletonPinningJSON: ExtractSkeletonPinningJSONModel = (
+        SettingsField(
+            default_factory=ExtractSkeletonPinningJSONModel,
+            title="Generate USD Resolver Pinning file on publish",
+            description=(
+                "When enabled, on publishing USD files a pinning file will "
+                "be written along with the published file that pins all "
+                "dynamic entity URIs to the paths in the pinning file. This "
+                "should be disabled when not using the USD resolver."
+            )
+        )
+    )
+    IntegratePinningFragment: EnabledBaseModel = SettingsField(
+        default_factory=EnabledBaseModel,
+        title="Write USD pinning fragments on publish",
         description=(
-            "When enabled, on publishing USD files a pinning file will be "
-            "written along with the published file that pins all dynamic "
-            "entity URIs to the paths in the pinning file. This should be "
-            "disabled when not using the USD resolver."
+            "When enabled, a pinning fragment with the resolved asset "
+            "dependencies of each published USD file is written next to it, "
+            "so generating the pinning files of shots using the published "
+            "USD file does not traverse its layers again."
         )
     )
 
@@ -42,6 +178,24 @@ DEFAULT_PUBLISH_VALUES = {
         "active": True,
     },
     "ExtractSkeletonPinningJSON": {
-        "enabled": True
-    }
+        "enabled": True,
+        "max_workers": 0,
+        "layer_cache_path": "",
+        "batch_resolve_uris": False,
+        "write_binary_pinning_file": False,
+        "schema_version": 1,
+        "use_pinning_fragments": False,
+        "write_pinning_report": False,
+        "trace_report_memory": False,
+        "validate_pinned_paths": False,
+        "use_composed_stage": False,
+        "population_mask": [],
+        "load_payloads": True,
+        "pin_lop_stage": False,
+    },
+    "IntegratePinningFragment": {
+        "enabled": False,
+        "optional": False,
+        "active": True,
+    },
 }
@@ -0,0 +1,1363 @@
+# test_pinning.py
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+pytest.importorskip("pxr")
+
+from pxr import Ar, Sdf, Usd  # noqa: E402
+
+from client.ayon_usd.standalone.usd import pinning  # noqa: E402
+from client.ayon_usd.standalone.usd.pinning import (  # noqa: E402
+    _batch_pinning,
+    _file_sequences,
+    _pinning_file_generation_funcs as pinning_funcs,
+    _pinning_file_writer,
+    _root_trie,
+)
+
+
+def _write_layer(path, sublayers=(), references=(), assets=()):
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    layer.subLayerPaths = list(sublayers)
+    prim = Sdf.CreatePrimInLayer(layer, "/root")
+    for reference in references:
+        prim.referenceList.Append(Sdf.Reference(reference))
+    for index, asset in enumerate(assets):
+        attr = Sdf.AttributeSpec(
+            prim, f"asset{index}", Sdf.ValueTypeNames.Asset)
+        attr.default = Sdf.AssetPath(asset)
+    layer.Export(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def scene_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("pinning_scene")
+
+
+def test_get_asset_dependencies_deep_chain(scene_dir):
+    depth = sys.getrecursionlimit() + 100
+    for index in range(depth):
+        sublayers = [f"./layer_{index + 1}.usda"] if index + 1 < depth else []
+        _write_layer(scene_dir / f"layer_{index}.usda", sublayers=sublayers)
+
+    entry = str(scene_dir / "layer_0.usda")
+    result = pinning_funcs.get_asset_dependencies(entry, Ar.GetResolver())
+
+    assert len(result) == depth
+    assert result[entry] == entry
+
+
+def test_get_asset_dependencies_depth_first_order(scene_dir):
+    for texture in ("shared.png", "a.png", "root.png"):
+        (scene_dir / texture).touch()
+    shared = _write_layer(scene_dir / "shared.usda", assets=["./shared.png"])
+    _write_layer(
+        scene_dir / "a.usda", references=["./shared.usda"],
+        assets=["./a.png"])
+    _write_layer(scene_dir / "b.usda", references=["./shared.usda"])
+    entry = _write_layer(
+        scene_dir / "root.usda",
+        sublayers=["./a.usda", "./b.usda"],
+        assets=["./root.png"],
+    )
+
+    processed_layers = set()
+    result = pinning_funcs.get_asset_dependencies(
+        entry, Ar.GetResolver(), processed_layers)
+
+    a_path = str(scene_dir / "a.usda")
+    b_path = str(scene_dir / "b.usda")
+    assert list(result) == [
+        entry,
+        "./root.png",
+        a_path,
+        "./a.png",
+        shared,
+        "./shared.png",
+        b_path,
+    ]
+    assert result["./shared.png"] == os.path.join(scene_dir, "shared.png")
+    assert processed_layers == {entry, a_path, b_path, shared}
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_get_asset_dependencies_parallel_matches_serial(
+        scene_dir, use_processes):
+    for index in range(4):
+        (scene_dir / f"tex_{index}.png").touch()
+        _write_layer(
+            scene_dir / f"asset_{index}.usda",
+            sublayers=[f"./asset_{(index + 1) % 4}.usda"],
+            assets=[f"./tex_{index}.png", "./tex_0.png"],
+        )
+    entry = _write_layer(
+        scene_dir / "shot.usda",
+        references=[f"./asset_{index}.usda" for index in range(4)],
+    )
+    resolver = Ar.GetResolver()
+
+    serial = pinning_funcs.get_asset_dependencies(entry, resolver)
+    parallel = pinning_funcs.get_asset_dependencies(
+        entry, resolver, settings=pinning.TraversalSettings(
+            max_workers=2, use_processes=use_processes))
+
+    assert list(parallel.items()) == list(serial.items())
+
+
+def test_get_asset_dependencies_layer_cache(scene_dir, monkeypatch):
+    for texture in ("a.png", "b.png"):
+        (scene_dir / texture).touch()
+    asset = _write_layer(scene_dir / "asset.usda", assets=["./a.png"])
+    entry = _write_layer(scene_dir / "shot.usda", references=["./asset.usda"])
+    layer_cache = pinning.LayerDependencyCache(
+        str(scene_dir / "cache" / "layers.db"))
+    settings = pinning.TraversalSettings(layer_cache=layer_cache)
+    resolver = Ar.GetResolver()
+
+    expected = pinning_funcs.get_asset_dependencies(entry, resolver)
+    assert pinning_funcs.get_asset_dependencies(
+        entry, resolver, settings=settings) == expected
+
+    read_layers = []
+    read_layer_dependencies = pinning_funcs._read_layer_dependencies
+
+    def _read_layer_dependencies(layer_key, *args):
+        read_layers.append(layer_key)
+        return read_layer_dependencies(layer_key, *args)
+
+    monkeypatch.setattr(
+        pinning_funcs, "_read_layer_dependencies", _read_layer_dependencies)
+    assert pinning_funcs.get_asset_dependencies(
+        entry, resolver, settings=settings) == expected
+    assert read_layers == []
+
+    # Changed layers are read again
+    _write_layer(scene_dir / "asset.usda", assets=["./a.png", "./b.png"])
+    os.utime(asset, ns=(0, 0))
+    result = pinning_funcs.get_asset_dependencies(
+        entry, resolver, settings=settings)
+    assert read_layers == [asset]
+    assert result["./b.png"] == str(scene_dir / "b.png")
+
+
+def test_get_asset_dependencies_resolve_cache(scene_dir):
+    (scene_dir / "shared.png").touch()
+    for index in range(3):
+        _write_layer(
+            scene_dir / f"asset_{index}.usda",
+            references=["./shared.usda"],
+            assets=["./shared.png"],
+        )
+    _write_layer(scene_dir / "shared.usda", assets=["./shared.png"])
+    entry = _write_layer(
+        scene_dir / "shot.usda",
+        references=[f"./asset_{index}.usda" for index in range(3)],
+    )
+    resolve_cache = pinning.ResolveCache()
+
+    result = pinning_funcs.get_asset_dependencies(
+        entry, Ar.GetResolver(), resolve_cache=resolve_cache)
+
+    # Entry, its three references, the shared layer and the texture
+    assert resolve_cache.misses == len(resolve_cache) == 6
+    assert resolve_cache.hits == 5
+    assert result["./shared.png"] == str(scene_dir / "shared.png")
+
+
+class _ResolveRequestHandler(BaseHTTPRequestHandler):
+    """Stand-in for the AYON server `resolve` endpoint."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({"name": "admin"})
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        request = json.loads(self.rfile.read(length))
+        self.server.requests.append((self.path, request))
+        if self.server.failing_uris.intersection(request["uris"]):
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        response = []
+        for uri in request["uris"]:
+            path = self.server.uri_paths.get(uri)
+            if path is None:
+                response.append({"uri": uri, "entities": [], "error": "x"})
+            else:
+                response.append({"uri": uri, "entities": [{"filePath": path}]})
+        self._send_json(response)
+
+
+@pytest.fixture
+def resolve_server():
+    ayon_api = pytest.importorskip("ayon_api")
+    server = HTTPServer(("127.0.0.1", 0), _ResolveRequestHandler)
+    server.requests = []
+    server.uri_paths = {}
+    server.failing_uris = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    con = ayon_api.ServerAPI(
+        f"http://127.0.0.1:{server.server_port}", token="test")
+    yield server, con
+    server.shutdown()
+    server.server_close()
+
+
+def test_uri_batch_resolver(resolve_server):
+    server, con = resolve_server
+    uris = [f"ayon+entity://project/asset_{index}" for index in range(5)]
+    server.uri_paths = {
+        uri: f"/proj/{index}.usd" for index, uri in enumerate(uris[:4])
+    }
+
+    uri_resolver = pinning.AyonUriBatchResolver(con, batch_size=2)
+    result = uri_resolver.resolve(uris + ["/not/an/uri.usd"])
+
+    assert result == server.uri_paths
+    assert uri_resolver.request_count == len(server.requests) == 3
+    path, request = server.requests[0]
+    assert path == "/api/resolve?pathOnly=true"
+    assert request == {"resolveRoots": True, "uris": uris[:2]}
+
+
+def test_uri_batch_resolver_failed_request(resolve_server):
+    server, con = resolve_server
+    uris = [f"ayon+entity://project/asset_{index}" for index in range(4)]
+    server.uri_paths = {
+        uri: f"/proj/{index}.usd" for index, uri in enumerate(uris)
+    }
+    server.failing_uris = {uris[0]}
+
+    uri_resolver = pinning.AyonUriBatchResolver(con, batch_size=2)
+    result = uri_resolver.resolve(uris)
+
+    # The URIs of the failed batch are left to the USD resolver
+    assert result == {uri: server.uri_paths[uri] for uri in uris[2:]}
+    assert uri_resolver.request_count == 2
+
+
+def test_get_asset_dependencies_batched_uris(scene_dir, resolve_server):
+    server, con = resolve_server
+    (scene_dir / "tex.png").touch()
+    _write_layer(scene_dir / "asset.usda", assets=["./tex.png"])
+    shot = _write_layer(
+        scene_dir / "shot.usda", references=["./asset.usda"])
+    entry = "ayon+entity://project/shot?product=usdShot&version=latest"
+    server.uri_paths = {entry: shot}
+
+    uri_resolver = pinning.AyonUriBatchResolver(con)
+    result = pinning_funcs.get_asset_dependencies(
+        entry, Ar.GetResolver(),
+        settings=pinning.TraversalSettings(uri_resolver=uri_resolver))
+
+    assert result[entry] == shot
+    assert result["./tex.png"] == str(scene_dir / "tex.png")
+    assert uri_resolver.request_count == 1
+
+
+def test_get_asset_dependencies_batched_uris_layer_cache(
+    scene_dir, resolve_server
+):
+    server, con = resolve_server
+    (scene_dir / "tex.png").touch()
+    _write_layer(scene_dir / "asset.usda", assets=["./tex.png"])
+    shot = _write_layer(
+        scene_dir / "shot.usda", references=["./asset.usda"])
+    entry = "ayon+entity://project/shot?product=usdShot&version=latest"
+    server.uri_paths = {entry: shot}
+    layer_cache = pinning.LayerDependencyCache(
+        str(scene_dir / "cache" / "layers.db"))
+
+    # The second run reads all layers from the warm cache
+    results = [
+        pinning_funcs.get_asset_dependencies(
+            entry, Ar.GetResolver(), settings=pinning.TraversalSettings(
+                layer_cache=layer_cache,
+                uri_resolver=pinning.AyonUriBatchResolver(con)))
+        for _ in range(2)
+    ]
+    assert results[0] == results[1]
+    assert results[1]["./tex.png"] == str(scene_dir / "tex.png")
+
+
+def test_remove_root_from_dependency_info():
+    root_info = {
+        "work": "/mnt/my-projects (v2)",
+        "publish": "/mnt/my-projects (v2)/publish/",
+    }
+    dependency_info = {
+        "./tex.png": "/mnt/my-projects (v2)/shot/tex.png",
+        "/mnt/my-projects (v2)/publish/a.usd": (
+            "/mnt/my-projects (v2)/publish/a.usd"),
+        "ayon+entity://project/asset": "/mnt/my-projects (v2)2/asset.usd",
+    }
+
+    assert pinning_funcs.remove_root_from_dependency_info(
+        dependency_info, root_info
+    ) == {
+        "./tex.png": "{root[work]}/shot/tex.png",
+        "{root[publish]}/a.usd": "{root[publish]}/a.usd",
+        "ayon+entity://project/asset": "/mnt/my-projects (v2)2/asset.usd",
+    }
+
+
+def test_root_prefix_trie_windows_paths():
+    trie = _root_trie.RootPrefixTrie(
+        {"work": "P:/Projects", "unc": "\\\\server\\share"},
+        case_sensitive=False,
+    )
+
+    assert trie.make_rootless("p:\\projects\\shot\\a.usd") == (
+        "{root[work]}\\shot\\a.usd")
+    assert trie.make_rootless("//server/share/a.usd") == (
+        "{root[unc]}/a.usd")
+    assert trie.make_rootless("P:/Projects") == "{root[work]}"
+    assert trie.make_rootless("Q:/Projects/a.usd") == "Q:/Projects/a.usd"
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_pinning_file_writer_matches_json(tmp_path_factory, indent):
+    output_path = str(tmp_path_factory.mktemp("pinning") / "pinning.json")
+    pinning_data = {"./a.usd": "{root[work]}/a.usd", "./ü.png": "/b\\c.png"}
+
+    with pinning.PinningFileWriter(output_path, indent=indent) as writer:
+        writer.write_entries(pinning_data.items())
+        writer.write("./ü.png", "/b\\c.png")
+
+    with open(output_path) as pinning_file:
+        content = pinning_file.read()
+    assert content == json.dumps(
+        {"ayon_resolver_pinning_data": pinning_data},
+        indent=indent,
+        separators=None if indent else (",", ":"),
+    )
+    assert os.listdir(os.path.dirname(output_path)) == ["pinning.json"]
+
+
+@pytest.mark.parametrize("compact_entries", [False, True])
+@pytest.mark.parametrize("schema_version", [1, 2])
+def test_pinning_file_writer_last_path_wins(
+    tmp_path_factory, schema_version, compact_entries
+):
+    output_path = str(tmp_path_factory.mktemp("pinning") / "pinning.json")
+    entries = [
+        ("./a.usd", "/proj/a.usd"),
+        ("./b.usd", "/proj/b.usd"),
+        ("./a.usd", "/proj/a_v002.usd"),
+        ("./c.usd", "/proj/c.usd"),
+    ]
+
+    with pinning.PinningFileWriter(
+        output_path,
+        schema_version=schema_version,
+        compact_entries=compact_entries,
+    ) as writer:
+        writer.write_entries(entries)
+        assert len(writer) == 3
+
+    pinning_data = pinning.read_pinning_file(output_path)
+    assert list(pinning_data.items()) == list(dict(entries).items())
+    if schema_version == 2:
+        with open(output_path) as pinning_file:
+            data = json.load(pinning_file)["ayon_resolver_pinning_data"]
+        assert len(data["paths"]) == 3
+
+
+def test_pinning_file_writer_is_atomic(tmp_path_factory):
+    output_path = str(tmp_path_factory.mktemp("pinning") / "pinning.json")
+    pinning_funcs._write_pinning_file(output_path, {"./a.usd": "/a.usd"})
+
+    with pytest.raises(RuntimeError):
+        with pinning.PinningFileWriter(output_path) as writer:
+            writer.write("./b.usd", "/b.usd")
+            raise RuntimeError("Traversal failed")
+
+    with open(output_path) as pinning_file:
+        assert json.load(pinning_file) == {
+            "ayon_resolver_pinning_data": {"./a.usd": "/a.usd"}
+        }
+    assert os.listdir(os.path.dirname(output_path)) == ["pinning.json"]
+
+
+def test_atomic_write(tmp_path_factory):
+    output_dir = tmp_path_factory.mktemp("atomic")
+    output_path = str(output_dir / "data" / "report.json")
+    with _pinning_file_writer.atomic_write(output_path) as file:
+        file.write("first")
+
+    with pytest.raises(RuntimeError):
+        with _pinning_file_writer.atomic_write(output_path) as file:
+            file.write("second")
+            raise RuntimeError("Writing failed")
+
+    with open(output_path) as file:
+        assert file.read() == "first"
+    assert os.listdir(output_dir / "data") == ["report.json"]
+
+
+def test_generate_pinning_file(scene_dir):
+    (scene_dir / "tex.png").touch()
+    _write_layer(scene_dir / "asset.usda", assets=["./tex.png"])
+    entry = _write_layer(scene_dir / "shot.usda", references=["./asset.usda"])
+    output_path = str(scene_dir / "pinning" / "shot.json")
+
+    pinning.generate_pinning_file(
+        entry, {"work": str(scene_dir)}, output_path)
+
+    with open(output_path) as pinning_file:
+        data = json.load(pinning_file)
+    assert data == {
+        "ayon_resolver_pinning_data": {
+            "{root[work]}/shot.usda": "{root[work]}/shot.usda",
+            "{root[work]}/asset.usda": "{root[work]}/asset.usda",
+            "./tex.png": "{root[work]}/tex.png",
+            "ayon_pinning_data_entry_scene": entry,
+        }
+    }
+
+
+def test_generate_pinning_file_shared_identifier(scene_dir):
+    # Both assets pin the same identifier to their own texture
+    for asset in ("a", "b"):
+        (scene_dir / asset).mkdir()
+        (scene_dir / asset / "tex.png").touch()
+        _write_layer(scene_dir / asset / "asset.usda", assets=["./tex.png"])
+    entry = _write_layer(
+        scene_dir / "shot.usda",
+        references=["./a/asset.usda", "./b/asset.usda"],
+    )
+    root_info = {"work": str(scene_dir)}
+    output_path = str(scene_dir / "pinning" / "shot.json")
+
+    pinning.generate_pinning_file(
+        entry, root_info, output_path, write_binary=True)
+
+    expected = dict(pinning_funcs._iter_rootless_dependency_info(
+        pinning_funcs.iter_asset_dependencies(entry, Ar.GetResolver()),
+        root_info,
+    ))
+    expected["ayon_pinning_data_entry_scene"] = entry
+    assert expected["./tex.png"] == "{root[work]}/b/tex.png"
+    assert pinning.read_pinning_file(output_path) == expected
+    with pinning.BinaryPinningFile(
+        pinning.get_binary_pinning_path(output_path)
+    ) as binary_pinning:
+        assert binary_pinning.lookup("./tex.png") == "{root[work]}/b/tex.png"
+
+
+def test_binary_pinning_file_lookup(tmp_path_factory):
+    output_path = str(tmp_path_factory.mktemp("pinning") / "shot_pin.bin")
+    pinning_data = {
+        f"./asset_{index}/ü_{index % 7}.usd": (
+            f"{{root[work]}}/project/asset_{index}/v{index % 3:03d}.usd")
+        for index in range(1000)
+    }
+    pinning_data["ayon_pinning_data_entry_scene"] = "/shot.usd"
+
+    pinning.write_binary_pinning_file(output_path, pinning_data)
+
+    with pinning.BinaryPinningFile(output_path) as binary_pinning:
+        assert len(binary_pinning) == len(pinning_data)
+        for identifier, path in pinning_data.items():
+            assert binary_pinning.lookup(identifier) == path
+        for identifier in ("", "./", "./asset_5", "./asset_999/z", "zzz"):
+            assert binary_pinning.lookup(identifier) is None
+        assert list(binary_pinning.items()) == sorted(
+            pinning_data.items(), key=lambda item: item[0].encode("utf-8"))
+
+
+def test_binary_pinning_file_invalid(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pinning") / "shot_pin.bin"
+    path.write_bytes(b"{}" * 32)
+
+    with pytest.raises(ValueError):
+        pinning.BinaryPinningFile(str(path))
+
+
+def test_generate_pinning_file_binary(scene_dir):
+    (scene_dir / "tex.png").touch()
+    _write_layer(scene_dir / "asset.usda", assets=["./tex.png"])
+    entry = _write_layer(scene_dir / "shot.usda", references=["./asset.usda"])
+    output_path = str(scene_dir / "pinning" / "shot_pin.json")
+
+    pinning.generate_pinning_file(
+        entry, {"work": str(scene_dir)}, output_path, write_binary=True)
+
+    binary_path = pinning.get_binary_pinning_path(output_path)
+    assert binary_path == str(scene_dir / "pinning" / "shot_pin.bin")
+    with open(output_path) as pinning_file:
+        pinning_data = json.load(pinning_file)["ayon_resolver_pinning_data"]
+    with pinning.BinaryPinningFile(binary_path) as binary_pinning:
+        assert dict(binary_pinning.items()) == pinning_data
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_pinning_file_schema_v2(tmp_path_factory, indent):
+    pinning_dir = tmp_path_factory.mktemp("pinning")
+    pinning_data = {
+        "{root[work]}/shot.usd": "{root[work]}/shot.usd",
+        "./tex.1001.exr": "{root[work]}/tex/tex.1001.exr",
+        "./tex.<UDIM>.exr": "{root[work]}/tex/tex.1001.exr",
+        "ayon+entity://project/asset": "C:\\project\\asset.usd",
+        "ayon_pinning_data_entry_scene": "shot.usd",
+    }
+    v1_path = str(pinning_dir / "v1.json")
+    v2_path = str(pinning_dir / "v2.json")
+
+    pinning_funcs._write_pinning_file(v1_path, pinning_data)
+    pinning_funcs._write_pinning_file(
+        v2_path, pinning_data, indent=indent, schema_version=2)
+
+    with open(v2_path) as pinning_file:
+        file_data = json.load(pinning_file)
+    assert file_data == {
+        "ayon_resolver_pinning_version": 2,
+        "ayon_resolver_pinning_data": {
+            "identifiers": {
+                "./tex.1001.exr": 1,
+                "./tex.<UDIM>.exr": 1,
+                "ayon+entity://project/asset": 2,
+                "ayon_pinning_data_entry_scene": 3,
+            },
+            "self_pinned": [0],
+            "paths": [[0, "shot.usd"], [1, "tex.1001.exr"],
+                      [2, "asset.usd"], [3, "shot.usd"]],
+            "directories": [
+                "{root[work]}/", "{root[work]}/tex/", "C:\\project\\", ""],
+        },
+    }
+    assert pinning.read_pinning_file(v2_path) == pinning_data
+    assert pinning.read_pinning_file(v1_path) == pinning_data
+
+
+def test_pinning_file_schema_unsupported(tmp_path_factory):
+    output_path = str(tmp_path_factory.mktemp("pinning") / "pinning.json")
+
+    with pytest.raises(ValueError):
+        pinning.PinningFileWriter(output_path, schema_version=3)
+    with pytest.raises(ValueError):
+        pinning.expand_pinning_data({
+            "ayon_resolver_pinning_version": 3,
+            "ayon_resolver_pinning_data": {},
+        })
+
+
+def test_resolve_udim_matches_usd(scene_dir):
+    from pxr import UsdShade
+
+    texture_dir = scene_dir / "textures"
+    texture_dir.mkdir()
+    for tile in (1001, 1002, 1011, 1100):
+        (texture_dir / f"color.{tile}.exr").touch()
+    for name in ("color.1000.exr", "color.1001.exr.bak", "color.10010.exr",
+                 "roughness.1001.exr", "color.1003.tx"):
+        (texture_dir / name).touch()
+    udim_path = str(texture_dir / "color.<UDIM>.exr")
+    file_sequences = pinning.ResolveCache().file_sequences
+
+    expected = {
+        udim_path.replace("<UDIM>", tile): path
+        for path, tile in UsdShade.UdimUtils.ResolveUdimTilePaths(
+            udim_path, None)
+    }
+    result = pinning_funcs._resolve_udim(udim_path, file_sequences)
+
+    assert list(result.items()) == list(expected.items())
+    assert len(result) == 4
+    assert pinning_funcs._resolve_udim(
+        str(texture_dir / "roughness.<UDIM>.exr"), file_sequences
+    ) == {str(texture_dir / "roughness.1001.exr"): str(
+        texture_dir / "roughness.1001.exr")}
+    assert pinning_funcs._resolve_udim(
+        str(scene_dir / "missing" / "color.<UDIM>.exr"), file_sequences
+    ) == {}
+    assert file_sequences.listing_count == 2
+
+
+def test_get_asset_dependencies_file_sequences(scene_dir):
+    for directory, names in {
+        "vdb": ["smoke.0999.vdb", "smoke.1000.vdb", "smoke.1001.vdb",
+                "smoke.1001.vdb.bak", "fire.1001.vdb"],
+        "clips": ["clip.001.usd", "clip.002.usd", "clip.010.usd",
+                  "clip.1.usd", "manifest.usd"],
+    }.items():
+        (scene_dir / directory).mkdir()
+        for name in names:
+            (scene_dir / directory / name).touch()
+
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim = Sdf.CreatePrimInLayer(layer, "/volume/density")
+    attr = Sdf.AttributeSpec(prim, "filePath", Sdf.ValueTypeNames.Asset)
+    attr.default = Sdf.AssetPath("./vdb/smoke.$F4.vdb")
+    clip_prim = Sdf.CreatePrimInLayer(layer, "/clipped")
+    clip_prim.SetInfo("clips", {
+        "default": {
+            "templateAssetPath": "./clips/clip.###.usd",
+            "manifestAssetPath": Sdf.AssetPath("./clips/manifest.usd"),
+            "primPath": "/clipped",
+        },
+        "explicit": {
+            "assetPaths": Sdf.AssetPathArray(
+                [Sdf.AssetPath("./clips/clip.1.usd")]),
+            "primPath": "/clipped",
+        },
+    })
+    entry = str(scene_dir / "shot.usda")
+    layer.Export(entry)
+
+    result = pinning_funcs.get_asset_dependencies(entry, Ar.GetResolver())
+
+    def path(name):
+        return str(scene_dir / name)
+
+    assert result == {
+        entry: entry,
+        "./vdb/smoke.$F4.vdb": "",
+        path("vdb/smoke.0999.vdb"): path("vdb/smoke.0999.vdb"),
+        path("vdb/smoke.1000.vdb"): path("vdb/smoke.1000.vdb"),
+        path("vdb/smoke.1001.vdb"): path("vdb/smoke.1001.vdb"),
+        "./clips/clip.###.usd": "",
+        path("clips/clip.001.usd"): path("clips/clip.001.usd"),
+        path("clips/clip.002.usd"): path("clips/clip.002.usd"),
+        path("clips/clip.010.usd"): path("clips/clip.010.usd"),
+        "./clips/manifest.usd": path("clips/manifest.usd"),
+        "./clips/clip.1.usd": path("clips/clip.1.usd"),
+    }
+
+
+def test_file_sequence_expander_frame_tokens(scene_dir):
+    for name in ("a.0001.exr", "a.0002.exr", "a.12345.exr", "a.1.exr",
+                 "b.001.250.usd", "b.001.500.usd", "b.002.usd"):
+        (scene_dir / name).touch()
+    file_sequences = _file_sequences.FileSequenceExpander()
+
+    for token in ("%04d", "####", "$F4"):
+        frames = file_sequences.expand_frames(
+            str(scene_dir / f"a.{token}.exr"))
+        assert [frame for frame, _ in frames] == ["0001", "0002", "12345"]
+    assert file_sequences.expand_frames(str(scene_dir / "a.$F.exr")) == [
+        (frame, str(scene_dir / f"a.{frame}.exr"))
+        for frame in ("0001", "1", "0002", "12345")
+    ]
+    assert [
+        frame for frame, _ in file_sequences.expand_frames(
+            str(scene_dir / "b.###.###.usd"))
+    ] == ["001.250", "001.500"]
+    assert file_sequences.expand_frames(str(scene_dir / "a.exr")) is None
+    assert file_sequences.listing_count == 1
+
+
+def _write_attribute_scene(scene_dir):
+    """Layer with asset attributes of all kinds, the textures exist."""
+    texture_dir = scene_dir / "tex"
+    texture_dir.mkdir()
+    for name in ("a.png", "b.png", "c.png", "d.1001.exr", "d.1002.exr"):
+        (texture_dir / name).touch()
+
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    for index in range(3):
+        prim = Sdf.CreatePrimInLayer(layer, f"/root/geo/mesh_{index}")
+        attr = Sdf.AttributeSpec(prim, "tex", Sdf.ValueTypeNames.Asset)
+        attr.default = Sdf.AssetPath("./tex/a.png")
+        float_attr = Sdf.AttributeSpec(prim, "size", Sdf.ValueTypeNames.Float)
+        float_attr.default = 1.0
+
+    prim = Sdf.CreatePrimInLayer(layer, "/root/material")
+    udim_attr = Sdf.AttributeSpec(prim, "udim", Sdf.ValueTypeNames.Asset)
+    udim_attr.default = Sdf.AssetPath("./tex/d.<UDIM>.exr")
+    absolute_attr = Sdf.AttributeSpec(
+        prim, "absolute", Sdf.ValueTypeNames.Asset)
+    absolute_attr.default = Sdf.AssetPath(str(texture_dir / "c.png"))
+    array_attr = Sdf.AttributeSpec(
+        prim, "array", Sdf.ValueTypeNames.AssetArray)
+    array_attr.default = Sdf.AssetPathArray(
+        [Sdf.AssetPath("./tex/a.png"), Sdf.AssetPath("./tex/b.png")])
+    sampled_attr = Sdf.AttributeSpec(
+        prim, "sampled", Sdf.ValueTypeNames.Asset)
+    for time, name in enumerate(["a.png", "b.png", "a.png", "missing.png"]):
+        layer.SetTimeSample(
+            sampled_attr.path, time, Sdf.AssetPath(f"./tex/{name}"))
+
+    entry = str(scene_dir / "shot.usda")
+    layer.Export(entry)
+    return entry
+
+
+def _write_composition_scene(scene_dir):
+    """Layers composed with sublayers, references, payloads and variants."""
+    (scene_dir / "tex.png").touch()
+    (scene_dir / "variant.png").touch()
+    _write_layer(scene_dir / "sub.usda", assets=["./tex.png"])
+    _write_layer(scene_dir / "ref.usda", assets=["./tex.png"])
+    _write_layer(scene_dir / "variant.usda")
+
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    layer.subLayerPaths = ["./sub.usda"]
+    prim = Sdf.CreatePrimInLayer(layer, "/root")
+    prim.referenceList.Append(Sdf.Reference("./ref.usda"))
+    prim.payloadList.Append(Sdf.Payload("./ref.usda", "/root"))
+    variant_set = Sdf.VariantSetSpec(prim, "look")
+    variant = Sdf.VariantSpec(variant_set, "red")
+    variant.primSpec.referenceList.Append(Sdf.Reference("./variant.usda"))
+    attr = Sdf.AttributeSpec(
+        variant.primSpec, "tex", Sdf.ValueTypeNames.Asset)
+    attr.default = Sdf.AssetPath("./variant.png")
+
+    entry = str(scene_dir / "shot.usda")
+    layer.Export(entry)
+    return entry
+
+
+@pytest.mark.parametrize("write_scene, expected", [
+    (_write_attribute_scene, {
+        "shot.usda": "shot.usda",
+        "./tex/a.png": "tex/a.png",
+        "tex/c.png": "tex/c.png",
+        "./tex/b.png": "tex/b.png",
+        "./tex/missing.png": "",
+        "./tex/d.<UDIM>.exr": "",
+    }),
+    (_write_composition_scene, {
+        "shot.usda": "shot.usda",
+        "./variant.png": "variant.png",
+        "ref.usda": "ref.usda",
+        "./tex.png": "tex.png",
+        "sub.usda": "sub.usda",
+        "variant.usda": "variant.usda",
+    }),
+])
+def test_get_asset_dependencies_prim_spec_walk(
+    scene_dir, write_scene, expected
+):
+    entry = write_scene(scene_dir)
+
+    def path(name):
+        return str(scene_dir / name) if name else ""
+
+    result = pinning_funcs.get_asset_dependencies(entry, Ar.GetResolver())
+
+    assert result == {
+        identifier if identifier.startswith("./") else path(identifier):
+            path(resolved)
+        for identifier, resolved in expected.items()
+    }
+
+
+def test_prim_spec_asset_values_are_deduplicated():
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim = Sdf.CreatePrimInLayer(layer, "/root")
+    sampled_attr = Sdf.AttributeSpec(
+        prim, "sampled", Sdf.ValueTypeNames.Asset)
+    for time, name in enumerate(["a.png", "a.png", "b.png", "a.png"]):
+        layer.SetTimeSample(sampled_attr.path, time, Sdf.AssetPath(name))
+    array_attr = Sdf.AttributeSpec(
+        prim, "array", Sdf.ValueTypeNames.AssetArray)
+    for time in range(10):
+        layer.SetTimeSample(array_attr.path, time, Sdf.AssetPathArray(
+            [Sdf.AssetPath("c.png"), Sdf.AssetPath(f"d{time % 2}.png")]
+        ))
+    child = Sdf.CreatePrimInLayer(layer, "/root/child")
+    child_attr = Sdf.AttributeSpec(child, "tex", Sdf.ValueTypeNames.Asset)
+    child_attr.default = Sdf.AssetPath("b.png")
+
+    assert pinning_funcs._get_prim_spec_hierarchy_external_refs(
+        layer.pseudoRoot, layer
+    ) == ["a.png", "b.png", "c.png", "d0.png", "d1.png"]
+
+
+@pytest.mark.parametrize("max_workers", [0, 4])
+def test_get_asset_dependencies_releases_layers(
+    scene_dir, monkeypatch, max_workers
+):
+    layer_paths = []
+    for index in range(20):
+        layer_paths.append(_write_layer(
+            scene_dir / f"layer_{index}.usda", sublayers=layer_paths[-1:]))
+    # The host session holds one of the layers
+    host_layer = Sdf.Layer.FindOrOpen(layer_paths[5])
+
+    memory_stats = pinning.LayerMemoryStats()
+    pinning_funcs.get_asset_dependencies(
+        layer_paths[-1],
+        Ar.GetResolver(),
+        settings=pinning.TraversalSettings(
+            max_workers=max_workers, memory_stats=memory_stats),
+    )
+    assert memory_stats.opened_layer_count == 19
+    assert memory_stats.retained_layer_count == 0
+    assert memory_stats.peak_layer_count <= len(
+        Sdf.Layer.GetLoadedLayers()) + max(max_workers, 1)
+    assert memory_stats.peak_rss is not None
+    assert Sdf.Layer.Find(layer_paths[5]) == host_layer
+    assert not Sdf.Layer.Find(layer_paths[0])
+
+    # Layers held by something else after their scan are reported
+    held_layers = []
+    get_opened_layer_dependencies = (
+        pinning_funcs._get_opened_layer_dependencies)
+
+    def _get_held_layer_dependencies(layer, *args):
+        held_layers.append(layer)
+        return get_opened_layer_dependencies(layer, *args)
+
+    monkeypatch.setattr(
+        pinning_funcs,
+        "_get_opened_layer_dependencies",
+        _get_held_layer_dependencies,
+    )
+    memory_stats = pinning.LayerMemoryStats()
+    pinning_funcs.get_asset_dependencies(
+        layer_paths[-1], Ar.GetResolver(),
+        settings=pinning.TraversalSettings(memory_stats=memory_stats))
+    assert memory_stats.retained_layer_count == 19
+    assert memory_stats.peak_layer_count == len(Sdf.Layer.GetLoadedLayers())
+
+
+def test_path_store_matches_dict():
+    entries = [
+        ("./tex/a.png", "/proj/asset/tex/a.png"),
+        ("/proj/tex/b.1001.exr", "/proj/tex/b.1001.exr"),
+        ("ayon://proj/asset?product=model", "/proj/asset/model_v001.usd"),
+        ("C:\\proj\\tex\\c.png", "C:\\proj\\tex\\c.png"),
+        ("./tex/a.png", "/proj/asset/tex/a_v002.png"),
+        ("./tex/ü.png", "/proj/tex/ü.png"),
+    ]
+    expected = dict(entries)
+    for index in range(100):
+        path = f"/proj/tex/d.{1001 + index}.exr"
+        entries.append((path, path))
+        expected[path] = path
+
+    store = pinning.PathStore(entries)
+    assert dict(store) == expected
+    assert list(store.items()) == list(expected.items())
+    assert len(store) == len(expected)
+    assert store["./tex/a.png"] == "/proj/asset/tex/a_v002.png"
+    assert "./tex/missing.png" not in store
+    assert store.get("./tex/missing.png") is None
+    assert store.directory_count == 6
+
+    assert not store.add("./tex/a.png", "/proj/other.png")
+    assert store.setdefault("./tex/a.png", "/proj/other.png") == (
+        "/proj/asset/tex/a_v002.png")
+    assert store.add("./tex/e.png", "/proj/tex/e.png")
+    assert store["./tex/e.png"] == "/proj/tex/e.png"
+
+
+@pytest.mark.parametrize("max_workers", [0, 4])
+def test_get_dependency_graph(scene_dir, max_workers):
+    entry = _write_composition_scene(scene_dir)
+    resolver = Ar.GetResolver()
+
+    graph = pinning.get_dependency_graph(
+        entry, resolver,
+        settings=pinning.TraversalSettings(max_workers=max_workers))
+
+    assert graph.get_pinning_data() == pinning_funcs.get_asset_dependencies(
+        entry, resolver)
+    assert list(graph.iter_pinning_entries()) == list(
+        pinning_funcs.iter_asset_dependencies(entry, resolver))
+
+    sub_layer = str(scene_dir / "sub.usda")
+    ref_layer = str(scene_dir / "ref.usda")
+    variant_layer = str(scene_dir / "variant.usda")
+    texture = str(scene_dir / "tex.png")
+    assert graph.layer_key == entry
+    assert set(graph.layers) == {entry, sub_layer, ref_layer, variant_layer}
+    assert sorted(graph.get_dependencies(entry)) == sorted([
+        (str(scene_dir / "variant.png"), "asset"),
+        (sub_layer, "sublayer"),
+        (ref_layer, "payload"),
+        (variant_layer, "reference"),
+    ])
+    assert sorted(graph.get_dependents(texture)) == [
+        (ref_layer, "asset"),
+        (sub_layer, "asset"),
+    ]
+    assert graph.get_all_dependents(texture) == {
+        entry, sub_layer, ref_layer}
+    assert graph.get_all_dependents(entry) == set()
+
+    graph_file = str(scene_dir / "graph.json")
+    pinning.write_dependency_graph(graph_file, graph)
+    loaded_graph = pinning.read_dependency_graph(graph_file)
+    assert loaded_graph.layers == graph.layers
+    assert loaded_graph.layer_path == graph.layer_path
+    assert loaded_graph.get_pinning_data() == graph.get_pinning_data()
+
+
+def test_generate_pinning_file_dependency_graph(scene_dir):
+    entry = _write_composition_scene(scene_dir)
+    root_info = {"work": str(scene_dir)}
+    output_path = str(scene_dir / "shot_pin.json")
+    graph_output_path = str(scene_dir / "graph" / "shot_pin.json")
+    graph_file = str(scene_dir / "graph" / "shot_graph.json")
+
+    pinning.generate_pinning_file(entry, root_info, output_path)
+    pinning.generate_pinning_file(
+        entry, root_info, graph_output_path, dependency_graph_file=graph_file)
+
+    with open(output_path) as pinning_file:
+        expected = pinning_file.read()
+    with open(graph_output_path) as pinning_file:
+        assert pinning_file.read() == expected
+    assert len(pinning.read_dependency_graph(graph_file)) == 4
+
+
+def test_generate_pinning_file_delta(scene_dir):
+    for texture in ("a.png", "b.png", "c.png"):
+        (scene_dir / texture).touch()
+    _write_layer(scene_dir / "asset.usda", assets=["./a.png", "./b.png"])
+    entry = _write_layer(scene_dir / "shot.usda", references=["./asset.usda"])
+    root_info = {"work": str(scene_dir)}
+    base_file = str(scene_dir / "v001" / "shot_pin.json")
+    pinning.generate_pinning_file(entry, root_info, base_file)
+
+    # The next version uses another texture and a new one
+    _write_layer(scene_dir / "asset.usda", assets=["./a.png", "./c.png"])
+    full_file = str(scene_dir / "full" / "shot_pin.json")
+    pinning.generate_pinning_file(entry, root_info, full_file)
+    delta_file = str(scene_dir / "v002" / "shot_pin.json")
+    pinning.generate_pinning_file(
+        entry, root_info, delta_file, base_pinning_file=base_file)
+
+    with open(delta_file) as pinning_file:
+        delta = json.load(pinning_file)["ayon_resolver_pinning_delta"]
+    assert delta["base"] == "../v001/shot_pin.json"
+    assert delta["added"] == {"./c.png": "{root[work]}/c.png"}
+    assert delta["changed"] == {}
+    assert delta["removed"] == ["./b.png"]
+
+    expected = pinning.read_pinning_file(full_file)
+    assert pinning.read_pinning_file(delta_file) == expected
+
+    # Deltas can be based on deltas
+    _write_layer(scene_dir / "asset.usda", assets=["./c.png"])
+    chained_file = str(scene_dir / "v003" / "shot_pin.json")
+    pinning.generate_pinning_file(
+        entry, root_info, chained_file, base_pinning_file=delta_file)
+    pinning.generate_pinning_file(entry, root_info, full_file)
+
+    materialized_file = str(scene_dir / "v003" / "shot_pin_full.json")
+    pinning.materialize_pinning_file(chained_file, materialized_file)
+    with open(materialized_file) as pinning_file:
+        materialized = json.load(pinning_file)["ayon_resolver_pinning_data"]
+    assert materialized == pinning.read_pinning_file(full_file)
+
+    # A changed base invalidates the delta
+    with open(base_file, "a") as pinning_file:
+        pinning_file.write(" ")
+    with pytest.raises(ValueError):
+        pinning.read_pinning_file(delta_file)
+    with pytest.raises(ValueError):
+        pinning.PinningDeltaWriter(base_file, base_file)
+
+
+@pytest.mark.parametrize("max_workers", [0, 4])
+def test_get_asset_dependencies_pinning_fragments(
+    scene_dir, monkeypatch, max_workers
+):
+    for texture in ("a.png", "b.png", "c.png", "shot.png"):
+        (scene_dir / texture).touch()
+    geo = _write_layer(scene_dir / "geo.usda", assets=["./a.png"])
+    asset = _write_layer(
+        scene_dir / "asset.usda", sublayers=["./geo.usda"],
+        assets=["./b.png"])
+    entry = _write_layer(
+        scene_dir / "shot.usda", references=["./asset.usda"],
+        assets=["./shot.png"])
+
+    fragment_file = pinning.generate_pinning_fragment(asset)
+    assert fragment_file == str(scene_dir / "asset_pin_fragment.json")
+
+    read_layers = []
+    read_layer_dependencies = pinning_funcs._read_layer_dependencies
+
+    def _read_counted_layer_dependencies(layer_key, *args):
+        read_layers.append(layer_key)
+        return read_layer_dependencies(layer_key, *args)
+
+    monkeypatch.setattr(
+        pinning_funcs,
+        "_read_layer_dependencies",
+        _read_counted_layer_dependencies,
+    )
+
+    def _get_asset_dependencies(use_fragments):
+        read_layers.clear()
+        return pinning_funcs.get_asset_dependencies(
+            entry,
+            Ar.GetResolver(),
+            settings=pinning.TraversalSettings(
+                max_workers=max_workers, use_fragments=use_fragments),
+        )
+
+    expected = _get_asset_dependencies(use_fragments=False)
+    assert _get_asset_dependencies(use_fragments=True) == expected
+    assert read_layers == [entry]
+
+    # Fragments with changed layers are ignored
+    _write_layer(scene_dir / "geo.usda", assets=["./a.png", "./c.png"])
+    expected = _get_asset_dependencies(use_fragments=False)
+    assert "./c.png" in expected
+    assert _get_asset_dependencies(use_fragments=True) == expected
+    assert sorted(read_layers) == sorted([entry, asset, geo])
+
+
+def test_generate_pinning_file_fragments_shared_identifier(scene_dir):
+    # Both geometries of the asset pin the same identifier to their own
+    # texture
+    for geo in ("a", "b"):
+        (scene_dir / geo).mkdir()
+        (scene_dir / geo / "tex.png").touch()
+        _write_layer(scene_dir / geo / "geo.usda", assets=["./tex.png"])
+    asset = _write_layer(
+        scene_dir / "asset.usda",
+        references=["./a/geo.usda", "./b/geo.usda"],
+    )
+    entry = _write_layer(scene_dir / "shot.usda", references=["./asset.usda"])
+    pinning.generate_pinning_fragment(asset)
+    root_info = {"work": str(scene_dir)}
+
+    full_file = str(scene_dir / "full" / "shot_pin.json")
+    pinning.generate_pinning_file(entry, root_info, full_file)
+    fragment_file = str(scene_dir / "fragments" / "shot_pin.json")
+    pinning.generate_pinning_file(
+        entry, root_info, fragment_file,
+        settings=pinning.TraversalSettings(use_fragments=True))
+
+    expected = pinning.read_pinning_file(full_file)
+    assert expected["./tex.png"] == "{root[work]}/b/tex.png"
+    assert pinning.read_pinning_file(fragment_file) == expected
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_pinning_cli(scene_dir, processes, monkeypatch):
+    from client.ayon_usd.standalone.usd.pinning.__main__ import main
+
+    (scene_dir / "a.png").touch()
+    _write_layer(scene_dir / "asset.usda", assets=["./a.png"])
+    shots = [
+        _write_layer(
+            scene_dir / f"sh{index}0.usda", references=["./asset.usda"])
+        for index in range(1, 4)
+    ]
+    root_info = {"work": str(scene_dir)}
+    with open(scene_dir / "manifest.json", "w") as manifest_file:
+        json.dump({
+            "sh20.usda": "pins/sh20.json",
+            "missing.usda": "pins/missing.json",
+        }, manifest_file)
+
+    layer_cache = str(scene_dir / "cache" / "layers.db")
+    exit_code = main([
+        shots[0],
+        shots[2],
+        "--manifest", str(scene_dir / "manifest.json"),
+        "--root", f"work={scene_dir}",
+        "--processes", str(processes),
+        "--layer-cache", layer_cache,
+    ])
+    # The missing entry fails without stopping the other entries
+    assert exit_code == 1
+    assert not (scene_dir / "pins" / "missing.json").exists()
+    assert os.path.exists(layer_cache)
+
+    pinning_files = [
+        scene_dir / "sh10_pin.json",
+        scene_dir / "pins" / "sh20.json",
+        scene_dir / "sh30_pin.json",
+    ]
+    for shot, pinning_file in zip(shots, pinning_files):
+        expected_file = str(scene_dir / "expected.json")
+        pinning.generate_pinning_file(shot, root_info, expected_file)
+        assert pinning.read_pinning_file(str(pinning_file)) == (
+            pinning.read_pinning_file(expected_file))
+
+    assert main([
+        shots[0], "--root", f"work={scene_dir}", "--processes", "1",
+        "--validate",
+    ]) == 0
+
+    # Relative entries are pinned relative to the working directory
+    monkeypatch.chdir(scene_dir)
+    assert main([
+        "sh10.usda", "--root", f"work={scene_dir}", "--processes", "1",
+        "--output-dir", "output",
+    ]) == 0
+    assert pinning.read_pinning_file(
+        str(scene_dir / "output" / "sh10_pin.json")
+    ) == pinning.read_pinning_file(str(scene_dir / "sh10_pin.json"))
+
+    assert pinning.read_pinning_manifest(
+        str(scene_dir / "manifest.json")
+    ) == {
+        str(scene_dir / "sh20.usda"): str(scene_dir / "pins" / "sh20.json"),
+        str(scene_dir / "missing.usda"): str(
+            scene_dir / "pins" / "missing.json"),
+    }
+
+
+def test_get_batch_entries_output_dir(scene_dir):
+    shots = [
+        str(scene_dir / shot / "shot.usda")
+        for shot in ("sq1/sh10", "sq1/sh20", "sq2/sh10")
+    ]
+    output_dir = str(scene_dir / "pins")
+
+    entries = _batch_pinning.get_batch_entries(shots, output_dir=output_dir)
+
+    assert entries == {
+        shots[0]: os.path.join(output_dir, "sq1", "sh10", "shot_pin.json"),
+        shots[1]: os.path.join(output_dir, "sq1", "sh20", "shot_pin.json"),
+        shots[2]: os.path.join(output_dir, "sq2", "sh10", "shot_pin.json"),
+    }
+    assert _batch_pinning.get_batch_entries(
+        shots[:1], output_dir=output_dir
+    ) == {shots[0]: os.path.join(output_dir, "shot_pin.json")}
+
+    # Entries pinned to the same pinning file fail
+    with open(scene_dir / "manifest.json", "w") as manifest_file:
+        json.dump({"other.usda": "pins/shot_pin.json"}, manifest_file)
+    with pytest.raises(ValueError):
+        _batch_pinning.get_batch_entries(
+            shots[:1], str(scene_dir / "manifest.json"), output_dir)
+
+
+@pytest.mark.parametrize("max_workers", [0, 4])
+def test_generate_pinning_file_report(scene_dir, max_workers):
+    import tracemalloc
+
+    for frame in (1001, 1002, 1003):
+        (scene_dir / f"smoke.{frame}.vdb").touch()
+    layer_paths = []
+    for index in range(5):
+        layer_paths.append(_write_layer(
+            scene_dir / f"layer_{index}.usda", sublayers=layer_paths[-1:],
+            assets=["./smoke.$F4.vdb"]))
+    pinning_file = str(scene_dir / "shot_pin.json")
+
+    report = pinning.PinningReport(slowest_layer_count=3, trace_memory=True)
+    pinning.generate_pinning_file(
+        layer_paths[-1], {"work": str(scene_dir)}, pinning_file,
+        settings=pinning.TraversalSettings(
+            max_workers=max_workers, report=report))
+    assert not tracemalloc.is_tracing()
+
+    report_file = pinning.get_pinning_report_path(pinning_file)
+    assert report_file == str(scene_dir / "shot_pin_report.json")
+    with open(report_file) as file:
+        data = json.load(file)
+    assert data["layers"]["opened"] == 5
+    assert data["resolves"]["count"] == report.resolve_count > 0
+    assert data["resolves"]["seconds"] > 0
+    # The frames are expanded for each layer using them
+    assert data["expansions"]["paths"] == 15
+    assert data["memory"]["traced_peak_bytes"] > 0
+    assert len(data["slowest_layers"]) == 3
+    assert set(
+        layer["layer"] for layer in data["slowest_layers"]
+    ) <= set(layer_paths)
+    assert data["slowest_directories"] == [{
+        "directory": str(scene_dir),
+        "layers": 5,
+        "seconds": pytest.approx(
+            data["layers"]["open_seconds"] + data["layers"]["scan_seconds"]),
+    }]
+    assert "Slowest layers:" in report.summary()
+
+    # Failed runs are reported as well
+    report = pinning.PinningReport()
+    missing_file = str(scene_dir / "missing_pin.json")
+    with pytest.raises(ValueError):
+        pinning.generate_pinning_file(
+            str(scene_dir / "missing.usda"), {"work": str(scene_dir)},
+            missing_file, settings=pinning.TraversalSettings(report=report))
+    assert os.path.exists(pinning.get_pinning_report_path(missing_file))
+
+
+@pytest.mark.parametrize("file_count", [2, 10])
+def test_validate_pinning_file(scene_dir, file_count):
+    texture_dir = scene_dir / "textures"
+    texture_dir.mkdir()
+    assets = []
+    for index in range(file_count):
+        (texture_dir / f"tex_{index}.png").write_bytes(b"x" * index)
+        assets.append(f"./textures/tex_{index}.png")
+    (texture_dir / "smoke.1001.vdb").write_bytes(b"x" * 100)
+    assets.extend(["./textures/smoke.$F4.vdb", "./missing.png"])
+    entry = _write_layer(scene_dir / "shot.usda", assets=assets)
+    pinning_file = str(scene_dir / "shot_pin.json")
+    root_info = {"work": str(scene_dir)}
+    pinning.generate_pinning_file(entry, root_info, pinning_file)
+
+    validation = pinning.validate_pinning_file(pinning_file, root_info)
+    # The unresolved texture is missing, the frame template is not
+    assert validation.missing == {"./missing.png": ""}
+    assert not validation.is_valid
+    # The textures, the frame and the entry layer
+    assert validation.file_count == file_count + 2
+    assert validation.total_bytes == (
+        sum(range(file_count)) + 100 + os.path.getsize(entry))
+    assert validation.directory_count == 2
+    assert "1 missing" in validation.summary()
+
+    # Pinned paths deleted after pinning are missing
+    os.remove(texture_dir / "tex_1.png")
+    validation = pinning.validate_pinning_file(pinning_file, root_info)
+    assert validation.missing == {
+        "./missing.png": "",
+        "./textures/tex_1.png": "{root[work]}/textures/tex_1.png",
+    }
+
+
+def _write_variant_scene(scene_dir):
+    for name in ("a", "b", "inactive", "payload", "masked"):
+        (scene_dir / f"{name}.png").touch()
+        asset_layer = Sdf.Layer.FindOrOpen(_write_layer(
+            scene_dir / f"{name}.usda", assets=[f"./{name}.png"]))
+        asset_layer.defaultPrim = "root"
+        asset_layer.Save()
+
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim = Sdf.CreatePrimInLayer(layer, "/root")
+    variant_set = Sdf.VariantSetSpec(prim, "look")
+    for name in ("a", "b"):
+        variant = Sdf.VariantSpec(variant_set, name)
+        variant.primSpec.referenceList.Append(
+            Sdf.Reference(f"./{name}.usda"))
+        attr = Sdf.AttributeSpec(
+            variant.primSpec, "texture", Sdf.ValueTypeNames.Asset)
+        attr.default = Sdf.AssetPath(f"./{name}.png")
+    prim.variantSetNameList.Prepend("look")
+    prim.variantSelections["look"] = "a"
+
+    inactive = Sdf.CreatePrimInLayer(layer, "/inactive")
+    inactive.active = False
+    Sdf.CreatePrimInLayer(layer, "/inactive/child").referenceList.Append(
+        Sdf.Reference("./inactive.usda"))
+    Sdf.CreatePrimInLayer(layer, "/payload").payloadList.Append(
+        Sdf.Payload("./payload.usda"))
+    Sdf.CreatePrimInLayer(layer, "/masked").referenceList.Append(
+        Sdf.Reference("./masked.usda"))
+    layer.Export(str(scene_dir / "shot.usda"))
+    return str(scene_dir / "shot.usda")
+
+
+def test_get_stage_asset_dependencies(scene_dir):
+    entry = _write_variant_scene(scene_dir)
+    resolver = Ar.GetResolver()
+    layer_result = pinning_funcs.get_asset_dependencies(entry, resolver)
+    assert {os.path.basename(path) for path in layer_result} == {
+        "shot.usda", "a.usda", "a.png", "b.usda", "b.png", "inactive.usda",
+        "inactive.png", "payload.usda", "payload.png", "masked.usda",
+        "masked.png",
+    }
+
+    def get_pinned_names(**kwargs):
+        result = pinning.get_stage_asset_dependencies(
+            entry, resolver, **kwargs)
+        # The stage pins a subset of the layer traversal
+        for identifier, path in result.items():
+            assert layer_result[identifier] == path
+        return {
+            os.path.basename(identifier) for identifier in result
+            if identifier != entry
+        }
+
+    # Unselected variants and inactive prims are not pinned
+    assert get_pinned_names() == {
+        "a.usda", "a.png", "payload.usda", "payload.png",
+        "masked.usda", "masked.png",
+    }
+    assert get_pinned_names(load_rules=Usd.StageLoadRules.LoadNone()) == {
+        "a.usda", "a.png", "masked.usda", "masked.png",
+    }
+    assert get_pinned_names(population_mask=["/root", "/payload"]) == {
+        "a.usda", "a.png", "payload.usda", "payload.png",
+    }
+
+    pinning_file = str(scene_dir / "shot_pin.json")
+    pinning.generate_pinning_file(
+        entry, {"work": str(scene_dir)}, pinning_file,
+        stage_settings=pinning.StageSettings(load_payloads=False))
+    pinning_data = pinning.read_pinning_file(pinning_file)
+    assert "{root[work]}/payload.usda" not in pinning_data.values()
+    assert pinning_data["./a.png"] == "{root[work]}/a.png"
+
+
+@pytest.mark.parametrize("max_workers", [0, 4])
+def test_get_asset_dependencies_in_memory(
+    scene_dir, tmp_path_factory, max_workers
+):
+    for texture in ("asset.png", "edit.png", "lop.png"):
+        (scene_dir / texture).touch()
+    asset = _write_layer(scene_dir / "asset.usda", assets=["./asset.png"])
+
+    # Unsaved edit of a layer on disk
+    asset_layer = Sdf.Layer.FindOrOpen(asset)
+    asset_layer.defaultPrim = "root"
+    attr = Sdf.AttributeSpec(
+        asset_layer.GetPrimAtPath("/root"), "edit", Sdf.ValueTypeNames.Asset)
+    attr.default = Sdf.AssetPath("./edit.png")
+
+    # Anonymous layers of a host, e.g. Houdini LOPs
+    lop_layer = Sdf.Layer.CreateAnonymous("lop")
+    prim = Sdf.CreatePrimInLayer(lop_layer, "/lop")
+    prim.referenceList.Append(Sdf.Reference(asset))
+    attr = Sdf.AttributeSpec(prim, "texture", Sdf.ValueTypeNames.Asset)
+    attr.default = Sdf.AssetPath(str(scene_dir / "lop.png"))
+    root_layer = Sdf.Layer.CreateAnonymous("root")
+    root_layer.subLayerPaths.append(lop_layer.identifier)
+    stage = Usd.Stage.Open(root_layer)
+
+    expected = {
+        asset: asset,
+        "./asset.png": str(scene_dir / "asset.png"),
+        "./edit.png": str(scene_dir / "edit.png"),
+        str(scene_dir / "lop.png"): str(scene_dir / "lop.png"),
+    }
+    layer_cache = pinning.LayerDependencyCache(
+        str(tmp_path_factory.mktemp("cache") / "layers.db"))
+    for entry in (root_layer, stage):
+        result = pinning_funcs.get_asset_dependencies(
+            entry, Ar.GetResolver(), settings=pinning.TraversalSettings(
+                max_workers=max_workers, use_processes=max_workers > 1,
+                layer_cache=layer_cache))
+        assert result == expected
+    assert pinning.get_stage_asset_dependencies(
+        stage, Ar.GetResolver()) == expected
+    assert pinning.get_stage_asset_dependencies(
+        stage, Ar.GetResolver(), population_mask=["/other"]) == {}
+
+    pinning_file = str(scene_dir / "shot_pin.json")
+    root_info = {"work": str(scene_dir)}
+    with pytest.raises(ValueError):
+        pinning.generate_pinning_file(stage, root_info, pinning_file)
+    pinning.generate_pinning_file(
+        stage, root_info, pinning_file,
+        entry_scene=str(scene_dir / "shot.usd"))
+    pinning_data = pinning.read_pinning_file(pinning_file)
+    assert pinning_data["./edit.png"] == "{root[work]}/edit.png"
+    assert pinning_data["ayon_pinning_data_entry_scene"] == str(
+        scene_dir / "shot.usd")
@@ -0,0 +1,917 @@
+# test_pinning_benchmarks.py
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from typing import NamedTuple
+
+import pytest
+
+pytest.importorskip("pxr")
+
+from pxr import Ar, Sdf, UsdShade  # noqa: E402
+
+from client.ayon_usd.standalone.usd import pinning  # noqa: E402
+from client.ayon_usd.standalone.usd.pinning import (  # noqa: E402
+    _pinning_file_generation_funcs as pinning_funcs,
+)
+
+
+CHAIN_LENGTH = 10_000
+ROOTLESS_ENTRY_COUNT = 1_000_000
+BINARY_ENTRY_COUNT = 1_000_000
+BINARY_LOOKUP_COUNT = 10_000
+SEQUENCE_FRAME_COUNT = 240
+SEQUENCE_UDIM_COUNT = 100
+UDIM_MAP_COUNT = 10
+UDIM_TILE_COUNT = 1000
+UDIM_MATERIAL_COUNT = 20
+VOLUME_FRAME_COUNT = 2000
+VOLUME_FIELD_COUNT = 10
+DENSE_PRIM_COUNT = 20_000
+PATH_STORE_ENTRY_COUNT = 500_000
+DELTA_ENTRY_COUNT = 200_000
+TIME_SAMPLE_COUNT = 2000
+PROTOTYPE_COUNT = 200
+LIBRARY_ASSET_COUNT = 50
+LIBRARY_LAYER_COUNT = 40
+LIBRARY_SHOT_COUNT = 20
+VALIDATION_DIRECTORY_COUNT = 20
+VALIDATION_FILE_COUNT = 2000
+VARIANT_ASSET_COUNT = 50
+VARIANT_COUNT = 10
+VARIANT_TEXTURE_COUNT = 20
+LOP_PRIM_COUNT = 20_000
+
+# The benchmarks only run when this environment variable is set
+BENCHMARKS_ENV = "AYON_USD_BENCHMARKS"
+# Appends the results of the benchmarks to this JSON lines file and
+# compares them with the previous results of the same benchmark
+BENCHMARK_RESULTS_ENV = "AYON_USD_BENCHMARK_RESULTS"
+# Fails a benchmark slower than its previous result by more than this factor
+BENCHMARK_MAX_SLOWDOWN_ENV = "AYON_USD_BENCHMARK_MAX_SLOWDOWN"
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv(BENCHMARKS_ENV),
+    reason=f"Benchmarks only run with {BENCHMARKS_ENV} set",
+)
+
+
+def _recursive_get_asset_dependencies(layer_path, resolver, processed):
+    """Reference of the former recursive traversal that merged per level.
+
+    Every level builds its own mapping and the parent copies it with
+    `dict.update`, which is the overhead the work stack traversal removes.
+    """
+    identifier_to_path = {}
+    resolved = resolver.Resolve(layer_path).GetPathString()
+    if resolved in processed:
+        return {}
+    processed.add(resolved)
+
+    layer = Sdf.Layer.FindOrOpen(resolved)
+    identifier_to_path[layer_path] = resolved
+    for ref in layer.GetCompositionAssetDependencies():
+        ref_path = resolver.Resolve(
+            layer.ComputeAbsolutePath(ref)).GetPathString()
+        identifier_to_path[ref_path] = ref_path
+        identifier_to_path.update(
+            _recursive_get_asset_dependencies(ref_path, resolver, processed)
+        )
+    return identifier_to_path
+
+
+def _run_with_deep_stack(func):
+    """Run `func` in a thread that allows recursing along the whole chain."""
+    result = {}
+    recursion_limit = sys.getrecursionlimit()
+    stack_size = threading.stack_size()
+
+    def _target():
+        result["value"] = func()
+
+    sys.setrecursionlimit(CHAIN_LENGTH * 4)
+    threading.stack_size(512 * 1024 * 1024)
+    try:
+        thread = threading.Thread(target=_target)
+        thread.start()
+        thread.join()
+    finally:
+        threading.stack_size(stack_size)
+        sys.setrecursionlimit(recursion_limit)
+    return result["value"]
+
+
+@pytest.fixture(scope="module")
+def layer_chain(tmp_path_factory):
+    """Write a sublayer chain of `CHAIN_LENGTH` layers."""
+    chain_dir = tmp_path_factory.mktemp("layer_chain")
+    for index in range(CHAIN_LENGTH):
+        layer = Sdf.Layer.CreateAnonymous(".usda")
+        if index + 1 < CHAIN_LENGTH:
+            layer.subLayerPaths = [f"./layer_{index + 1}.usda"]
+        layer.Export(str(chain_dir / f"layer_{index}.usda"))
+    return str(chain_dir / "layer_0.usda")
+
+
+def test_benchmark_layer_chain_traversal(layer_chain):
+    resolver = Ar.GetResolver()
+
+    start = time.perf_counter()
+    recursive_result = _run_with_deep_stack(
+        lambda: _recursive_get_asset_dependencies(
+            layer_chain, resolver, set())
+    )
+    recursive_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pinning_funcs.get_asset_dependencies(layer_chain, resolver)
+    duration = time.perf_counter() - start
+
+    print(
+        f"{CHAIN_LENGTH} layer chain: recursive merge "
+        f"{recursive_duration:.3f}s, work stack {duration:.3f}s"
+    )
+    assert result == recursive_result
+    assert len(result) == CHAIN_LENGTH
+    _check_benchmark_results("layer_chain_traversal", {
+        "duration": duration, "recursive_duration": recursive_duration})
+
+
+def test_benchmark_layer_chain_memory(layer_chain):
+    resolver = Ar.GetResolver()
+    loaded_layer_count = len(Sdf.Layer.GetLoadedLayers())
+
+    memory_stats = pinning.LayerMemoryStats()
+    start = time.perf_counter()
+    result = pinning_funcs.get_asset_dependencies(
+        layer_chain, resolver,
+        settings=pinning.TraversalSettings(memory_stats=memory_stats))
+    duration = time.perf_counter() - start
+
+    print(
+        f"{CHAIN_LENGTH} layer chain in {duration:.3f}s: "
+        f"{memory_stats.summary()}"
+    )
+    assert len(result) == CHAIN_LENGTH
+    assert memory_stats.opened_layer_count == CHAIN_LENGTH
+    # Only the layer being scanned is loaded at a time
+    assert memory_stats.peak_layer_count <= loaded_layer_count + 1
+
+
+def test_benchmark_dependency_graph(layer_chain, tmp_path_factory):
+    resolver = Ar.GetResolver()
+    graph = pinning.get_dependency_graph(layer_chain, resolver)
+    graph_file = str(tmp_path_factory.mktemp("graph") / "graph.json")
+
+    start = time.perf_counter()
+    pinning.write_dependency_graph(graph_file, graph)
+    graph = pinning.read_dependency_graph(graph_file)
+    serialize_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = pinning_funcs.get_asset_dependencies(layer_chain, resolver)
+    traversal_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = graph.get_pinning_data()
+    duration = time.perf_counter() - start
+
+    print(
+        f"{CHAIN_LENGTH} layer chain: traversal {traversal_duration:.3f}s, "
+        f"derived from graph {duration:.3f}s, graph file "
+        f"{os.path.getsize(graph_file) / 1024:.0f} KiB written and read in "
+        f"{serialize_duration:.3f}s"
+    )
+    assert result == expected
+    _check_benchmark_results("dependency_graph", {
+        "duration": duration, "traversal_duration": traversal_duration})
+
+
+def test_benchmark_pinning_fragments(tmp_path_factory):
+    library_dir = tmp_path_factory.mktemp("library")
+    assets = []
+    for asset_index in range(LIBRARY_ASSET_COUNT):
+        sublayers = []
+        for layer_index in range(LIBRARY_LAYER_COUNT):
+            layer = Sdf.Layer.CreateNew(str(
+                library_dir / f"asset_{asset_index}_{layer_index}.usda"))
+            layer.subLayerPaths = sublayers[-1:]
+            layer.Save()
+            sublayers.append(layer.identifier)
+        assets.append(sublayers[-1])
+
+    shots = []
+    for shot_index in range(LIBRARY_SHOT_COUNT):
+        shot = Sdf.Layer.CreateNew(str(library_dir / f"shot_{shot_index}.usda"))
+        prim = Sdf.CreatePrimInLayer(shot, "/shot")
+        for asset in assets:
+            prim.referenceList.Append(Sdf.Reference(asset))
+        shot.Save()
+        shots.append(shot.identifier)
+
+    resolver = Ar.GetResolver()
+
+    def _pin_shots(use_fragments):
+        start = time.perf_counter()
+        results = [
+            pinning_funcs.get_asset_dependencies(
+                shot, resolver, settings=pinning.TraversalSettings(
+                    use_fragments=use_fragments))
+            for shot in shots
+        ]
+        return results, time.perf_counter() - start
+
+    expected, traversal_duration = _pin_shots(use_fragments=False)
+
+    start = time.perf_counter()
+    for asset in assets:
+        pinning.generate_pinning_fragment(asset)
+    fragment_duration = time.perf_counter() - start
+
+    results, duration = _pin_shots(use_fragments=True)
+
+    print(
+        f"{LIBRARY_SHOT_COUNT} shots of {LIBRARY_ASSET_COUNT} assets with "
+        f"{LIBRARY_LAYER_COUNT} layers: traversal {traversal_duration:.3f}s, "
+        f"merging fragments {duration:.3f}s, fragments written once in "
+        f"{fragment_duration:.3f}s"
+    )
+    assert results == expected
+    _check_benchmark_results("pinning_fragments", {
+        "duration": duration, "traversal_duration": traversal_duration})
+
+
+def _regex_remove_root_from_dependency_info(dependency_info, root_info):
+    """Reference of the former regex alternation root removal."""
+    replacements = {path: name for name, path in root_info.items()}
+    regx = re.compile("|".join(f"({re.escape(path)})" for path in replacements))
+
+    def _replace_match(match):
+        return "{root[" + replacements[match.group(0)] + "]}"
+
+    return {
+        regx.sub(_replace_match, key): regx.sub(_replace_match, path)
+        for key, path in dependency_info.items()
+    }
+
+
+def test_benchmark_remove_root_from_dependency_info():
+    root_info = {
+        "work": "/mnt/studio/work",
+        "publish": "/mnt/studio/publish",
+        "cache": "/mnt/cache",
+    }
+    roots = list(root_info.values())
+    dependency_info = {}
+    for index in range(ROOTLESS_ENTRY_COUNT):
+        root = roots[index % len(roots)]
+        path = f"{root}/project/seq/shot_{index // 1000}/tex.{index}.exr"
+        key = f"./tex.{index}.exr" if index % 2 else path
+        dependency_info[key] = path
+
+    start = time.perf_counter()
+    regex_result = _regex_remove_root_from_dependency_info(
+        dependency_info, root_info)
+    regex_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pinning_funcs.remove_root_from_dependency_info(
+        dependency_info, root_info)
+    duration = time.perf_counter() - start
+
+    print(
+        f"{ROOTLESS_ENTRY_COUNT} entries root removal: regex "
+        f"{regex_duration:.3f}s, prefix trie {duration:.3f}s"
+    )
+    assert result == regex_result
+    _check_benchmark_results("remove_root_from_dependency_info", {
+        "duration": duration, "regex_duration": regex_duration})
+
+
+def _iter_udim_entries(count):
+    """Yield unique pinning entries of UDIM tiles of many assets.
+
+    Half of the tiles are pinned to themselves, the other half are
+    identified by a path relative to their asset.
+    """
+    for index in range(count):
+        asset = f"asset_{index // 10_000}"
+        name = f"color_{index // 1000 % 10}.{1001 + index % 1000}.exr"
+        path = (
+            f"/mnt/studio/publish/project/assets/{asset}/texture/v001/{name}"
+        )
+        key = path if index % 2 else f"./{asset}/texture/{name}"
+        yield key, path
+
+
+def _measure_peak_memory(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def test_benchmark_path_store_memory():
+    dict_result, dict_peak = _measure_peak_memory(
+        lambda: dict(_iter_udim_entries(PATH_STORE_ENTRY_COUNT)))
+    store, store_peak = _measure_peak_memory(
+        lambda: pinning.PathStore(_iter_udim_entries(PATH_STORE_ENTRY_COUNT)))
+
+    print(
+        f"{PATH_STORE_ENTRY_COUNT} UDIM entries: dict "
+        f"{dict_peak / 1024 ** 2:.1f} MiB, path store "
+        f"{store_peak / 1024 ** 2:.1f} MiB"
+    )
+    assert len(store) == len(dict_result)
+    for key in list(dict_result)[::1000]:
+        assert store[key] == dict_result[key]
+    assert store_peak < dict_peak / 2
+
+
+def test_benchmark_binary_pinning_lookup(tmp_path_factory):
+    pinning_dir = tmp_path_factory.mktemp("binary_pinning")
+    pinning_data = {
+        f"./shot_{index // 1000}/tex.{index}.exr": (
+            f"{{root[work]}}/project/seq/shot_{index // 1000}/tex.{index}.exr")
+        for index in range(BINARY_ENTRY_COUNT)
+    }
+    json_path = str(pinning_dir / "shot_pin.json")
+    binary_path = str(pinning_dir / "shot_pin.bin")
+    pinning_funcs._write_pinning_file(json_path, pinning_data)
+    pinning.write_binary_pinning_file(binary_path, pinning_data)
+    step = BINARY_ENTRY_COUNT // BINARY_LOOKUP_COUNT
+    identifiers = list(pinning_data)[::step]
+    del pinning_data
+
+    start = time.perf_counter()
+    with open(json_path) as pinning_file:
+        json_data = json.load(pinning_file)["ayon_resolver_pinning_data"]
+    json_paths = [json_data[identifier] for identifier in identifiers]
+    json_duration = time.perf_counter() - start
+    del json_data
+
+    start = time.perf_counter()
+    with pinning.BinaryPinningFile(binary_path) as binary_pinning:
+        paths = [
+            binary_pinning.lookup(identifier) for identifier in identifiers
+        ]
+    duration = time.perf_counter() - start
+
+    print(
+        f"{len(identifiers)} lookups in {BINARY_ENTRY_COUNT} entries: "
+        f"JSON load {json_duration:.3f}s, binary {duration:.3f}s "
+        f"({duration / len(identifiers) * 1e6:.1f}us per lookup), "
+        f"{os.path.getsize(binary_path) / os.path.getsize(json_path):.0%} "
+        f"of the JSON size"
+    )
+    assert paths == json_paths
+    _check_benchmark_results("binary_pinning_lookup", {
+        "duration": duration, "json_duration": json_duration})
+
+
+def test_benchmark_pinning_schema_v2(tmp_path_factory):
+    pinning_dir = tmp_path_factory.mktemp("pinning_schema")
+    shot_dir = "{root[work]}/project/sequences/sq010/sh0100/publish"
+    pinning_data = {}
+    for frame in range(1001, 1001 + SEQUENCE_FRAME_COUNT):
+        layer = f"{shot_dir}/usd/v012/cache.{frame:04d}.usd"
+        pinning_data[layer] = layer
+        for udim in range(1001, 1001 + SEQUENCE_UDIM_COUNT):
+            texture = f"{shot_dir}/textures/v003/color.{udim}.exr"
+            pinning_data[f"./textures/color.{frame}.{udim}.exr"] = texture
+    v1_path = str(pinning_dir / "v1.json")
+    v2_path = str(pinning_dir / "v2.json")
+    pinning_funcs._write_pinning_file(v1_path, pinning_data)
+    pinning_funcs._write_pinning_file(v2_path, pinning_data, schema_version=2)
+
+    durations = []
+    for path in (v1_path, v2_path):
+        start = time.perf_counter()
+        with open(path) as pinning_file:
+            json.load(pinning_file)
+        durations.append(time.perf_counter() - start)
+
+    v1_size = os.path.getsize(v1_path)
+    v2_size = os.path.getsize(v2_path)
+    print(
+        f"{len(pinning_data)} entries: v1 {v1_size / 1e6:.1f}MB parsed in "
+        f"{durations[0]:.3f}s, v2 {v2_size / 1e6:.1f}MB parsed in "
+        f"{durations[1]:.3f}s"
+    )
+    assert pinning.read_pinning_file(v2_path) == pinning_data
+    assert v2_size * 2 < v1_size
+
+
+def test_benchmark_pinning_delta(tmp_path_factory):
+    pinning_dir = tmp_path_factory.mktemp("pinning_delta")
+    base_data = dict(_iter_udim_entries(DELTA_ENTRY_COUNT))
+    base_path = str(pinning_dir / "v001" / "shot_pin.json")
+    pinning_funcs._write_pinning_file(base_path, base_data)
+
+    # Every 50th texture is updated to a new version
+    pinning_data = {
+        identifier: (
+            path.replace("/v001/", "/v002/") if index % 50 == 0 else path
+        )
+        for index, (identifier, path) in enumerate(base_data.items())
+    }
+    full_path = str(pinning_dir / "v002" / "shot_pin.json")
+    delta_path = str(pinning_dir / "v002" / "shot_pin_delta.json")
+
+    start = time.perf_counter()
+    pinning_funcs._write_pinning_file(full_path, pinning_data)
+    full_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with pinning.PinningDeltaWriter(delta_path, base_path) as writer:
+        writer.write_entries(pinning_data.items())
+    duration = time.perf_counter() - start
+
+    full_size = os.path.getsize(full_path)
+    delta_size = os.path.getsize(delta_path)
+    print(
+        f"{DELTA_ENTRY_COUNT} entries, 2% changed: full file "
+        f"{full_size / 1e6:.1f}MB written in {full_duration:.3f}s, delta "
+        f"{delta_size / 1e6:.1f}MB written in {duration:.3f}s"
+    )
+    assert pinning.read_pinning_file(delta_path) == pinning_data
+    assert delta_size * 10 < full_size
+
+
+def test_benchmark_udim_expansion(tmp_path_factory):
+    texture_dir = tmp_path_factory.mktemp("udim_textures")
+    udim_paths = []
+    for map_index in range(UDIM_MAP_COUNT):
+        for tile in range(1001, 1001 + UDIM_TILE_COUNT):
+            (texture_dir / f"map_{map_index}.{tile}.exr").touch()
+        udim_paths.append(str(texture_dir / f"map_{map_index}.<UDIM>.exr"))
+    # Every material of the asset uses all maps of the texture directory
+    udim_paths *= UDIM_MATERIAL_COUNT
+
+    start = time.perf_counter()
+    usd_results = [
+        {
+            udim_path.replace("<UDIM>", tile): path
+            for path, tile in UsdShade.UdimUtils.ResolveUdimTilePaths(
+                udim_path, None)
+        }
+        for udim_path in udim_paths
+    ]
+    usd_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    file_sequences = pinning.ResolveCache().file_sequences
+    results = [
+        pinning_funcs._resolve_udim(udim_path, file_sequences)
+        for udim_path in udim_paths
+    ]
+    duration = time.perf_counter() - start
+
+    # UdimUtils only looks for the tiles up to 1100
+    usd_tile_count = sum(len(result) for result in usd_results)
+    tile_count = sum(len(result) for result in results)
+    print(
+        f"{len(udim_paths)} UDIM paths of {UDIM_TILE_COUNT} tiles: "
+        f"UdimUtils {usd_duration:.3f}s for {usd_tile_count} tiles, "
+        f"cached listing {duration:.3f}s for {tile_count} tiles"
+    )
+    for result, usd_result in zip(results, usd_results):
+        assert len(result) == UDIM_TILE_COUNT
+        assert usd_result.items() <= result.items()
+    assert file_sequences.listing_count == 1
+    _check_benchmark_results("udim_expansion", {
+        "tile_duration": duration / tile_count,
+        "usd_tile_duration": usd_duration / usd_tile_count,
+    })
+
+
+def test_benchmark_frame_sequence_expansion(tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("volume_cache")
+    frames = range(1001, 1001 + VOLUME_FRAME_COUNT)
+    sequence_paths = []
+    for field_index in range(VOLUME_FIELD_COUNT):
+        for frame in frames:
+            (cache_dir / f"field_{field_index}.{frame:04d}.vdb").touch()
+        sequence_paths.append(str(cache_dir / f"field_{field_index}.$F4.vdb"))
+    resolver = Ar.GetResolver()
+
+    # Reference of resolving every frame of the shot frame range
+    start = time.perf_counter()
+    resolved_results = []
+    for sequence_path in sequence_paths:
+        result = {}
+        for frame in frames:
+            frame_path = sequence_path.replace("$F4", f"{frame:04d}")
+            resolved_path = resolver.Resolve(frame_path).GetPathString()
+            if resolved_path:
+                result[frame_path] = resolved_path
+        resolved_results.append(result)
+    resolve_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    file_sequences = pinning.ResolveCache().file_sequences
+    results = [
+        pinning_funcs._resolve_frames(sequence_path, file_sequences)
+        for sequence_path in sequence_paths
+    ]
+    duration = time.perf_counter() - start
+
+    print(
+        f"{VOLUME_FIELD_COUNT} sequences of {VOLUME_FRAME_COUNT} frames: "
+        f"resolve per frame {resolve_duration:.3f}s, "
+        f"cached listing {duration:.3f}s"
+    )
+    assert results == resolved_results
+    assert file_sequences.listing_count == 1
+    _check_benchmark_results("frame_sequence_expansion", {
+        "duration": duration, "resolve_duration": resolve_duration})
+
+
+def test_benchmark_dense_layer_scan(tmp_path_factory):
+    layer_path = str(tmp_path_factory.mktemp("dense_layer") / "dense.usdc")
+    layer = Sdf.Layer.CreateAnonymous(".usdc")
+    with Sdf.ChangeBlock():
+        for index in range(DENSE_PRIM_COUNT):
+            prim = Sdf.CreatePrimInLayer(
+                layer, f"/root/group_{index // 100}/mesh_{index}")
+            for attr_index in range(5):
+                attr = Sdf.AttributeSpec(
+                    prim, f"tex_{attr_index}", Sdf.ValueTypeNames.Asset)
+                attr.default = Sdf.AssetPath(
+                    f"./tex/tex_{index % 50}_{attr_index}.exr")
+                attr = Sdf.AttributeSpec(
+                    prim, f"value_{attr_index}", Sdf.ValueTypeNames.Float)
+                attr.default = 1.0
+    layer.Export(layer_path)
+    layer = Sdf.Layer.FindOrOpen(layer_path)
+
+    start = time.perf_counter()
+    result = pinning_funcs._read_layer_dependencies(layer_path)
+    duration = time.perf_counter() - start
+
+    print(
+        f"{DENSE_PRIM_COUNT} prims with 5 asset attributes each: "
+        f"{duration:.3f}s"
+    )
+    assert len(result.assets) == 50 * 5
+    _check_benchmark_results("dense_layer_scan", {"duration": duration})
+
+
+def _list_prim_spec_asset_values_with_duplicates(prim, layer):
+    """Collect asset values like the scanner did before deduplication."""
+    prop_data = []
+    for prop in prim.properties:
+        for sample_time in layer.ListTimeSamplesForPath(prop.path):
+            value = layer.QueryTimeSample(prop.path, sample_time)
+            if hasattr(value, "__iter__"):
+                prop_data.extend(item.path for item in value)
+            else:
+                prop_data.append(value.path)
+    return prop_data
+
+
+def test_benchmark_time_sample_scan():
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim = Sdf.CreatePrimInLayer(layer, "/instancer")
+    prototypes_attr = Sdf.AttributeSpec(
+        prim, "prototypes", Sdf.ValueTypeNames.AssetArray)
+    prototypes = Sdf.AssetPathArray([
+        Sdf.AssetPath(f"./proto/proto_{index}.usd")
+        for index in range(PROTOTYPE_COUNT)
+    ])
+    texture_attr = Sdf.AttributeSpec(
+        prim, "texture", Sdf.ValueTypeNames.Asset)
+    with Sdf.ChangeBlock():
+        for frame in range(TIME_SAMPLE_COUNT):
+            layer.SetTimeSample(prototypes_attr.path, frame, prototypes)
+            layer.SetTimeSample(texture_attr.path, frame, Sdf.AssetPath(
+                f"./tex/swap_{frame // 100 % 4}.png"))
+
+    start = time.perf_counter()
+    expected = _list_prim_spec_asset_values_with_duplicates(prim, layer)
+    duplicates_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pinning_funcs._get_prim_spec_asset_property_values(prim, layer)
+    duration = time.perf_counter() - start
+
+    print(
+        f"{TIME_SAMPLE_COUNT} samples of {PROTOTYPE_COUNT} prototypes: "
+        f"{len(expected)} values with duplicates in "
+        f"{duplicates_duration:.3f}s, {len(result)} unique values in "
+        f"{duration:.3f}s"
+    )
+    assert result == list(dict.fromkeys(expected))
+    _check_benchmark_results("time_sample_scan", {
+        "duration": duration, "duplicates_duration": duplicates_duration})
+
+
+def test_benchmark_pinning_validation(tmp_path_factory):
+    texture_dir = tmp_path_factory.mktemp("validation")
+    pinning_data = {}
+    for directory_index in range(VALIDATION_DIRECTORY_COUNT):
+        directory = texture_dir / f"asset_{directory_index}"
+        directory.mkdir()
+        for index in range(VALIDATION_FILE_COUNT):
+            path = directory / f"color.{1001 + index}.exr"
+            path.write_bytes(b"x")
+            pinning_data[f"./{directory.name}/{path.name}"] = str(path)
+
+    start = time.perf_counter()
+    stat_sizes = []
+    for path in pinning_data.values():
+        try:
+            stat_sizes.append(os.stat(path).st_size)
+        except OSError:
+            pass
+    stat_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validation = pinning.validate_pinning_data(pinning_data)
+    duration = time.perf_counter() - start
+
+    print(
+        f"{len(pinning_data)} pinned files: stat per file "
+        f"{stat_duration:.3f}s, validation by directory {duration:.3f}s"
+    )
+    assert validation.is_valid
+    assert validation.file_count == len(stat_sizes)
+    assert validation.total_bytes == sum(stat_sizes)
+
+
+def test_benchmark_stage_pinning(tmp_path_factory):
+    scene_dir = tmp_path_factory.mktemp("variants")
+    shot = Sdf.Layer.CreateNew(str(scene_dir / "shot.usda"))
+    for asset_index in range(VARIANT_ASSET_COUNT):
+        asset = Sdf.Layer.CreateNew(
+            str(scene_dir / f"asset_{asset_index}.usda"))
+        asset_prim = Sdf.CreatePrimInLayer(asset, "/asset")
+        asset.defaultPrim = "asset"
+        variant_set = Sdf.VariantSetSpec(asset_prim, "look")
+        for variant_index in range(VARIANT_COUNT):
+            look = Sdf.Layer.CreateNew(str(
+                scene_dir / f"asset_{asset_index}_look_{variant_index}.usda"))
+            look_prim = Sdf.CreatePrimInLayer(look, "/look")
+            look.defaultPrim = "look"
+            for index in range(VARIANT_TEXTURE_COUNT):
+                attr = Sdf.AttributeSpec(
+                    look_prim, f"texture{index}", Sdf.ValueTypeNames.Asset)
+                attr.default = Sdf.AssetPath(
+                    f"./textures/asset_{asset_index}_{variant_index}_"
+                    f"{index}.png")
+            look.Save()
+
+            variant = Sdf.VariantSpec(variant_set, f"look{variant_index}")
+            variant.primSpec.referenceList.Append(
+                Sdf.Reference(f"./{os.path.basename(look.identifier)}"))
+        asset_prim.variantSetNameList.Prepend("look")
+        asset_prim.variantSelections["look"] = "look0"
+        asset.Save()
+
+        prim = Sdf.CreatePrimInLayer(shot, f"/shot/asset_{asset_index}")
+        prim.referenceList.Append(
+            Sdf.Reference(f"./{os.path.basename(asset.identifier)}"))
+    shot.Save()
+
+    resolver = Ar.GetResolver()
+    start = time.perf_counter()
+    expected = pinning_funcs.get_asset_dependencies(
+        shot.identifier, resolver)
+    traversal_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pinning.get_stage_asset_dependencies(shot.identifier, resolver)
+    duration = time.perf_counter() - start
+
+    print(
+        f"{VARIANT_ASSET_COUNT} assets with {VARIANT_COUNT} variants: "
+        f"traversal {len(expected)} entries in {traversal_duration:.3f}s, "
+        f"composed stage {len(result)} entries in {duration:.3f}s"
+    )
+    # Only the selected variant of each asset is pinned
+    assert len(result) == 1 + VARIANT_ASSET_COUNT * (
+        2 + VARIANT_TEXTURE_COUNT)
+    assert all(expected[identifier] == path
+               for identifier, path in result.items())
+    _check_benchmark_results("stage_pinning", {
+        "duration": duration, "traversal_duration": traversal_duration})
+
+
+class SyntheticScene(NamedTuple):
+    """Parameters of a synthetic shot written by `_write_synthetic_scene`.
+
+    Attributes:
+        sublayer_depth: Length of the sublayer chain of the shot.
+        reference_fanout: Number of assets referenced by each sublayer.
+        payloads: Whether each asset loads its attributes with a payload.
+        asset_attributes: Number of UDIM texture attributes of each asset,
+            each asset has its own textures.
+        udim_tiles: Number of UDIM tiles of each texture.
+        time_samples: Number of time samples of each texture attribute,
+            switching between two textures. Authored as default values
+            when lower than 2.
+    """
+    sublayer_depth: int
+    reference_fanout: int
+    payloads: bool
+    asset_attributes: int
+    udim_tiles: int
+    time_samples: int
+
+    @property
+    def layer_count(self) -> int:
+        asset_count = self.sublayer_depth * self.reference_fanout
+        return self.sublayer_depth + asset_count * (1 + self.payloads)
+
+
+SYNTHETIC_SCENES = {
+    "small": SyntheticScene(4, 5, True, 4, 10, 10),
+    "medium": SyntheticScene(10, 20, True, 8, 20, 24),
+    "large": SyntheticScene(20, 50, True, 8, 10, 24),
+}
+
+
+def _write_synthetic_scene(directory, scene: SyntheticScene) -> str:
+    """Write the layers and textures of a synthetic shot.
+
+    Returns: The path of the root layer of the shot.
+
+    """
+    asset_dir = directory / "assets"
+    asset_dir.mkdir()
+
+    def write_asset(name):
+        texture_dir = asset_dir / "textures" / name
+        texture_dir.mkdir(parents=True)
+        texture_paths = []
+        for index in range(scene.asset_attributes + 1):
+            for tile in range(1001, 1001 + scene.udim_tiles):
+                (texture_dir / f"map_{index}.{tile}.exr").touch()
+            texture_paths.append(f"./textures/{name}/map_{index}.<UDIM>.exr")
+
+        layer = Sdf.Layer.CreateAnonymous(".usda")
+        prim = Sdf.CreatePrimInLayer(layer, "/asset")
+        for index in range(scene.asset_attributes):
+            attr = Sdf.AttributeSpec(
+                prim, f"texture_{index}", Sdf.ValueTypeNames.Asset)
+            if scene.time_samples < 2:
+                attr.default = Sdf.AssetPath(texture_paths[index])
+                continue
+            for frame in range(scene.time_samples):
+                layer.SetTimeSample(attr.path, frame, Sdf.AssetPath(
+                    texture_paths[index + frame % 2]))
+
+        if scene.payloads:
+            payload_layer = layer
+            payload_layer.Export(str(asset_dir / f"{name}_payload.usda"))
+            layer = Sdf.Layer.CreateAnonymous(".usda")
+            prim = Sdf.CreatePrimInLayer(layer, "/asset")
+            prim.payloadList.Append(Sdf.Payload(f"./{name}_payload.usda"))
+        layer.Export(str(asset_dir / f"{name}.usda"))
+
+    for depth in range(scene.sublayer_depth):
+        layer = Sdf.Layer.CreateAnonymous(".usda")
+        if depth + 1 < scene.sublayer_depth:
+            layer.subLayerPaths = [f"./shot_{depth + 1}.usda"]
+        for index in range(scene.reference_fanout):
+            name = f"asset_{depth}_{index}"
+            write_asset(name)
+            prim = Sdf.CreatePrimInLayer(layer, f"/shot/{name}")
+            prim.referenceList.Append(
+                Sdf.Reference(f"./assets/{name}.usda"))
+        layer.Export(str(directory / f"shot_{depth}.usda"))
+
+    return str(directory / "shot_0.usda")
+
+
+def _record_benchmark_results(name, results):
+    """Append benchmark results and compare them with the previous ones.
+
+    The results are only recorded when the `BENCHMARK_RESULTS_ENV`
+    environment variable names a JSON lines file.
+
+    Returns: The previous results of the benchmark or None.
+
+    """
+    results_file = os.getenv(BENCHMARK_RESULTS_ENV)
+    if not results_file:
+        return None
+
+    previous = None
+    if os.path.exists(results_file):
+        with open(results_file) as file:
+            for line in file:
+                record = json.loads(line)
+                if record["name"] == name:
+                    previous = record
+
+    with open(results_file, "a") as file:
+        file.write(json.dumps({
+            "name": name, "time": time.time(), **results}) + "\n")
+    return previous
+
+
+def _check_benchmark_results(name, durations, **info):
+    """Record the durations of a benchmark and compare them with the
+    previous results, see `_record_benchmark_results`.
+
+    Fails when a duration is slower than its previous result by more than
+    the factor of `BENCHMARK_MAX_SLOWDOWN_ENV`.
+    """
+    previous = _record_benchmark_results(name, {**info, **durations})
+    if previous is None:
+        return
+
+    max_slowdown = float(os.getenv(BENCHMARK_MAX_SLOWDOWN_ENV) or "inf")
+    for key, duration in durations.items():
+        if key not in previous:
+            continue
+        slowdown = duration / max(previous[key], 1e-9)
+        print(f"  {key}: {slowdown:.2f}x of the previous result")
+        assert slowdown <= max_slowdown, (
+            f"{key} of {name} is {slowdown:.2f}x slower than before")
+
+
+@pytest.mark.parametrize("scale", list(SYNTHETIC_SCENES))
+def test_benchmark_synthetic_scene(tmp_path_factory, scale):
+    scene = SYNTHETIC_SCENES[scale]
+    scene_dir = tmp_path_factory.mktemp(f"synthetic_{scale}")
+    entry = _write_synthetic_scene(scene_dir, scene)
+    root_info = {"work": str(scene_dir)}
+
+    start = time.perf_counter()
+    dependency_info = pinning_funcs.get_asset_dependencies(
+        entry, Ar.GetResolver())
+    traversal_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rootless_info = pinning_funcs.remove_root_from_dependency_info(
+        dependency_info, root_info)
+    rootless_duration = time.perf_counter() - start
+
+    pinning_file = str(scene_dir / "shot_pin.json")
+    start = time.perf_counter()
+    pinning_funcs._write_pinning_file(pinning_file, rootless_info)
+    write_duration = time.perf_counter() - start
+
+    results = {
+        "get_asset_dependencies": traversal_duration,
+        "remove_root_from_dependency_info": rootless_duration,
+        "_write_pinning_file": write_duration,
+    }
+    print(
+        f"{scale} synthetic scene of {scene.layer_count} layers and "
+        f"{len(dependency_info)} entries: " + ", ".join(
+            f"{name} {duration:.3f}s" for name, duration in results.items())
+    )
+    layer_keys = {
+        path for path in dependency_info.values() if path.endswith(".usda")
+    }
+    assert len(layer_keys) == scene.layer_count
+    assert pinning.read_pinning_file(pinning_file) == rootless_info
+
+    _check_benchmark_results(
+        f"synthetic_scene_{scale}", results, layers=scene.layer_count)
+
+
+def test_benchmark_in_memory_pinning(tmp_path_factory):
+    scene_dir = tmp_path_factory.mktemp("lop")
+    shot = _write_synthetic_scene(scene_dir, SYNTHETIC_SCENES["small"])
+
+    # Anonymous layer of a LOP network referencing the shot
+    lop_layer = Sdf.Layer.CreateAnonymous("lop")
+    lop_layer.subLayerPaths.append(shot)
+    for index in range(LOP_PRIM_COUNT):
+        prim = Sdf.CreatePrimInLayer(lop_layer, f"/lop/prim_{index}")
+        attr = Sdf.AttributeSpec(
+            prim, "texture", Sdf.ValueTypeNames.Asset)
+        attr.default = Sdf.AssetPath(
+            str(scene_dir / f"lop_{index % 100}.exr"))
+
+    resolver = Ar.GetResolver()
+    render_usd = str(scene_dir / "__render__.usd")
+    start = time.perf_counter()
+    lop_layer.Export(render_usd)
+    expected = pinning_funcs.get_asset_dependencies(render_usd, resolver)
+    export_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pinning_funcs.get_asset_dependencies(lop_layer, resolver)
+    duration = time.perf_counter() - start
+
+    print(
+        f"LOP layer of {LOP_PRIM_COUNT} prims: export and pin "
+        f"{export_duration:.3f}s, pin in memory {duration:.3f}s"
+    )
+    # The exported file is the only entry not pinned from memory
+    del expected[render_usd]
+    assert result == expected
+    _check_benchmark_results("in_memory_pinning", {
+        "duration": duration, "export_duration": export_duration})